@@ -0,0 +1,119 @@
+"""Command line maintenance tasks.
+
+Usage:
+    python -m app.cli rollups verify --db expenses.db
+    python -m app.cli rollups rebuild --db expenses.db
+    python -m app.cli storage migrate --db expenses.db
+    python -m app.cli expenses import expenses.csv --db expenses.db --workers 4
+"""
+
+import argparse
+import sys
+from app.expense_manager.expense_importer import ExpenseImporter
+from app.expense_manager.expense_service import ExpenseService
+from app.external.clock import SystemClock
+from app.external.database import SQLiteDatabase
+from app.rest.serializers import parse_csv_expense, read_csv
+
+
+def rollups(args) -> int:
+    database = SQLiteDatabase(args.db)
+    try:
+        if args.action == "rebuild":
+            database.rebuild_rollups()
+            print("Rollups rebuilt")
+            return 0
+
+        mismatches = database.verify_rollups()
+        for mismatch in mismatches:
+            print(
+                f"{mismatch.granularity} {mismatch.period} {mismatch.category}: "
+                f"expected {mismatch.expected_total} ({mismatch.expected_count}), "
+                f"found {mismatch.actual_total} ({mismatch.actual_count})"
+            )
+        print(f"{len(mismatches)} mismatched rollups")
+        return 1 if mismatches else 0
+    finally:
+        database.close()
+
+
+def storage(args) -> int:
+    # Opening the database upgrades it to the current storage version.
+    database = SQLiteDatabase(args.db)
+    try:
+        print(f"{args.db} uses storage version {database.schema_version()}")
+        return 0
+    finally:
+        database.close()
+
+
+def expenses(args) -> int:
+    database = SQLiteDatabase(args.db)
+    importer = ExpenseImporter(
+        ExpenseService(SystemClock(), database),
+        parse_csv_expense,
+        batch_size=args.batch_size,
+        workers=args.workers,
+    )
+
+    def progress(report):
+        print(
+            f"{report.imported} imported, {len(report.errors)} errors, "
+            f"{report.rows_per_second:.0f} rows/s",
+            file=sys.stderr,
+        )
+
+    try:
+        with open(
+            args.file, encoding="utf-8-sig", errors="surrogateescape", newline=""
+        ) as lines:
+            report = importer.run(read_csv(lines), progress)
+    except ValueError as e:
+        print(f"{args.file}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        database.close()
+
+    for line, error in sorted(report.errors.items()):
+        print(f"{args.file}:{line}: {error}")
+    print(
+        f"{report.imported} expenses imported, {len(report.errors)} rejected "
+        f"in {report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s)"
+    )
+    return 1 if report.errors else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rollups_parser = commands.add_parser(
+        "rollups", help="Verify or rebuild the category rollup tables"
+    )
+    rollups_parser.add_argument("action", choices=["verify", "rebuild"])
+    rollups_parser.add_argument("--db", default="expenses.db")
+    rollups_parser.set_defaults(handler=rollups)
+
+    storage_parser = commands.add_parser(
+        "storage", help="Upgrade the database file to the current storage format"
+    )
+    storage_parser.add_argument("action", choices=["migrate"])
+    storage_parser.add_argument("--db", default="expenses.db")
+    storage_parser.set_defaults(handler=storage)
+
+    expenses_parser = commands.add_parser(
+        "expenses", help="Import expenses from a CSV export"
+    )
+    expenses_parser.add_argument("action", choices=["import"])
+    expenses_parser.add_argument("file")
+    expenses_parser.add_argument("--db", default="expenses.db")
+    expenses_parser.add_argument("--workers", type=int, default=0)
+    expenses_parser.add_argument("--batch-size", type=int, default=10000)
+    expenses_parser.set_defaults(handler=expenses)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
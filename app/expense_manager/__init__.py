@@ -1,6 +1,7 @@
 """Expense Manager Module
 
-This module provides functionality for managing expenses through the ExpenseService class.
+This module provides functionality for managing expenses through the ExpenseService class
+and for reporting on them through the ReportService class.
 
 The ExpenseService class interacts with the Clock and Database abstractions to handle
 time-related operations and data persistence, respectively. It also uses the ExpenseFilter
@@ -9,6 +10,8 @@ class to filter expenses based on various criteria.
 Classes:
     ExpenseService: A service class for managing expenses.
     ExpenseFilter: A class for filtering expenses based on date range and category.
+    ReportService: A service class for monthly and yearly expense summaries.
+    ParallelReportService: A ReportService that computes summaries on worker processes.
 
 Interactions:
     - Clock (@clock.py):
@@ -24,6 +27,12 @@ Interactions:
         The ExpenseService uses ExpenseFilter to filter expenses based on date range
         and category.
 
+    - ReportService (@report_service.py):
+        The ReportService asks the Database for per-period, per-category aggregates
+        and folds them into PeriodSummary objects.
+        ParallelReportService splits the date range across worker processes, each
+        with its own read-only SQLite connection, and merges their partial aggregates.
+
 Usage:
     from app.expense_manager import ExpenseService
     from app.external.clock import SystemClock
@@ -41,4 +50,8 @@ Usage:
     # Get expenses by filter
     expense_filter = ExpenseFilter(from_date=date(2023, 1, 1), to_date=date(2023, 12, 31), category=Category.FOOD)
     filtered_expenses = expense_service.get_expenses_by_filter(expense_filter)
+
+    # Summarize expenses per month
+    report_service = ReportService(database)
+    monthly_summaries = report_service.monthly_summary(expense_filter)
 """
@@ -0,0 +1,218 @@
+from decimal import Decimal
+from typing import AsyncIterator, List, Optional
+from app.external.async_database import AsyncDatabase
+from app.external.database import DbExpense, ExpenseRow, to_expense_row
+from app.external.clock import Clock
+from app.models.expense import Expense
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.expense_manager.batch_result import BatchResult
+from app.expense_manager.pagination import Page, build_page
+from app.expense_manager.expense_cache import ExpenseCache
+from app.expense_manager.expense_service import validate_expense
+
+
+class AsyncExpenseService:
+    """The asyncio counterpart of ExpenseService.
+
+    It applies the same validation, pagination and caching rules as
+    ExpenseService, but talks to the database through an AsyncDatabase so that
+    callers running on an event loop are never blocked by database I/O.
+
+    Attributes:
+        clock (Clock): An instance of Clock for time-related operations.
+        database (AsyncDatabase): The database used for data persistence.
+        cache (Optional[ExpenseCache]): An optional cache of query results.
+    """
+
+    def __init__(
+        self,
+        clock: Clock,
+        database: AsyncDatabase,
+        cache: Optional[ExpenseCache] = None,
+    ):
+        """Initialize the AsyncExpenseService.
+
+        Args:
+            clock (Clock): An instance of Clock for time-related operations.
+            database (AsyncDatabase): The database used for data persistence.
+            cache (Optional[ExpenseCache]): A cache for query results. Created
+                expenses invalidate the cached results they would change.
+        """
+        self.clock = clock
+        self.database = database
+        self.cache = cache
+
+    async def create_expense(self, expense: Expense):
+        """Validate and save an expense; see ExpenseService.create_expense."""
+        validate_expense(expense, self.clock.now().date())
+
+        db_expense = await self.database.save_expense(expense)
+        if self.cache:
+            self.cache.invalidate([expense])
+        return db_expense
+
+    async def create_expenses(self, expenses: List[Expense]) -> BatchResult:
+        """Save the valid expenses in one transaction.
+
+        See ExpenseService.create_expenses.
+        """
+        today = self.clock.now().date()
+        result = BatchResult()
+        valid = []
+        for index, expense in enumerate(expenses):
+            try:
+                validate_expense(expense, today)
+            except ValueError as e:
+                result.errors[index] = str(e)
+            else:
+                valid.append((index, expense))
+
+        db_expenses = await self.database.save_expenses(
+            [expense for _, expense in valid]
+        )
+        for (index, _), db_expense in zip(valid, db_expenses):
+            result.created[index] = db_expense
+        if self.cache and valid:
+            self.cache.invalidate(expense for _, expense in valid)
+        return result
+
+    async def get_expenses_page(self, filter: ExpenseFilter, version=None) -> Page:
+        """Get one page of expenses; see ExpenseService.get_expenses_page."""
+        filter.validate()
+        if filter.page_size is None:
+            raise ValueError("page_size is required")
+        if self.cache:
+            generation = self.cache.generation
+            cached = self.cache.get(filter, kind="page", version=version)
+            if cached is not None:
+                return Page(list(cached.expenses), cached.next_cursor)
+
+        category_filter = filter.category.value if filter.category else None
+        after = (filter.after.date, filter.after.id) if filter.after else None
+        db_expenses = await self.database.find_expenses_by_filter(
+            filter.from_date,
+            filter.to_date,
+            category_filter,
+            limit=filter.page_size + 1,
+            after=after,
+        )
+        page = build_page(db_expenses, filter.page_size)
+        if self.cache:
+            self.cache.put(
+                filter,
+                Page(list(page.expenses), page.next_cursor),
+                len(page.expenses),
+                generation,
+                kind="page",
+                version=version,
+            )
+        return page
+
+    async def iter_expenses_by_filter(
+        self, filter: ExpenseFilter
+    ) -> AsyncIterator[Expense]:
+        """Stream the expenses that match an unpaginated filter.
+
+        Filter errors surface when the first expense is awaited, so callers
+        that must report them before streaming call ``filter.validate()`` first.
+
+        Args:
+            filter (ExpenseFilter): The filter to apply to the expenses.
+
+        Yields:
+            Expense: The matching expenses in insertion order, or most relevant
+                first when the filter has a ``search`` term.
+        """
+        filter.validate()
+        cache = self.cache
+        if cache:
+            generation = cache.generation
+            cached = cache.get(filter)
+            if cached is not None:
+                for expense in cached:
+                    yield expense
+                return
+
+        category_filter = filter.category.value if filter.category else None
+        if filter.search is not None:
+            db_expenses = self._search(filter, category_filter)
+        else:
+            db_expenses = self.database.iter_expenses_by_filter(
+                filter.from_date, filter.to_date, category_filter
+            )
+        collected: Optional[list] = [] if cache else None
+        async for db_expense in db_expenses:
+            expense = Expense.from_db_expense(db_expense)
+            if cache and collected is not None:
+                collected.append(expense)
+                if len(collected) > cache.max_rows:
+                    collected = None
+            yield expense
+        if cache and collected is not None:
+            cache.put(filter, collected, len(collected), generation)
+
+    async def iter_expense_rows(
+        self, filter: ExpenseFilter, version=None
+    ) -> AsyncIterator[ExpenseRow]:
+        """Stream matching expenses as ExpenseRow tuples.
+
+        The asyncio counterpart of ExpenseService.iter_expense_rows; filter
+        errors surface when the first row is awaited.
+        """
+        filter.validate()
+        if filter.page_size is not None or filter.after is not None:
+            raise ValueError("Expense rows cannot be paginated")
+        cache = self.cache
+        if cache:
+            generation = cache.generation
+            cached = cache.get(filter, kind="rows", version=version)
+            if cached is not None:
+                for row in cached:
+                    yield row
+                return
+
+        category_filter = filter.category.value if filter.category else None
+        rows: AsyncIterator[ExpenseRow]
+        if filter.search is not None:
+            rows = (
+                to_expense_row(db_expense)
+                async for db_expense in self._search(filter, category_filter)
+            )
+        else:
+            rows = self.database.iter_expense_rows(
+                filter.from_date, filter.to_date, category_filter
+            )
+        collected: Optional[list] = [] if cache else None
+        async for row in rows:
+            if cache and collected is not None:
+                collected.append(row)
+                if len(collected) > cache.max_rows:
+                    collected = None
+            yield row
+        if cache and collected is not None:
+            cache.put(
+                filter,
+                collected,
+                len(collected),
+                generation,
+                kind="rows",
+                version=version,
+            )
+
+    async def get_data_version(self, filter: ExpenseFilter) -> tuple[int, Decimal]:
+        """Get a value that changes with the matching expenses.
+
+        See ExpenseService.get_data_version.
+        """
+        category_filter = filter.category.value if filter.category else None
+        total = await self.database.get_expense_total(
+            filter.from_date, filter.to_date, category_filter
+        )
+        return total.count, total.total
+
+    async def _search(self, filter, category_filter) -> AsyncIterator[DbExpense]:
+        db_expenses = await self.database.search_expenses(
+            filter.search, filter.from_date, filter.to_date, category_filter
+        )
+        for db_expense in db_expenses:
+            yield db_expense
@@ -0,0 +1,11 @@
+from dataclasses import dataclass, field
+from typing import Dict
+from app.external.database import DbExpense
+
+
+@dataclass
+class BatchResult:
+    """Outcome of a bulk insert, keyed by the position of each input expense."""
+
+    created: Dict[int, DbExpense] = field(default_factory=dict)
+    errors: Dict[int, str] = field(default_factory=dict)
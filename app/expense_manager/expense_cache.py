@@ -0,0 +1,246 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
+from app.external.clock import Clock
+from app.external.search_index import matches_search
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.metrics import MetricsRegistry
+from app.models.expense import Expense
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    rows: int = 0
+
+
+@dataclass
+class _CacheEntry:
+    filter: ExpenseFilter
+    value: object
+    rows: int
+    expires_at: datetime
+    version: object = None
+
+
+class ExpenseCache:
+    """An LRU cache of query results keyed on the ExpenseFilter.
+
+    The cache is bounded both by the number of entries and by the total number
+    of cached expenses; results larger than ``max_rows`` are never cached.
+    Entries expire ``ttl`` after they were stored. ``invalidate`` drops only the
+    entries whose filter matches one of the new expenses. An entry stored with
+    a data version is only returned for that version, which also catches
+    writes made by other processes.
+
+    Attributes:
+        clock (Clock): An instance of Clock used to expire entries.
+        max_entries (int): Maximum number of cached results.
+        max_rows (int): Maximum number of expenses across all cached results.
+        ttl (timedelta): How long a result stays valid.
+    """
+
+    def __init__(
+        self,
+        clock: Clock,
+        max_entries: int = 256,
+        max_rows: int = 100_000,
+        ttl: timedelta = timedelta(seconds=60),
+    ):
+        self.clock = clock
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[str, ExpenseFilter], _CacheEntry] = (
+            OrderedDict()
+        )
+        self._rows = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    @property
+    def generation(self) -> int:
+        """Changes on every invalidation; pass it to ``put`` to detect races."""
+        return self._generation
+
+    def get(self, filter: ExpenseFilter, kind: str = "expenses", version=None):
+        key = (kind, filter)
+        now = self.clock.now()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(key)
+                self._stats.expirations += 1
+                entry = None
+            if entry is not None and entry.version != version:
+                self._remove(key)
+                self._stats.invalidations += 1
+                entry = None
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry.value
+
+    def put(
+        self,
+        filter: ExpenseFilter,
+        value,
+        rows: int,
+        generation: int,
+        kind="expenses",
+        version=None,
+    ):
+        """Store a result computed while the cache was at ``generation``.
+
+        The result is dropped if an invalidation happened in the meantime,
+        because it may have been read before the invalidating write. A
+        ``version`` read before the result makes ``get`` return it only for
+        that version.
+        """
+        if rows > self.max_rows:
+            return
+        key = (kind, filter)
+        entry = _CacheEntry(
+            filter=filter,
+            value=value,
+            rows=rows,
+            expires_at=self.clock.now() + self.ttl,
+            version=version,
+        )
+        with self._lock:
+            if generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._rows += rows
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                self._remove(next(iter(self._entries)))
+                self._stats.evictions += 1
+
+    def populate(
+        self,
+        filter: ExpenseFilter,
+        expenses: Iterable,
+        kind: str = "expenses",
+        version=None,
+    ) -> Iterator:
+        """Yield ``expenses`` and cache them under ``kind`` once fully consumed.
+
+        At most ``max_rows`` expenses are held on the side, so streaming a large
+        result does not buffer it.
+        """
+        generation = self._generation
+        collected: Optional[list] = []
+        for expense in expenses:
+            if collected is not None:
+                collected.append(expense)
+                if len(collected) > self.max_rows:
+                    collected = None
+            yield expense
+        if collected is not None:
+            self.put(
+                filter,
+                collected,
+                len(collected),
+                generation,
+                kind=kind,
+                version=version,
+            )
+
+    def invalidate(self, expenses: Iterable[Expense]):
+        """Drop the cached results that the new ``expenses`` would change."""
+        expenses = list(expenses)
+        with self._lock:
+            self._generation += 1
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if any(self._matches(entry.filter, expense) for expense in expenses)
+            ]
+            for key in stale:
+                self._remove(key)
+            self._stats.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._rows = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                expirations=self._stats.expirations,
+                invalidations=self._stats.invalidations,
+                entries=len(self._entries),
+                rows=self._rows,
+            )
+
+    def _remove(self, key):
+        self._rows -= self._entries.pop(key).rows
+
+    def _matches(self, filter: ExpenseFilter, expense: Expense) -> bool:
+        if filter.from_date and expense.date < filter.from_date:
+            return False
+        if filter.to_date and expense.date > filter.to_date:
+            return False
+        if filter.category and expense.category != filter.category:
+            return False
+        if filter.search is not None and not matches_search(
+            expense.description, filter.search
+        ):
+            return False
+        # New expenses get the highest id, so in (date, id) order they only
+        # land before the cursor when their date is earlier.
+        if filter.after and expense.date < filter.after.date:
+            return False
+        return True
+
+
+def instrument_cache(cache: ExpenseCache, registry: MetricsRegistry):
+    """Expose the ``stats()`` of ``cache`` in ``registry``."""
+    registry.collected(
+        "expenses_cache_lookups_total",
+        "Cache lookups, by whether a result was found.",
+        lambda: _lookups(cache.stats()),
+        ["result"],
+        type="counter",
+    )
+    registry.collected(
+        "expenses_cache_removals_total",
+        "Results removed from the cache, by reason.",
+        lambda: _removals(cache.stats()),
+        ["reason"],
+        type="counter",
+    )
+    registry.collected(
+        "expenses_cache_rows",
+        "Expenses held in the cache.",
+        lambda: {(): cache.stats().rows},
+    )
+
+
+def _lookups(stats: CacheStats) -> dict:
+    return {("hit",): stats.hits, ("miss",): stats.misses}
+
+
+def _removals(stats: CacheStats) -> dict:
+    return {
+        ("eviction",): stats.evictions,
+        ("expiration",): stats.expirations,
+        ("invalidation",): stats.invalidations,
+    }
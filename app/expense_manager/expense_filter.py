@@ -2,10 +2,24 @@ from dataclasses import dataclass
 from datetime import date
 from typing import Optional
 from app.models.category import Category
+from app.expense_manager.pagination import PageCursor
 
 
-@dataclass
+@dataclass(frozen=True)
 class ExpenseFilter:
     from_date: Optional[date] = None
     to_date: Optional[date] = None
     category: Optional[Category] = None
+    page_size: Optional[int] = None
+    after: Optional[PageCursor] = None
+    search: Optional[str] = None
+
+    def validate(self):
+        if self.from_date and self.to_date and self.from_date > self.to_date:
+            raise ValueError("from_date cannot be after to_date")
+        if self.page_size is not None and self.page_size < 1:
+            raise ValueError("page_size must be positive")
+        if self.search is not None and (
+            self.page_size is not None or self.after is not None
+        ):
+            raise ValueError("Search results cannot be paginated")
@@ -0,0 +1,147 @@
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Optional
+from app.expense_manager.expense_service import ExpenseService, validate_expense
+from app.models.expense import Expense
+
+
+def parse_records(parse_record: Callable, today: date, records: list) -> tuple:
+    """Parse and validate a batch of (line, record) pairs.
+
+    Runs in the worker processes of an ExpenseImporter. Returns the valid
+    (line, expense) pairs and the errors keyed by line.
+    """
+    expenses = []
+    errors = {}
+    for line, record in records:
+        try:
+            expense = parse_record(record)
+            validate_expense(expense, today)
+        except ValueError as e:
+            errors[line] = str(e)
+        else:
+            expenses.append((line, expense))
+    return expenses, errors
+
+
+@dataclass
+class ImportReport:
+    """Progress and outcome of an import, with the errors keyed by line."""
+
+    imported: int = 0
+    errors: Dict[int, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return self.imported + len(self.errors)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class ExpenseImporter:
+    """Bulk-load expenses from a stream of parsed records.
+
+    Records are parsed and validated in batches of ``batch_size``, with the
+    rules of ExpenseService.create_expense and the date the import started on.
+    With more than one worker, the batches are handed to a pool of processes,
+    and each validated batch is saved while the workers handle the following
+    ones. Every batch is saved in one transaction through the service, with
+    the cache invalidation of ExpenseService.create_expenses but without
+    validating it again; batches saved before a failure stay saved.
+
+    Attributes:
+        expense_service (ExpenseService): The service the expenses are saved with.
+        parse_record (Callable): Turns one record into an Expense, raising
+            ValueError if it cannot. It must be picklable to use workers.
+        batch_size (int): Records parsed, validated and saved together.
+        workers (int): Number of worker processes; 0 or 1 parses and validates
+            in-process.
+    """
+
+    def __init__(
+        self,
+        expense_service: ExpenseService,
+        parse_record: Callable[[Any], Expense],
+        batch_size: int = 10000,
+        workers: int = 0,
+    ):
+        self.expense_service = expense_service
+        self.parse_record = parse_record
+        self.batch_size = batch_size
+        self.workers = workers
+
+    def run(
+        self,
+        records: Iterable[tuple[int, object]],
+        progress: Optional[Callable[[ImportReport], None]] = None,
+    ) -> ImportReport:
+        """Import (line, record) pairs.
+
+        Args:
+            records (Iterable[tuple[int, object]]): The records to import, each
+                with the line number its errors are reported under.
+            progress (Optional[Callable[[ImportReport], None]]): Called with the
+                report so far after each saved batch.
+
+        Returns:
+            ImportReport: The number of imported expenses, the errors by line
+                and the time the import took.
+
+        Raises:
+            ValueError: If ``records`` raises it, for example on a bad header.
+        """
+        report = ImportReport()
+        start = time.perf_counter()
+        today = self.expense_service.clock.now().date()
+        batches = self._batches(records)
+
+        if self.workers <= 1:
+            for batch in batches:
+                parsed = parse_records(self.parse_record, today, batch)
+                self._save(parsed, report, start, progress)
+            report.seconds = time.perf_counter() - start
+            return report
+
+        # Imported here: multiprocessing is only needed once workers are.
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Workers are spawned, not forked from a process whose other threads
+        # may hold locks, such as a web server's.
+        with ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            pending: deque = deque()
+            for batch in batches:
+                pending.append(
+                    executor.submit(parse_records, self.parse_record, today, batch)
+                )
+                # Keep the workers busy without reading the whole input ahead.
+                if len(pending) >= 2 * self.workers:
+                    self._save(pending.popleft().result(), report, start, progress)
+            while pending:
+                self._save(pending.popleft().result(), report, start, progress)
+        report.seconds = time.perf_counter() - start
+        return report
+
+    def _batches(self, records):
+        records = iter(records)
+        while batch := list(islice(records, self.batch_size)):
+            yield batch
+
+    def _save(self, parsed, report, start, progress):
+        expenses, errors = parsed
+        report.errors.update(errors)
+        db_expenses = self.expense_service._save_valid_expenses(
+            [expense for _, expense in expenses]
+        )
+        report.imported += len(db_expenses)
+        report.seconds = time.perf_counter() - start
+        if progress:
+            progress(report)
@@ -1,9 +1,43 @@
-from typing import List
+from datetime import date
+from decimal import Decimal
+from typing import Iterator, List, Optional
 from app.external.clock import Clock
 from app.models.expense import Expense, MAX_DESCRIPTION_LENGTH
 from app.models.category import Category
-from app.external.database import Database
+from app.external.database import (
+    MAX_CENTS,
+    Database,
+    DbExpense,
+    ExpenseRow,
+    to_expense_row,
+)
 from app.expense_manager.expense_filter import ExpenseFilter
+from app.expense_manager.batch_result import BatchResult
+from app.expense_manager.pagination import Page, build_page
+from app.expense_manager.expense_cache import ExpenseCache
+
+
+def validate_expense(expense: Expense, today: date):
+    """Raise ValueError if ``expense`` cannot be created on ``today``."""
+    if not expense.amount.is_finite():
+        raise ValueError("Invalid amount")
+    if expense.amount <= 0:
+        raise ValueError("Amount must be positive")
+    # Amounts are stored as int64 cents; anything that does not fit exactly
+    # would be rounded or overflow.
+    if expense.amount * 100 > MAX_CENTS:
+        raise ValueError("Amount is too large")
+    if expense.amount != round(expense.amount, 2):
+        raise ValueError("Amount cannot have more than 2 decimal places")
+    if expense.date > today:
+        raise ValueError("Date cannot be in the future")
+    if (
+        expense.description is not None
+        and len(expense.description) > MAX_DESCRIPTION_LENGTH
+    ):
+        raise ValueError("Description cannot be longer than 255 characters")
+    if not isinstance(expense.category, Category):
+        raise ValueError("Invalid category")
 
 
 class ExpenseService:
@@ -14,17 +48,23 @@ class ExpenseService:
     Attributes:
         clock (Clock): An instance of Clock for time-related operations.
         database (Database): An instance of Database for data persistence.
+        cache (Optional[ExpenseCache]): An optional cache of query results.
     """
 
-    def __init__(self, clock: Clock, database: Database):
+    def __init__(
+        self, clock: Clock, database: Database, cache: Optional[ExpenseCache] = None
+    ):
         """Initialize the ExpenseService.
 
         Args:
             clock (Clock): An instance of Clock for time-related operations.
             database (Database): An instance of Database for data persistence.
+            cache (Optional[ExpenseCache]): A cache for query results. Created
+                expenses invalidate the cached results they would change.
         """
         self.clock = clock
         self.database = database
+        self.cache = cache
 
     def create_expense(self, expense: Expense):
         """Create a new expense.
@@ -41,24 +81,51 @@ class ExpenseService:
             ValueError: If the expense is invalid (negative amount, future date,
                         description too long, or invalid category).
         """
-        if expense.amount <= 0:
-            raise ValueError("Amount must be positive")
-        if expense.date > self.clock.now().date():
-            raise ValueError("Date cannot be in the future")
-        if (
-            expense.description is not None
-            and len(expense.description) > MAX_DESCRIPTION_LENGTH
-        ):
-            raise ValueError("Description cannot be longer than 255 characters")
-        if not isinstance(expense.category, Category):
-            raise ValueError("Invalid category")
+        validate_expense(expense, self.clock.now().date())
 
         db_expense = self.database.save_expense(expense)
+        if self.cache:
+            self.cache.invalidate([expense])
         return db_expense
 
+    def create_expenses(self, expenses: List[Expense]) -> BatchResult:
+        """Create many expenses at once.
+
+        All expenses are validated first and the valid ones are saved in a
+        single database transaction. Invalid expenses do not prevent the valid
+        ones from being saved.
+
+        Args:
+            expenses (List[Expense]): The expenses to be created.
+
+        Returns:
+            BatchResult: The created expenses and the validation errors, both
+                         keyed by the position of the expense in ``expenses``.
+        """
+        today = self.clock.now().date()
+        result = BatchResult()
+        valid = []
+        for index, expense in enumerate(expenses):
+            try:
+                validate_expense(expense, today)
+            except ValueError as e:
+                result.errors[index] = str(e)
+            else:
+                valid.append((index, expense))
+
+        db_expenses = self._save_valid_expenses([expense for _, expense in valid])
+        for (index, _), db_expense in zip(valid, db_expenses):
+            result.created[index] = db_expense
+        return result
+
     def get_expenses_by_filter(self, filter: ExpenseFilter) -> List[Expense]:
         """Get expenses that match the given filter.
 
+        When the filter has a ``page_size`` or an ``after`` cursor, expenses are
+        returned in (date, id) order starting after the cursor, at most
+        ``page_size`` of them. When it has a ``search`` term, only expenses whose
+        description contains every term are returned, most relevant first.
+
         Args:
             filter (ExpenseFilter): The filter to apply to the expenses.
 
@@ -68,12 +135,181 @@ class ExpenseService:
         Raises:
             ValueError: If the filter is invalid (e.g., from_date is after to_date).
         """
-        if filter.from_date and filter.to_date and filter.from_date > filter.to_date:
-            raise ValueError("from_date cannot be after to_date")
+        filter.validate()
+        if self.cache:
+            generation = self.cache.generation
+            cached = self.cache.get(filter)
+            if cached is not None:
+                return list(cached)
+
+        db_expenses = self._find_db_expenses(filter, filter.page_size)
+        expenses = [Expense.from_db_expense(db_expense) for db_expense in db_expenses]
+        if self.cache:
+            self.cache.put(filter, list(expenses), len(expenses), generation)
+        return expenses
+
+    def get_expenses_page(self, filter: ExpenseFilter, version=None) -> Page:
+        """Get one page of expenses that match the given filter.
+
+        Pages are ordered by (date, id). Pass the returned ``next_cursor`` as
+        the filter's ``after`` to get the following page; it is ``None`` on the
+        last page.
+
+        Args:
+            filter (ExpenseFilter): The filter to apply, with ``page_size`` set.
+            version: The ``get_data_version`` of the filter, read before this
+                call. A cached page stored under another version is not used,
+                so the page is never older than ``version``.
+
+        Returns:
+            Page: The expenses of the page and the cursor of the next page.
+
+        Raises:
+            ValueError: If the filter is invalid or ``page_size`` is missing.
+        """
+        filter.validate()
+        if filter.page_size is None:
+            raise ValueError("page_size is required")
+        if self.cache:
+            generation = self.cache.generation
+            cached = self.cache.get(filter, kind="page", version=version)
+            if cached is not None:
+                return Page(list(cached.expenses), cached.next_cursor)
+
+        # Reading one extra row tells whether another page follows.
+        db_expenses = self._find_db_expenses(filter, filter.page_size + 1)
+        page = build_page(db_expenses, filter.page_size)
+        if self.cache:
+            self.cache.put(
+                filter,
+                Page(list(page.expenses), page.next_cursor),
+                len(page.expenses),
+                generation,
+                kind="page",
+                version=version,
+            )
+        return page
+
+    def iter_expenses_by_filter(self, filter: ExpenseFilter) -> Iterator[Expense]:
+        """Lazily iterate over expenses that match the given filter.
+
+        The filter is validated immediately, but rows are only read from the
+        database as the returned iterator is consumed, so memory use does not
+        depend on the number of matching expenses. Paginated filters read their
+        single page eagerly.
+
+        Args:
+            filter (ExpenseFilter): The filter to apply to the expenses.
+
+        Returns:
+            Iterator[Expense]: An iterator over the expenses that match the filter.
+
+        Raises:
+            ValueError: If the filter is invalid (e.g., from_date is after to_date).
+        """
+        filter.validate()
+        if (
+            filter.page_size is not None
+            or filter.after is not None
+            or filter.search is not None
+        ):
+            return iter(self.get_expenses_by_filter(filter))
+        if self.cache:
+            cached = self.cache.get(filter)
+            if cached is not None:
+                return iter(cached)
 
         category_filter = filter.category.value if filter.category else None
-        db_expenses = self.database.find_expenses_by_filter(
+        db_expenses = self.database.iter_expenses_by_filter(
             filter.from_date, filter.to_date, category_filter
         )
-        expenses = [Expense.from_db_expense(db_expense) for db_expense in db_expenses]
+        expenses = (Expense.from_db_expense(db_expense) for db_expense in db_expenses)
+        if self.cache:
+            return self.cache.populate(filter, expenses)
         return expenses
+
+    def iter_expense_rows(
+        self, filter: ExpenseFilter, version=None
+    ) -> Iterator[ExpenseRow]:
+        """Lazily iterate over matching expenses as ExpenseRow tuples.
+
+        This is the cheap path for writing expenses straight to a response:
+        no Expense objects are built, and no DbExpense objects either unless
+        the filter has a ``search`` term. Rows come in the same order as from
+        ``iter_expenses_by_filter``.
+
+        Args:
+            filter (ExpenseFilter): The filter to apply, without pagination.
+            version: As for ``get_expenses_page``.
+
+        Returns:
+            Iterator[ExpenseRow]: An iterator over the matching rows.
+
+        Raises:
+            ValueError: If the filter is invalid or paginated.
+        """
+        filter.validate()
+        if filter.page_size is not None or filter.after is not None:
+            raise ValueError("Expense rows cannot be paginated")
+        if self.cache:
+            cached = self.cache.get(filter, kind="rows", version=version)
+            if cached is not None:
+                return iter(cached)
+
+        category_filter = filter.category.value if filter.category else None
+        rows: Iterator[ExpenseRow]
+        if filter.search is not None:
+            db_expenses = self.database.search_expenses(
+                filter.search, filter.from_date, filter.to_date, category_filter
+            )
+            rows = map(to_expense_row, db_expenses)
+        else:
+            rows = self.database.iter_expense_rows(
+                filter.from_date, filter.to_date, category_filter
+            )
+        if self.cache:
+            return self.cache.populate(filter, rows, kind="rows", version=version)
+        return rows
+
+    def get_data_version(self, filter: ExpenseFilter) -> tuple[int, Decimal]:
+        """Get a cheap value that changes whenever a matching expense is created.
+
+        Expenses are never updated or deleted, so the expenses in the filter's
+        date range and category only ever grow, and their count changes with
+        every one that is added. The count and total are read from the
+        running totals; expenses outside the range leave them unchanged.
+        Search terms and pagination only select from those expenses, so they
+        do not need a version of their own.
+
+        Args:
+            filter (ExpenseFilter): The filter whose expenses are versioned.
+
+        Returns:
+            tuple[int, Decimal]: The number and total of the matching expenses.
+        """
+        category_filter = filter.category.value if filter.category else None
+        total = self.database.get_expense_total(
+            filter.from_date, filter.to_date, category_filter
+        )
+        return total.count, total.total
+
+    def _save_valid_expenses(self, expenses: List[Expense]) -> List[DbExpense]:
+        """Save expenses that passed ``validate_expense`` in one transaction.
+
+        Also used by ExpenseImporter, whose workers validate the rows they parse.
+        """
+        db_expenses = self.database.save_expenses(expenses)
+        if self.cache and expenses:
+            self.cache.invalidate(expenses)
+        return db_expenses
+
+    def _find_db_expenses(self, filter: ExpenseFilter, limit):
+        category_filter = filter.category.value if filter.category else None
+        if filter.search is not None:
+            return self.database.search_expenses(
+                filter.search, filter.from_date, filter.to_date, category_filter
+            )
+        after = (filter.after.date, filter.after.id) if filter.after else None
+        return self.database.find_expenses_by_filter(
+            filter.from_date, filter.to_date, category_filter, limit=limit, after=after
+        )
@@ -0,0 +1,47 @@
+import base64
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional
+from app.external.database import DbExpense
+
+
+@dataclass(frozen=True)
+class PageCursor:
+    """Position of the last expense of a page in (date, id) order."""
+
+    date: date
+    id: int
+
+    def encode(self) -> str:
+        raw = f"{self.date.isoformat()}|{self.id}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "PageCursor":
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+            date_part, id_part = raw.split("|")
+            return cls(date=date.fromisoformat(date_part), id=int(id_part))
+        except ValueError:
+            raise ValueError("Invalid page token")
+
+
+@dataclass
+class Page:
+    expenses: List[DbExpense]
+    next_cursor: Optional[PageCursor] = None
+
+
+def build_page(db_expenses, page_size: int) -> Page:
+    """Build a page from up to ``page_size + 1`` expenses in (date, id) order.
+
+    The extra expense, when present, only tells that another page follows.
+    """
+    next_cursor = None
+    if len(db_expenses) > page_size:
+        db_expenses = db_expenses[:page_size]
+        next_cursor = PageCursor(db_expenses[-1].date, db_expenses[-1].id)
+    return Page(
+        expenses=list(db_expenses),
+        next_cursor=next_cursor,
+    )
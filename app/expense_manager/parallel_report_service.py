@@ -0,0 +1,165 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List, Optional
+from app.external.database import Database, DbSummary, SQLiteDatabase
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.expense_manager.report_service import ReportService
+from app.models.summary import PeriodSummary
+
+
+# The read-only database of a worker process, opened by its initializer.
+_worker_database = None
+
+
+def _open_worker_database(db_file):
+    global _worker_database
+    _worker_database = SQLiteDatabase(db_file, pool_size=1, read_only=True)
+
+
+def _summarize_range(period, from_date, to_date, category):
+    return _worker_database.summarize_expenses(period, from_date, to_date, category)
+
+
+def split_date_range(from_date: date, to_date: date, parts: int) -> list:
+    """Split the inclusive date range into at most ``parts`` contiguous ranges."""
+    days = (to_date - from_date).days + 1
+    parts = max(1, min(parts, days))
+    bounds = [from_date + timedelta(days=days * part // parts) for part in range(parts)]
+    ends = [start - timedelta(days=1) for start in bounds[1:]] + [to_date]
+    return list(zip(bounds, ends))
+
+
+class ParallelReportService(ReportService):
+    """A ReportService that computes summaries on several processes.
+
+    The date range of a summary is split into ``workers * chunks_per_worker``
+    ranges of equal length, and each range is summarized by a worker process
+    with its own read-only connection to ``db_file``. The partial aggregates
+    are then merged, so a period that spans two ranges is added up. Category
+    trends are read from the rollups, which is already cheap, as in
+    ReportService.
+
+    With several workers, summaries always read ``db_file``, the primary, even
+    when ``database`` routes reads to replicas: the date range of an unbounded
+    filter is looked up on a read-only connection to it as well. A summary
+    therefore includes every committed expense, whatever the read position of
+    the caller.
+
+    Attributes:
+        database (Database): The database stored in ``db_file``, possibly
+            wrapped; category trends are read through it.
+        db_file (str): The SQLite file the summaries read.
+        workers (int): Number of worker processes.
+        chunks_per_worker (int): Ranges per worker, to even out the load.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        db_file: str,
+        workers: Optional[int] = None,
+        chunks_per_worker: int = 2,
+    ):
+        """Initialize the ParallelReportService.
+
+        Args:
+            database (Database): The database stored in ``db_file``, possibly
+                wrapped.
+            db_file (str): Path of the SQLite file; in-memory databases cannot
+                be shared with other processes.
+            workers (Optional[int]): Number of worker processes; defaults to the
+                number of CPUs. With one worker summaries run in-process.
+            chunks_per_worker (int): Ranges per worker.
+
+        Raises:
+            ValueError: If ``db_file`` is ":memory:" or ``workers`` is not positive.
+        """
+        super().__init__(database)
+        if db_file == ":memory:":
+            raise ValueError("Parallel reports need a database file")
+        self.db_file = db_file
+        self.workers = workers or os.cpu_count() or 1
+        if self.workers < 1:
+            raise ValueError("workers must be positive")
+        self.chunks_per_worker = chunks_per_worker
+        self._executor = None
+        self._primary: Optional[SQLiteDatabase] = None
+        self._lock = threading.Lock()
+
+    def close(self):
+        """Stop the worker processes."""
+        with self._lock:
+            if self._executor:
+                self._executor.shutdown()
+                self._executor = None
+            if self._primary:
+                self._primary.close()
+                self._primary = None
+
+    def _summarize(self, period: str, filter: ExpenseFilter) -> List[PeriodSummary]:
+        if self.workers == 1:
+            return super()._summarize(period, filter)
+        filter.validate()
+
+        category_filter = filter.category.value if filter.category else None
+        from_date, to_date = self._date_range(filter, category_filter)
+        if from_date is None or from_date > to_date:
+            return []
+
+        executor = self._get_executor()
+        futures = [
+            executor.submit(_summarize_range, period, start, end, category_filter)
+            for start, end in split_date_range(
+                from_date, to_date, self.workers * self.chunks_per_worker
+            )
+        ]
+        totals: dict[tuple[str, str], tuple[Decimal, int]] = {}
+        for future in futures:
+            for db_summary in future.result():
+                key = (db_summary.period, db_summary.category)
+                total, count = totals.get(key, (Decimal(0), 0))
+                totals[key] = (total + db_summary.total, count + db_summary.count)
+
+        return self._fold(
+            DbSummary(period=key[0], category=key[1], total=total, count=count)
+            for key, (total, count) in sorted(totals.items())
+        )
+
+    def _date_range(self, filter, category_filter):
+        """The filter's dates, with open ends closed by the monthly rollups."""
+        if filter.from_date and filter.to_date:
+            return filter.from_date, filter.to_date
+        months = self._get_primary().get_category_trends(
+            "month", filter.from_date, filter.to_date, category_filter
+        )
+        if not months:
+            return None, None
+        first = date.fromisoformat(f"{months[0].period}-01")
+        last_month = date.fromisoformat(f"{months[-1].period}-01")
+        last = (last_month + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+        return filter.from_date or first, filter.to_date or last
+
+    def _get_primary(self) -> SQLiteDatabase:
+        with self._lock:
+            if self._primary is None:
+                self._primary = SQLiteDatabase(
+                    self.db_file, pool_size=1, read_only=True
+                )
+            return self._primary
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Forking a multi-threaded server would copy locks held by
+                # its other threads, such as the connection pool's.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_open_worker_database,
+                    initargs=(self.db_file,),
+                )
+            return self._executor
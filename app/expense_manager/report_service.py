@@ -0,0 +1,138 @@
+from typing import Dict, List
+from app.external.database import Database, ROLLUP_PERIODS
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.models.category import Category
+from app.models.summary import ExpenseTotal, PeriodSummary, TrendPoint
+
+
+class ReportService:
+    """A service class for expense reports.
+
+    Aggregates are computed by the database, so reports never load individual
+    expenses into Python.
+
+    Attributes:
+        database (Database): An instance of Database to aggregate expenses with.
+    """
+
+    def __init__(self, database: Database):
+        """Initialize the ReportService.
+
+        Args:
+            database (Database): An instance of Database to aggregate expenses with.
+        """
+        self.database = database
+
+    def close(self):
+        """Release the resources of the service; the database stays open."""
+
+    def monthly_summary(self, filter: ExpenseFilter) -> List[PeriodSummary]:
+        """Summarize the expenses that match the filter per calendar month.
+
+        Args:
+            filter (ExpenseFilter): The filter to apply to the expenses.
+
+        Returns:
+            List[PeriodSummary]: One summary per month with expenses, in
+                                 chronological order. Periods look like "2023-04".
+
+        Raises:
+            ValueError: If the filter is invalid (e.g., from_date is after to_date).
+        """
+        return self._summarize("month", filter)
+
+    def yearly_summary(self, filter: ExpenseFilter) -> List[PeriodSummary]:
+        """Summarize the expenses that match the filter per calendar year.
+
+        Args:
+            filter (ExpenseFilter): The filter to apply to the expenses.
+
+        Returns:
+            List[PeriodSummary]: One summary per year with expenses, in
+                                 chronological order. Periods look like "2023".
+
+        Raises:
+            ValueError: If the filter is invalid (e.g., from_date is after to_date).
+        """
+        return self._summarize("year", filter)
+
+    def category_trends(
+        self, filter: ExpenseFilter, granularity: str = "month"
+    ) -> Dict[Category, List[TrendPoint]]:
+        """Spending per category over time, read from the precomputed rollups.
+
+        Days or months that overlap the filter's date range are included whole.
+
+        Args:
+            filter (ExpenseFilter): The date range and category to report on.
+            granularity (str): Either "day" or "month".
+
+        Returns:
+            Dict[Category, List[TrendPoint]]: The chronological series of each
+                                              category that has expenses.
+
+        Raises:
+            ValueError: If the filter or the granularity is invalid.
+        """
+        filter.validate()
+        if granularity not in ROLLUP_PERIODS:
+            raise ValueError(f"granularity must be one of: {', '.join(ROLLUP_PERIODS)}")
+
+        category_filter = filter.category.value if filter.category else None
+        db_summaries = self.database.get_category_trends(
+            granularity, filter.from_date, filter.to_date, category_filter
+        )
+        trends: Dict[Category, List[TrendPoint]] = {}
+        for db_summary in db_summaries:
+            trends.setdefault(Category(db_summary.category), []).append(
+                TrendPoint(
+                    period=db_summary.period,
+                    total=db_summary.total,
+                    count=db_summary.count,
+                )
+            )
+        return trends
+
+    def total(self, filter: ExpenseFilter) -> ExpenseTotal:
+        """Total spent on the expenses that match the filter.
+
+        Read from running totals that the database keeps per category and day,
+        so the cost does not depend on how many expenses match.
+
+        Args:
+            filter (ExpenseFilter): The date range and category to add up.
+
+        Returns:
+            ExpenseTotal: The sum of the amounts and the number of expenses.
+
+        Raises:
+            ValueError: If the filter is invalid (e.g., from_date is after to_date).
+        """
+        filter.validate()
+
+        category_filter = filter.category.value if filter.category else None
+        db_total = self.database.get_expense_total(
+            filter.from_date, filter.to_date, category_filter
+        )
+        return ExpenseTotal(total=db_total.total, count=db_total.count)
+
+    def _summarize(self, period: str, filter: ExpenseFilter) -> List[PeriodSummary]:
+        filter.validate()
+
+        category_filter = filter.category.value if filter.category else None
+        db_summaries = self.database.summarize_expenses(
+            period, filter.from_date, filter.to_date, category_filter
+        )
+        return self._fold(db_summaries)
+
+    def _fold(self, db_summaries) -> List[PeriodSummary]:
+        """Fold per-category rows, ordered by period, into PeriodSummary objects."""
+        summaries: Dict[str, PeriodSummary] = {}
+        for db_summary in db_summaries:
+            summary = summaries.setdefault(
+                db_summary.period, PeriodSummary(period=db_summary.period)
+            )
+            summary.total += db_summary.total
+            summary.count += db_summary.count
+            summary.by_category[Category(db_summary.category)] = db_summary.total
+        return list(summaries.values())
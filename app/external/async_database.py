@@ -0,0 +1,193 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from itertools import islice
+from typing import AsyncIterator, Optional
+from app.external.database import (
+    Database,
+    DbExpense,
+    DbSummary,
+    DbTotal,
+    ExpenseRow,
+)
+
+
+# Rows read on a reader thread and handed to the event loop at a time.
+ITER_BATCH_ROWS = 500
+
+
+class AsyncDatabase:
+    """Exposes a synchronous Database to asyncio code without blocking the loop.
+
+    Reads run on a pool of ``read_workers`` threads; writes run on a single
+    writer thread, so they are serialized in the order they were submitted
+    and never compete with each other for the SQLite write lock. With
+    ``read_workers=0`` reads are sent to the writer thread too, which is what
+    backends that are not safe to call from several threads need.
+
+    Each call runs in a copy of the caller's context, so context variables
+    such as the ReadSession of ReplicatedDatabase reach the database.
+
+    Attributes:
+        database (Database): The wrapped synchronous database.
+    """
+
+    def __init__(self, database: Database, read_workers: int = 4):
+        self.database = database
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="db-writer")
+        self._readers = (
+            ThreadPoolExecutor(read_workers, thread_name_prefix="db-reader")
+            if read_workers
+            else self._writer
+        )
+
+    async def save_expense(self, expense) -> DbExpense:
+        return await self._write(self.database.save_expense, expense)
+
+    async def save_expenses(self, expenses) -> list[DbExpense]:
+        return await self._write(self.database.save_expenses, list(expenses))
+
+    async def get_last_expense(self) -> Optional[DbExpense]:
+        return await self._read(self.database.get_last_expense)
+
+    async def get_expense_count(self) -> int:
+        return await self._read(self.database.get_expense_count)
+
+    async def find_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+        limit: Optional[int] = None,
+        after: Optional[tuple[date, int]] = None,
+    ) -> list[DbExpense]:
+        return await self._read(
+            self.database.find_expenses_by_filter,
+            from_date,
+            to_date,
+            category,
+            limit=limit,
+            after=after,
+        )
+
+    def iter_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> AsyncIterator[DbExpense]:
+        """Stream matching expenses in insertion order; see ``_stream``."""
+        return self._stream(
+            self.database.iter_expenses_by_filter, from_date, to_date, category
+        )
+
+    def iter_expense_rows(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> AsyncIterator[ExpenseRow]:
+        """Stream matching expenses as ExpenseRow tuples; see ``_stream``."""
+        return self._stream(
+            self.database.iter_expense_rows, from_date, to_date, category
+        )
+
+    async def search_expenses(
+        self,
+        search: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbExpense]:
+        return await self._read(
+            self.database.search_expenses, search, from_date, to_date, category
+        )
+
+    async def summarize_expenses(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        return await self._read(
+            self.database.summarize_expenses, period, from_date, to_date, category
+        )
+
+    async def get_category_trends(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        return await self._read(
+            self.database.get_category_trends, period, from_date, to_date, category
+        )
+
+    async def get_expense_total(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> DbTotal:
+        return await self._read(
+            self.database.get_expense_total, from_date, to_date, category
+        )
+
+    def close(self):
+        """Wait for the submitted calls to finish and stop the worker threads."""
+        self._readers.shutdown()
+        self._writer.shutdown()
+
+    async def _stream(self, iterate, *args) -> AsyncIterator:
+        """Iterate over ``iterate(*args)`` without blocking the event loop.
+
+        The synchronous iterator is advanced ``ITER_BATCH_ROWS`` rows at a time,
+        each batch in its own call on the reader pool, so a stream only holds a
+        reader thread while a batch is read and a slow consumer never keeps one
+        waiting. Every batch runs in the same copy of the caller's context.
+        Closing the iterator early closes the synchronous one, which releases
+        its connection.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        # A cancelled consumer can close the rows while a batch is still being
+        # read on another thread.
+        lock = threading.Lock()
+
+        def in_context(function, *args):
+            with lock:
+                return context.run(function, *args)
+
+        def next_batch():
+            return list(islice(rows, ITER_BATCH_ROWS))
+
+        rows = await loop.run_in_executor(self._readers, in_context, iterate, *args)
+        try:
+            while batch := await loop.run_in_executor(
+                self._readers, in_context, next_batch
+            ):
+                for row in batch:
+                    yield row
+        finally:
+            close = getattr(rows, "close", None)
+            if close:
+                await loop.run_in_executor(self._readers, in_context, close)
+
+    async def _read(self, function, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._readers,
+            contextvars.copy_context().run,
+            functools.partial(function, *args, **kwargs),
+        )
+
+    async def _write(self, function, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._writer,
+            contextvars.copy_context().run,
+            functools.partial(function, *args, **kwargs),
+        )
@@ -0,0 +1,328 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from decimal import Decimal
+from itertools import compress
+from typing import Iterator, Optional
+from app.external.database import (
+    Database,
+    DbExpense,
+    DbSummary,
+    DbTotal,
+    ExpenseRow,
+    SUMMARY_PERIODS,
+    from_cents,
+    from_day,
+    rollup_deltas,
+    to_cents,
+)
+from app.external.running_totals import RunningTotals
+from app.external.search_index import InvertedIndex
+from app.models.category import Category
+
+
+CATEGORY_NAMES = [category.value for category in Category]
+CATEGORY_CODES = {name: code for code, name in enumerate(CATEGORY_NAMES)}
+
+# bytes.translate tables turning the category column into a 0/1 mask per code.
+CATEGORY_MASK_TABLES = [
+    bytes(1 if value == code else 0 for value in range(256))
+    for code in range(len(CATEGORY_NAMES))
+]
+
+# Batches larger than this rebuild the date index with one sort instead of
+# inserting every row into it.
+INDEX_REBUILD_THRESHOLD = 1000
+
+
+class ColumnarDatabase(Database):
+    """An in-memory database that stores each expense field in a compact array.
+
+    Amounts are integer cents, dates are proleptic Gregorian ordinals,
+    categories are one-byte codes and descriptions are indices into a pool of
+    distinct strings. Expense ids are row positions plus one. A secondary index
+    keeps the rows sorted by (date, id), so date ranges are found by binary
+    search. Amounts are stored with cent precision.
+
+    Writes fill the columns and the index under a lock, and reads select their
+    rows under the same lock. Rows are never changed once written and the
+    columns only grow, so the selected rows are read from the columns after the
+    lock is released, which lets a stream outlive it.
+    """
+
+    def __init__(self):
+        self._cents = array("q")
+        self._days = array("i")
+        self._categories = array("B")
+        self._descriptions = array("I")
+        self._strings = [None]
+        self._string_ids = {}
+        self._sorted_days = array("i")
+        self._sorted_rows = array("I")
+        self.rollups = {}
+        self.running_totals = RunningTotals()
+        self.search_index = InvertedIndex()
+        self._lock = threading.Lock()
+
+    def save_expense(self, expense) -> DbExpense:
+        return self.save_expenses([expense])[0]
+
+    def save_expenses(self, expenses) -> list[DbExpense]:
+        expenses = list(expenses)
+        with self._lock:
+            return self._save_expenses(expenses)
+
+    def _save_expenses(self, expenses) -> list[DbExpense]:
+        # Converted before any column grows, so a value that does not fit its
+        # column leaves every column as it was.
+        cents = array("q", [to_cents(expense.amount) for expense in expenses])
+        days = array("i", [expense.date.toordinal() for expense in expenses])
+        codes = array(
+            "B", [CATEGORY_CODES[expense.category.value] for expense in expenses]
+        )
+
+        first_row = len(self._days)
+        self._cents.extend(cents)
+        self._days.extend(days)
+        self._categories.extend(codes)
+        db_expenses = []
+        for row, expense in enumerate(expenses, start=first_row):
+            self._descriptions.append(self._intern(expense.description))
+            self.search_index.add(row + 1, expense.description)
+            self.running_totals.add(
+                self._days[row], expense.category.value, self._cents[row]
+            )
+            db_expenses.append(self._materialize(row))
+
+        if len(db_expenses) > INDEX_REBUILD_THRESHOLD:
+            self._rebuild_index()
+        else:
+            for row in range(first_row, len(self._days)):
+                position = bisect_right(self._sorted_days, self._days[row])
+                self._sorted_days.insert(position, self._days[row])
+                self._sorted_rows.insert(position, row)
+
+        for key, (delta_cents, delta_count) in rollup_deltas(db_expenses).items():
+            total, count = self.rollups.get(key, (0, 0))
+            self.rollups[key] = (total + delta_cents, count + delta_count)
+        return db_expenses
+
+    def get_last_expense(self) -> Optional[DbExpense]:
+        with self._lock:
+            rows = len(self._days)
+        return self._materialize(rows - 1) if rows else None
+
+    def get_expense_count(self) -> int:
+        with self._lock:
+            return len(self._days)
+
+    def find_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+        limit: Optional[int] = None,
+        after: Optional[tuple[date, int]] = None,
+    ) -> list[DbExpense]:
+        if limit is None and after is None:
+            return list(self.iter_expenses_by_filter(from_date, to_date, category))
+
+        with self._lock:
+            start, end = self._date_range(from_date, to_date)
+            if after:
+                after_day = after[0].toordinal()
+                same_day = bisect_left(self._sorted_days, after_day)
+                next_day = bisect_right(self._sorted_days, after_day)
+                position = bisect_right(
+                    self._sorted_rows, after[1] - 1, same_day, next_day
+                )
+                start = max(start, position)
+            rows = self._select(self._sorted_rows[start:end], category)
+        if limit is not None:
+            rows = rows[:limit]
+        return [self._materialize(row) for row in rows]
+
+    def iter_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Iterator[DbExpense]:
+        rows = self._matching_rows(from_date, to_date, category)
+        return (self._materialize(row) for row in rows)
+
+    def iter_expense_rows(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Iterator[ExpenseRow]:
+        rows = self._matching_rows(from_date, to_date, category)
+        return (
+            (
+                row + 1,
+                self._cents[row],
+                self._days[row],
+                CATEGORY_NAMES[self._categories[row]],
+                self._strings[self._descriptions[row]],
+            )
+            for row in rows
+        )
+
+    def search_expenses(
+        self,
+        search: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbExpense]:
+        first_day = from_date.toordinal() if from_date else None
+        last_day = to_date.toordinal() if to_date else None
+        code = CATEGORY_CODES.get(category) if category else None
+        if category and code is None:
+            return []
+        # Every column of a row is written before the row is indexed.
+        rows = (expense_id - 1 for expense_id, _ in self.search_index.search(search))
+        return [
+            self._materialize(row)
+            for row in rows
+            if (first_day is None or self._days[row] >= first_day)
+            and (last_day is None or self._days[row] <= last_day)
+            and (code is None or self._categories[row] == code)
+        ]
+
+    def summarize_expenses(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        length = SUMMARY_PERIODS[period]
+        periods: dict[int, str] = {}
+        totals: dict[tuple[str, int], tuple[int, int]] = {}
+        for row in self._matching_rows(from_date, to_date, category):
+            day = self._days[row]
+            if day not in periods:
+                periods[day] = date.fromordinal(day).isoformat()[:length]
+            key = (periods[day], self._categories[row])
+            total, count = totals.get(key, (0, 0))
+            totals[key] = (total + self._cents[row], count + 1)
+
+        return sorted(
+            (
+                DbSummary(
+                    period=key[0],
+                    category=CATEGORY_NAMES[key[1]],
+                    total=Decimal(cents).scaleb(-2),
+                    count=count,
+                )
+                for key, (cents, count) in totals.items()
+            ),
+            key=lambda summary: (summary.period, summary.category),
+        )
+
+    def get_expense_total(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> DbTotal:
+        cents, count = self.running_totals.total(
+            from_date.toordinal() if from_date else None,
+            to_date.toordinal() if to_date else None,
+            category,
+        )
+        return DbTotal(total=Decimal(cents).scaleb(-2), count=count)
+
+    def get_category_trends(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        length = SUMMARY_PERIODS[period]
+        first = from_date.isoformat()[:length] if from_date else None
+        last = to_date.isoformat()[:length] if to_date else None
+        return [
+            DbSummary(
+                period=key[1],
+                category=key[2],
+                total=Decimal(cents).scaleb(-2),
+                count=count,
+            )
+            for key, (cents, count) in sorted(self._rollup_items())
+            if key[0] == period
+            and (first is None or key[1] >= first)
+            and (last is None or key[1] <= last)
+            and (category is None or key[2] == category)
+        ]
+
+    def _rollup_items(self):
+        with self._lock:
+            return list(self.rollups.items())
+
+    def _matching_rows(self, from_date, to_date, category):
+        """Matching row positions in insertion order."""
+        with self._lock:
+            return self._select_rows(from_date, to_date, category)
+
+    def _select_rows(self, from_date, to_date, category):
+        if not from_date and not to_date:
+            if not category:
+                return range(len(self._days))
+            if category not in CATEGORY_CODES:
+                return []
+            mask = self._categories.tobytes().translate(
+                CATEGORY_MASK_TABLES[CATEGORY_CODES[category]]
+            )
+            return compress(range(len(self._days)), mask)
+
+        start, end = self._date_range(from_date, to_date)
+        rows = self._sorted_rows[start:end]
+        return sorted(self._select(rows, category))
+
+    def _select(self, rows, category):
+        if not category:
+            return rows
+        if category not in CATEGORY_CODES:
+            return []
+        codes = map(self._categories.__getitem__, rows)
+        return list(compress(rows, map(CATEGORY_CODES[category].__eq__, codes)))
+
+    def _date_range(self, from_date, to_date):
+        start = (
+            bisect_left(self._sorted_days, from_date.toordinal()) if from_date else 0
+        )
+        end = (
+            bisect_right(self._sorted_days, to_date.toordinal())
+            if to_date
+            else len(self._sorted_days)
+        )
+        return start, max(start, end)
+
+    def _rebuild_index(self):
+        order = sorted(range(len(self._days)), key=self._days.__getitem__)
+        self._sorted_rows = array("I", order)
+        self._sorted_days = array("i", (self._days[row] for row in order))
+
+    def _intern(self, description):
+        if description is None:
+            return 0
+        string_id = self._string_ids.get(description)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(description)
+            self._string_ids[description] = string_id
+        return string_id
+
+    def _materialize(self, row) -> DbExpense:
+        return DbExpense(
+            id=row + 1,
+            amount=from_cents(self._cents[row]),
+            date=from_day(self._days[row]),
+            category=CATEGORY_NAMES[self._categories[row]],
+            description=self._strings[self._descriptions[row]],
+        )
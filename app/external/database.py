@@ -1,12 +1,20 @@
 from abc import ABC, abstractmethod
+from contextlib import closing, contextmanager
 from dataclasses import dataclass
 from datetime import date
-from decimal import Decimal
-from typing import Optional
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from typing import Generator, Iterator, Optional, Sequence
+import itertools
+from pathlib import Path
 import sqlite3
+import threading
+import time
+from app.external.running_totals import MAX_DAY, RunningTotals, prefix_positions
+from app.external.search_index import InvertedIndex, search_terms
 
 
-@dataclass
+@dataclass(slots=True)
 class DbExpense:
     id: int
     amount: Decimal
@@ -15,11 +23,331 @@ class DbExpense:
     description: Optional[str] = None
 
 
+# A matching expense as a plain (id, amount_cents, day, category, description)
+# tuple, where day is date.toordinal(). Cheaper to build than a DbExpense and
+# enough for code that writes expenses straight to a response.
+ExpenseRow = tuple[int, int, int, str, Optional[str]]
+
+
+@dataclass
+class PoolMetrics:
+    max_size: int
+    size: int
+    in_use: int
+    idle: int
+    created: int
+    reused: int
+    discarded: int
+    waits: int
+    timeouts: int
+
+
+@dataclass(frozen=True)
+class SQLiteProfile:
+    """Durability and performance settings applied to every pooled connection.
+
+    ``busy_timeout`` is in milliseconds. ``mmap_size`` is in bytes and
+    ``cache_size`` follows SQLite's convention: negative values are KiB,
+    positive values are pages. ``checkpoint_interval`` is the number of commits
+    between passive WAL checkpoints; 0 leaves checkpointing to SQLite.
+    """
+
+    journal_mode: str = "DELETE"
+    synchronous: str = "FULL"
+    busy_timeout: int = 5000
+    mmap_size: int = 0
+    cache_size: int = -2000
+    checkpoint_interval: int = 0
+
+    def pragmas(self) -> dict:
+        return {
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "busy_timeout": self.busy_timeout,
+            "mmap_size": self.mmap_size,
+            "cache_size": self.cache_size,
+        }
+
+
+# The defaults of Python's sqlite3 module: rollback journal, fsync on every commit.
+DURABLE_PROFILE = SQLiteProfile()
+
+# Readers never block on writers and commits skip the fsync of the WAL;
+# a power loss can drop the last transactions but never corrupts the file.
+PERFORMANCE_PROFILE = SQLiteProfile(
+    journal_mode="WAL",
+    synchronous="NORMAL",
+    busy_timeout=5000,
+    mmap_size=256 * 1024 * 1024,
+    cache_size=-64000,
+    checkpoint_interval=1000,
+)
+
+SQLITE_PROFILES = {
+    "durable": DURABLE_PROFILE,
+    "performance": PERFORMANCE_PROFILE,
+}
+
+
+class ConnectionPool:
+    """A bounded pool of SQLite connections shared between threads.
+
+    A thread that already holds a connection gets the same connection back when
+    it asks again, so nested calls never wait for themselves. Idle connections
+    are health-checked before reuse once they have been idle for longer than
+    ``health_check_interval`` seconds.
+
+    ``observer``, when set, is called as ``observer(event, seconds)`` with the
+    time each checkout ("acquire") and each new connection ("connect") took.
+    With ``read_only`` the file is opened with SQLite's ``mode=ro``.
+    """
+
+    def __init__(
+        self,
+        db_file,
+        max_size=5,
+        timeout=30.0,
+        pragmas=None,
+        health_check_interval=30.0,
+        read_only=False,
+    ):
+        if max_size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.db_file = db_file
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = dict(pragmas or {})
+        self.health_check_interval = health_check_interval
+        self.read_only = read_only
+        self._condition = threading.Condition()
+        self._idle = []
+        self._leases = {}
+        self._size = 0
+        self._closed = False
+        self._created = 0
+        self._reused = 0
+        self._discarded = 0
+        self._waits = 0
+        self._timeouts = 0
+        self.observer = None
+
+    @contextmanager
+    def connection(self):
+        owner = threading.get_ident()
+        with self._condition:
+            lease = self._leases.get(owner)
+            if lease is not None:
+                lease[1] += 1
+        if lease is None:
+            observer = self.observer
+            if observer:
+                start = time.perf_counter()
+            conn = self._acquire()
+            if observer:
+                observer("acquire", time.perf_counter() - start)
+            lease = [conn, 1]
+            with self._condition:
+                self._leases[owner] = lease
+        try:
+            yield lease[0]
+        finally:
+            self._return(owner, lease)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for conn, _ in idle:
+            conn.close()
+
+    def metrics(self) -> PoolMetrics:
+        with self._condition:
+            return PoolMetrics(
+                max_size=self.max_size,
+                size=self._size,
+                in_use=self._size - len(self._idle),
+                idle=len(self._idle),
+                created=self._created,
+                reused=self._reused,
+                discarded=self._discarded,
+                waits=self._waits,
+                timeouts=self._timeouts,
+            )
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise TimeoutError("Timed out waiting for a database connection")
+                self._waits += 1
+                self._condition.wait(remaining)
+
+        if conn is not None:
+            if time.monotonic() - last_used < self.health_check_interval:
+                self._count("_reused")
+                return conn
+            if self._is_healthy(conn):
+                self._count("_reused")
+                return conn
+            self._count("_discarded")
+            conn.close()
+
+        start = time.perf_counter()
+        try:
+            conn = self._open()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        if self.observer:
+            self.observer("connect", time.perf_counter() - start)
+        self._count("_created")
+        return conn
+
+    def _return(self, owner, lease):
+        with self._condition:
+            lease[1] -= 1
+            if lease[1] > 0:
+                return
+            del self._leases[owner]
+        conn = lease[0]
+        if conn.in_transaction:
+            conn.rollback()
+        with self._condition:
+            if self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._condition.notify()
+        if conn is not None:
+            conn.close()
+
+    def _open(self):
+        if self.read_only:
+            conn = sqlite3.connect(
+                f"{Path(self.db_file).resolve().as_uri()}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+            )
+        else:
+            conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _count(self, counter):
+        with self._condition:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+@dataclass
+class DbSummary:
+    period: str
+    category: str
+    total: Decimal
+    count: int
+
+
+@dataclass
+class DbTotal:
+    total: Decimal
+    count: int
+
+
+@dataclass
+class RollupMismatch:
+    granularity: str
+    period: str
+    category: str
+    expected_total: Decimal
+    expected_count: int
+    actual_total: Decimal
+    actual_count: int
+
+
+# Length of the ISO date prefix that identifies each summary period.
+SUMMARY_PERIODS = {"day": 10, "month": 7, "year": 4}
+
+# Granularities of the per-category rollups maintained on every insert.
+ROLLUP_PERIODS = ("day", "month")
+
+
+# The largest amount in cents that fits the int64 columns of every backend.
+MAX_CENTS = 2**63 - 1
+
+
+def to_cents(amount: Decimal) -> int:
+    # Half away from zero, like the ROUND() of the version 1 migration.
+    return int((amount * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+# Amounts and dates repeat a lot, and a cache hit is several times cheaper than
+# building a new Decimal or date. Both types are immutable, so sharing is safe.
+@lru_cache(maxsize=65536)
+def from_cents(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
+
+
+@lru_cache(maxsize=65536)
+def from_day(day: int) -> date:
+    return date.fromordinal(day)
+
+
+def to_expense_row(expense: DbExpense) -> ExpenseRow:
+    return (
+        expense.id,
+        to_cents(expense.amount),
+        expense.date.toordinal(),
+        expense.category,
+        expense.description,
+    )
+
+
+def rollup_deltas(expenses) -> dict[tuple[str, str, str], tuple[int, int]]:
+    """Aggregate expenses into {(granularity, period, category): (cents, count)}."""
+    deltas: dict[tuple[str, str, str], tuple[int, int]] = {}
+    for expense in expenses:
+        day = expense.date.isoformat()
+        cents = to_cents(expense.amount)
+        for granularity in ROLLUP_PERIODS:
+            key = (granularity, day[: SUMMARY_PERIODS[granularity]], expense.category)
+            total, count = deltas.get(key, (0, 0))
+            deltas[key] = (total + cents, count + 1)
+    return deltas
+
+
 class Database(ABC):
     @abstractmethod
     def save_expense(self, expense) -> DbExpense:
         pass
 
+    @abstractmethod
+    def save_expenses(self, expenses) -> list[DbExpense]:
+        pass
+
     @abstractmethod
     def get_last_expense(self) -> Optional[DbExpense]:
         pass
@@ -34,24 +362,141 @@ class Database(ABC):
         from_date: Optional[date],
         to_date: Optional[date],
         category: Optional[str],
+        limit: Optional[int] = None,
+        after: Optional[tuple[date, int]] = None,
     ) -> list[DbExpense]:
+        """Find expenses matching the filter.
+
+        Without ``limit`` and ``after`` expenses are returned in insertion order.
+        With either of them the expenses are ordered by (date, id), ``after`` is
+        the exclusive (date, id) keyset position to continue from and ``limit``
+        caps the number of expenses returned.
+        """
+        pass
+
+    @abstractmethod
+    def iter_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Iterator[DbExpense]:
+        pass
+
+    def iter_expense_rows(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Iterator[ExpenseRow]:
+        """Like ``iter_expenses_by_filter``, but yields ExpenseRow tuples.
+
+        Backends that hold cents and day numbers natively override this to
+        skip building DbExpense objects.
+        """
+        for expense in self.iter_expenses_by_filter(from_date, to_date, category):
+            yield to_expense_row(expense)
+
+    def close(self):
+        """Release connections and threads; in-memory backends hold none."""
+
+    @abstractmethod
+    def search_expenses(
+        self,
+        search: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbExpense]:
+        """Find matching expenses whose description contains every search term.
+
+        Terms are split by ``search_terms``. Expenses are ranked by BM25
+        relevance, best first, and ties are ordered by id.
+        """
+        pass
+
+    @abstractmethod
+    def summarize_expenses(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        """Total and count of matching expenses per period and category.
+
+        ``period`` is one of ``SUMMARY_PERIODS``; periods are ISO date prefixes
+        such as "2023-04" or "2023". Rows are ordered by period and category.
+        """
+        pass
+
+    @abstractmethod
+    def get_expense_total(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> DbTotal:
+        """Total and count of matching expenses, from running totals kept on insert.
+
+        The cost does not depend on the number of expenses or on the length of
+        the date range.
+        """
+        pass
+
+    @abstractmethod
+    def get_category_trends(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        """Per-category totals read from the rollups maintained on insert.
+
+        ``period`` is one of ``ROLLUP_PERIODS``. Periods that overlap the date
+        range are included whole. Rows are ordered by period and category.
+        """
         pass
 
 
 class MockDatabase(Database):
     def __init__(self):
         self.expenses = []
+        self.rollups = {}
+        self.running_totals = RunningTotals()
+        self.search_index = InvertedIndex()
 
     def save_expense(self, expense) -> DbExpense:
-        db_expense = DbExpense(
-            id=len(self.expenses) + 1,
-            amount=expense.amount,
-            date=expense.date,
-            category=expense.category.value,
-            description=expense.description,
-        )
-        self.expenses.append(db_expense)
-        return db_expense
+        return self.save_expenses([expense])[0]
+
+    def save_expenses(self, expenses) -> list[DbExpense]:
+        # Everything derived from the expenses is computed before anything is
+        # stored, so a failure leaves the store as it was, as a rolled back
+        # SQLite transaction would.
+        db_expenses = [
+            DbExpense(
+                id=len(self.expenses) + position,
+                amount=expense.amount,
+                date=expense.date,
+                category=expense.category.value,
+                description=expense.description,
+            )
+            for position, expense in enumerate(expenses, start=1)
+        ]
+        cents = [to_cents(db_expense.amount) for db_expense in db_expenses]
+        deltas = rollup_deltas(db_expenses)
+
+        self.expenses.extend(db_expenses)
+        for db_expense, expense_cents in zip(db_expenses, cents):
+            self.search_index.add(db_expense.id, db_expense.description)
+            self.running_totals.add(
+                db_expense.date.toordinal(), db_expense.category, expense_cents
+            )
+        for key, (total_cents, count) in deltas.items():
+            total, previous_count = self.rollups.get(key, (0, 0))
+            self.rollups[key] = (total + total_cents, previous_count + count)
+        return db_expenses
 
     def get_last_expense(self) -> Optional[DbExpense]:
         return self.expenses[-1] if self.expenses else None
@@ -64,73 +509,601 @@ class MockDatabase(Database):
         from_date: Optional[date],
         to_date: Optional[date],
         category: Optional[str],
+        limit: Optional[int] = None,
+        after: Optional[tuple[date, int]] = None,
     ) -> list[DbExpense]:
-        def predicate(expense):
-            if from_date and expense.date < from_date:
-                return False
-            if to_date and expense.date > to_date:
-                return False
-            if category and expense.category != category:
-                return False
-            return True
+        expenses = self.iter_expenses_by_filter(from_date, to_date, category)
+        if limit is None and after is None:
+            return list(expenses)
+
+        ordered = sorted(expenses, key=lambda expense: (expense.date, expense.id))
+        if after:
+            ordered = [
+                expense for expense in ordered if (expense.date, expense.id) > after
+            ]
+        return ordered[:limit]
+
+    def iter_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Iterator[DbExpense]:
+        return (
+            expense
+            for expense in self.expenses
+            if self._matches(expense, from_date, to_date, category)
+        )
+
+    def search_expenses(
+        self,
+        search: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbExpense]:
+        return [
+            self.expenses[expense_id - 1]
+            for expense_id, _ in self.search_index.search(search)
+            if self._matches(
+                self.expenses[expense_id - 1], from_date, to_date, category
+            )
+        ]
+
+    def _matches(self, expense, from_date, to_date, category):
+        if from_date and expense.date < from_date:
+            return False
+        if to_date and expense.date > to_date:
+            return False
+        if category and expense.category != category:
+            return False
+        return True
+
+    def summarize_expenses(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        length = SUMMARY_PERIODS[period]
+        totals: dict[tuple[str, str], tuple[int, int]] = {}
+        for expense in self.iter_expenses_by_filter(from_date, to_date, category):
+            key = (expense.date.isoformat()[:length], expense.category)
+            total, count = totals.get(key, (0, 0))
+            totals[key] = (total + to_cents(expense.amount), count + 1)
+
+        return [
+            DbSummary(
+                period=key[0],
+                category=key[1],
+                total=Decimal(cents).scaleb(-2),
+                count=count,
+            )
+            for key, (cents, count) in sorted(totals.items())
+        ]
+
+    def get_expense_total(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> DbTotal:
+        cents, count = self.running_totals.total(
+            from_date.toordinal() if from_date else None,
+            to_date.toordinal() if to_date else None,
+            category,
+        )
+        return DbTotal(total=Decimal(cents).scaleb(-2), count=count)
+
+    def get_category_trends(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        length = SUMMARY_PERIODS[period]
+        first = from_date.isoformat()[:length] if from_date else None
+        last = to_date.isoformat()[:length] if to_date else None
+        return [
+            DbSummary(
+                period=key[1],
+                category=key[2],
+                total=Decimal(cents).scaleb(-2),
+                count=count,
+            )
+            for key, (cents, count) in sorted(self.rollups.items())
+            if key[0] == period
+            and (first is None or key[1] >= first)
+            and (last is None or key[1] <= last)
+            and (category is None or key[2] == category)
+        ]
+
+
+# Managed secondary indexes, created or dropped at startup to match this mapping.
+# A category-only index is not needed: it is a prefix of the composite index.
+# The day index also covers category and amount_cents, so summaries over a date
+# range are answered from the index alone, already grouped by day.
+EXPENSE_INDEXES = {
+    "idx_expenses_day": "day, category, amount_cents",
+    "idx_expenses_category_day": "category, day",
+}
+MANAGED_INDEX_PREFIX = "idx_expenses_"
+
+# Rows fetched from the cursor at a time when streaming query results.
+FETCH_SIZE = 1000
 
-        return [expense for expense in self.expenses if predicate(expense)]
+# Storage format version, kept in PRAGMA user_version. Version 0, SQLite's
+# default, is the layout from before versioning existed, with amounts as DECIMAL
+# text and dates as ISO strings; version 1 stores integer cents and proleptic
+# Gregorian day numbers (date.toordinal()).
+SCHEMA_VERSION = 1
+
+# Adding this to a day number gives the Julian day that SQLite's date() expects.
+JULIAN_DAY_OFFSET = 1721424.5
+ISO_DATE_SQL = f"date(day + {JULIAN_DAY_OFFSET})"
+
+CREATE_EXPENSES = """
+    CREATE TABLE expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        amount_cents INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        description TEXT
+    )
+"""
+
+
+def migrate_to_integer_storage(conn):
+    """Rewrite a version 0 expenses table with integer cents and day numbers."""
+    sequence = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'expenses'"
+    ).fetchone()
+    conn.execute("ALTER TABLE expenses RENAME TO expenses_v0")
+    conn.execute(CREATE_EXPENSES)
+    # Dates written as datetimes carry a time suffix; only the day is kept.
+    conn.execute(
+        f"""
+        INSERT INTO expenses (id, amount_cents, day, category, description)
+        SELECT id, CAST(ROUND(amount * 100) AS INTEGER),
+               CAST(julianday(substr(date, 1, 10)) - {JULIAN_DAY_OFFSET} AS INTEGER),
+               category, description
+        FROM expenses_v0
+        ORDER BY id
+        """
+    )
+    conn.execute("DROP TABLE expenses_v0")
+    if sequence:
+        conn.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'expenses'",
+            sequence,
+        )
+
+
+# Upgrades from the version before each key to that version, applied in order.
+MIGRATIONS = {
+    1: migrate_to_integer_storage,
+}
+
+UPSERT_ROLLUP = """
+    INSERT INTO expense_rollups (granularity, period, category, total_cents, count)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (granularity, period, category) DO UPDATE SET
+        total_cents = total_cents + excluded.total_cents,
+        count = count + excluded.count
+"""
+
+# Running totals per category, stored as the nodes of a Fenwick tree over day
+# ordinals (see RunningTotals). Rows with the category ALL_CATEGORIES add up
+# every category. An insert adds to the at most 22 nodes covering its day, and a
+# range total is the difference of two prefix sums of at most 22 nodes each,
+# however many days and expenses there are.
+ALL_CATEGORIES = ""
+
+CREATE_RUNNING_TOTALS = """
+    CREATE TABLE IF NOT EXISTS expense_running_totals (
+        category TEXT NOT NULL,
+        node INTEGER NOT NULL,
+        total_cents INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (category, node)
+    ) WITHOUT ROWID
+"""
+DAY_TOTALS_QUERY = """
+    SELECT category, day, SUM(amount_cents), COUNT(*)
+    FROM expenses
+    GROUP BY category, day
+"""
+UPSERT_RUNNING_TOTAL = """
+    INSERT INTO expense_running_totals (category, node, total_cents, count)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (category, node) DO UPDATE SET
+        total_cents = total_cents + excluded.total_cents,
+        count = count + excluded.count
+"""
+
+# Full-text index of descriptions. It is an external content table, so it stores
+# only the index and reads descriptions from the expenses table; the trigger
+# keeps it in sync on insert.
+CREATE_SEARCH_INDEX = """
+    CREATE VIRTUAL TABLE expenses_fts USING fts5(
+        description, content = 'expenses', content_rowid = 'id'
+    )
+"""
+CREATE_SEARCH_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS expenses_fts_insert AFTER INSERT ON expenses
+    BEGIN
+        INSERT INTO expenses_fts (rowid, description)
+        VALUES (new.id, new.description);
+    END
+"""
+
+INSERT_EXPENSE = """
+    INSERT INTO expenses (amount_cents, day, category, description)
+    VALUES (?, ?, ?, ?)
+"""
+INSERT_EXPENSE_WITH_ID = """
+    INSERT INTO expenses (id, amount_cents, day, category, description)
+    VALUES (?, ?, ?, ?, ?)
+"""
 
 
 class SQLiteDatabase(Database):
-    def __init__(self, db_file="database.db"):
+    def __init__(
+        self,
+        db_file="database.db",
+        pool_size=5,
+        pool_timeout=30.0,
+        pragmas=None,
+        profile: SQLiteProfile = DURABLE_PROFILE,
+        read_only=False,
+    ):
         self.db_file = db_file
-        self.use_in_memory_connection = db_file == ":memory:"
-        self.connection = (
-            sqlite3.connect(self.db_file) if self.use_in_memory_connection else None
+        self.profile = profile
+        self._commits = itertools.count(1)
+        pragmas = {**profile.pragmas(), **(pragmas or {})}
+        if read_only:
+            # The journal mode and sync level belong to the writers.
+            del pragmas["journal_mode"], pragmas["synchronous"]
+        # Every connection to ":memory:" opens a separate database, so the
+        # in-memory database is served by a single shared connection.
+        self.pool = ConnectionPool(
+            db_file,
+            max_size=1 if db_file == ":memory:" else pool_size,
+            timeout=pool_timeout,
+            pragmas=pragmas,
+            read_only=read_only,
         )
-        self._create_table()
+        if read_only:
+            self._check_version()
+        else:
+            self._create_table()
+            self._create_indexes()
 
-    def _connect(self):
-        if self.connection:
-            return self.connection
-        return sqlite3.connect(self.db_file)
+    def close(self):
+        self.pool.close()
 
-    def close(self, conn):
-        if not self.use_in_memory_connection:
-            conn.close()
+    def pool_metrics(self) -> PoolMetrics:
+        return self.pool.metrics()
+
+    def journal_mode(self) -> str:
+        with self.pool.connection() as conn:
+            return conn.execute("PRAGMA journal_mode").fetchone()[0]
+
+    def checkpoint(self, mode="PASSIVE"):
+        """Copy committed WAL frames back into the database file.
+
+        Returns SQLite's ``(busy, log_frames, checkpointed_frames)`` triple.
+        Outside WAL mode SQLite reports ``(0, -1, -1)``.
+        """
+        if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            raise ValueError(f"Invalid checkpoint mode: {mode}")
+        with self.pool.connection() as conn:
+            return conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+    def backup(self, target_file):
+        """Copy a consistent snapshot of the database to ``target_file``."""
+        target = sqlite3.connect(target_file)
+        try:
+            with self.pool.connection() as conn:
+                conn.backup(target)
+        finally:
+            target.close()
+
+    def _after_commit(self):
+        interval = self.profile.checkpoint_interval
+        if interval and next(self._commits) % interval == 0:
+            self.checkpoint()
+
+    def schema_version(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def _check_version(self):
+        version = self.schema_version()
+        if version != SCHEMA_VERSION:
+            raise RuntimeError(
+                f"{self.db_file} uses storage version {version}, but version "
+                f"{SCHEMA_VERSION} is required to open it read-only"
+            )
 
     def _create_table(self):
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute(
+        with self.pool.connection() as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._migrate(conn)
+            has_rollups = conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE name = 'expense_rollups'"
+            ).fetchone()[0]
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS expense_rollups (
+                    granularity TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    total_cents INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (granularity, period, category)
+                ) WITHOUT ROWID
             """
-            CREATE TABLE IF NOT EXISTS expenses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                amount DECIMAL(10, 2) NOT NULL,
-                date DATE NOT NULL,
-                category TEXT NOT NULL,
-                description TEXT
             )
+            if not has_rollups:
+                self._rebuild_rollups(conn)
+            has_running_totals = conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master "
+                "WHERE name = 'expense_running_totals'"
+            ).fetchone()[0]
+            conn.execute(CREATE_RUNNING_TOTALS)
+            if not has_running_totals:
+                self._rebuild_running_totals(conn)
+            self._create_search_index(conn)
+
+    def _create_search_index(self, conn):
+        has_search_index = conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name = 'expenses_fts'"
+        ).fetchone()[0]
+        if not has_search_index:
+            conn.execute(CREATE_SEARCH_INDEX)
+            conn.execute("INSERT INTO expenses_fts (expenses_fts) VALUES ('rebuild')")
+        conn.execute(CREATE_SEARCH_TRIGGER)
+
+    def _migrate(self, conn):
+        """Create the expenses table or upgrade it to ``SCHEMA_VERSION``.
+
+        Runs inside the caller's transaction, so a failed upgrade leaves the
+        file as it was.
         """
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        has_expenses = conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name = 'expenses'"
+        ).fetchone()[0]
+        if not has_expenses:
+            conn.execute(CREATE_EXPENSES)
+        elif version > SCHEMA_VERSION:
+            raise RuntimeError(
+                f"{self.db_file} uses storage version {version}, "
+                f"newer than the supported version {SCHEMA_VERSION}"
+            )
+        else:
+            for target in range(version + 1, SCHEMA_VERSION + 1):
+                MIGRATIONS[target](conn)
+        if version != SCHEMA_VERSION:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _create_indexes(self):
+        with self.pool.connection() as conn, conn:
+            existing = {
+                name: sql
+                for name, sql in conn.execute(
+                    "SELECT name, sql FROM sqlite_master "
+                    "WHERE type = 'index' AND tbl_name = 'expenses' AND name LIKE ?",
+                    (MANAGED_INDEX_PREFIX + "%",),
+                )
+            }
+            created = False
+            for name, sql in list(existing.items()):
+                if name not in EXPENSE_INDEXES or not sql.endswith(
+                    f"({EXPENSE_INDEXES[name]})"
+                ):
+                    conn.execute(f"DROP INDEX {name}")
+                    del existing[name]
+            for name, columns in EXPENSE_INDEXES.items():
+                if name not in existing:
+                    conn.execute(f"CREATE INDEX {name} ON expenses ({columns})")
+                    created = True
+            if created:
+                conn.execute("ANALYZE expenses")
+
+    def explain(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        category: Optional[str] = None,
+    ) -> list[str]:
+        """Return SQLite's query plan for ``find_expenses_by_filter``."""
+        query, params = self._filter_query(from_date, to_date, category)
+        query += " ORDER BY id"
+        with self.pool.connection() as conn:
+            return [
+                row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)
+            ]
+
+    def rebuild_rollups(self):
+        """Recompute every rollup and running total from the expenses table."""
+        with self.pool.connection() as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._rebuild_rollups(conn)
+            self._rebuild_running_totals(conn)
+
+    def verify_rollups(self) -> list[RollupMismatch]:
+        """Compare the rollups with totals recomputed from the expenses table."""
+        with self.pool.connection() as conn:
+            actual = {
+                tuple(row[:3]): tuple(row[3:])
+                for row in conn.execute(
+                    "SELECT granularity, period, category, total_cents, count "
+                    "FROM expense_rollups"
+                )
+            }
+            expected = {
+                tuple(row[:3]): tuple(row[3:])
+                for row in conn.execute(self._rollup_query())
+            }
+            actual.update(
+                self._running_totals_by_key(
+                    conn.execute(
+                        "SELECT category, node, total_cents, count "
+                        "FROM expense_running_totals"
+                    )
+                )
+            )
+            expected.update(
+                self._running_totals_by_key(
+                    self._running_total_rows(conn.execute(DAY_TOTALS_QUERY))
+                )
+            )
+
+        return [
+            RollupMismatch(
+                granularity=key[0],
+                period=key[1],
+                category=key[2],
+                expected_total=Decimal(expected.get(key, (0, 0))[0]).scaleb(-2),
+                expected_count=expected.get(key, (0, 0))[1],
+                actual_total=Decimal(actual.get(key, (0, 0))[0]).scaleb(-2),
+                actual_count=actual.get(key, (0, 0))[1],
+            )
+            for key in sorted(expected.keys() | actual.keys())
+            if expected.get(key) != actual.get(key)
+        ]
+
+    def _rebuild_rollups(self, conn):
+        conn.execute("DELETE FROM expense_rollups")
+        conn.execute(
+            "INSERT INTO expense_rollups "
+            "(granularity, period, category, total_cents, count) "
+            + self._rollup_query()
         )
-        conn.commit()
-        self.close(conn)
 
-    def save_expense(self, expense) -> DbExpense:
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute(
+    def _rollup_query(self):
+        return " UNION ALL ".join(
+            f"""
+            SELECT '{granularity}',
+                   substr({ISO_DATE_SQL}, 1, {SUMMARY_PERIODS[granularity]}),
+                   category, SUM(amount_cents), COUNT(*)
+            FROM expenses
+            GROUP BY 2, 3
             """
-            INSERT INTO expenses (amount, date, category, description)
-            VALUES (?, ?, ?, ?)
-        """,
-            (
-                str(expense.amount),
-                expense.date.isoformat(),
-                expense.category.value,
-                expense.description,
+            for granularity in ROLLUP_PERIODS
+        )
+
+    def _update_rollups(self, conn, expenses):
+        conn.executemany(
+            UPSERT_ROLLUP,
+            [
+                (*key, cents, count)
+                for key, (cents, count) in rollup_deltas(expenses).items()
+            ],
+        )
+        self._update_running_totals(conn, expenses)
+
+    def _running_totals_by_key(self, rows):
+        # Nodes are named after the last day they cover.
+        return {
+            ("running", from_day(node).isoformat(), category): (cents, count)
+            for category, node, cents, count in rows
+        }
+
+    def _running_total_rows(self, day_totals):
+        """Fenwick tree rows for (category, day, cents, count) per-day totals."""
+        running_totals = RunningTotals()
+        for category, day, cents, count in day_totals:
+            running_totals.add(day, category, cents, count)
+        return [
+            (ALL_CATEGORIES if category is None else category, node, cents, count)
+            for category, node, cents, count in running_totals.nodes()
+        ]
+
+    def _rebuild_running_totals(self, conn):
+        conn.execute("DELETE FROM expense_running_totals")
+        conn.executemany(
+            UPSERT_RUNNING_TOTAL,
+            self._running_total_rows(conn.execute(DAY_TOTALS_QUERY)),
+        )
+
+    def _update_running_totals(self, conn, expenses):
+        conn.executemany(
+            UPSERT_RUNNING_TOTAL,
+            self._running_total_rows(
+                (
+                    expense.category,
+                    expense.date.toordinal(),
+                    to_cents(expense.amount),
+                    1,
+                )
+                for expense in expenses
             ),
         )
-        expense_id = cursor.lastrowid
-        conn.commit()
-        self.close(conn)
 
+    def save_expense(self, expense) -> DbExpense:
+        with self.pool.connection() as conn, conn:
+            cursor = conn.execute(INSERT_EXPENSE, self._to_row(expense))
+            db_expense = self._to_db_expense(cursor.lastrowid, expense)
+            self._update_rollups(conn, [db_expense])
+        self._after_commit()
+
+        return db_expense
+
+    def save_expenses(
+        self, expenses, ids: Optional[Sequence[int]] = None
+    ) -> list[DbExpense]:
+        """Save ``expenses`` in one transaction.
+
+        ``ids``, when given, are used instead of AUTOINCREMENT ids, for callers
+        that allocate ids themselves.
+        """
+        expenses = list(expenses)
+        if not expenses:
+            return []
+
+        with self.pool.connection() as conn, conn:
+            if ids is not None:
+                conn.executemany(
+                    INSERT_EXPENSE_WITH_ID,
+                    [
+                        (expense_id, *self._to_row(expense))
+                        for expense_id, expense in zip(ids, expenses, strict=True)
+                    ],
+                )
+            else:
+                # Holding the write lock for the whole batch makes the
+                # AUTOINCREMENT ids of the batch contiguous, so they can be
+                # derived from the last one.
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    INSERT_EXPENSE, [self._to_row(expense) for expense in expenses]
+                )
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                ids = range(last_id - len(expenses) + 1, last_id + 1)
+            db_expenses = [
+                self._to_db_expense(expense_id, expense)
+                for expense_id, expense in zip(ids, expenses)
+            ]
+            self._update_rollups(conn, db_expenses)
+        self._after_commit()
+
+        return db_expenses
+
+    def _to_row(self, expense):
+        return (
+            to_cents(expense.amount),
+            expense.date.toordinal(),
+            expense.category.value,
+            expense.description,
+        )
+
+    def _to_db_expense(self, expense_id, expense) -> DbExpense:
         return DbExpense(
             id=expense_id,
             amount=expense.amount,
@@ -140,69 +1113,255 @@ class SQLiteDatabase(Database):
         )
 
     def get_last_expense(self) -> Optional[DbExpense]:
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute(
+        with self.pool.connection() as conn:
+            result = conn.execute(
+                """
+                SELECT id, amount_cents, day, category, description
+                FROM expenses
+                ORDER BY id DESC
+                LIMIT 1
             """
-            SELECT id, amount, date, category, description
-            FROM expenses
-            ORDER BY id DESC
-            LIMIT 1
-        """
-        )
-        result = cursor.fetchone()
-        self.close(conn)
+            ).fetchone()
 
         if result:
-            return DbExpense(
-                id=result[0],
-                amount=Decimal(result[1]),
-                date=date.fromisoformat(result[2]),
-                category=result[3],
-                description=result[4],
-            )
+            return self._from_row(result)
         return None
 
+    def find_expenses_after(self, last_id: int, limit: int) -> list[DbExpense]:
+        """At most ``limit`` expenses with an id above ``last_id``, in id order."""
+        with self.pool.connection() as conn:
+            results = conn.execute(
+                "SELECT id, amount_cents, day, category, description FROM expenses "
+                "WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, limit),
+            ).fetchall()
+        return [self._from_row(result) for result in results]
+
     def get_expense_count(self) -> int:
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM expenses")
-        count = cursor.fetchone()[0]
-        self.close(conn)
-        return count
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM expenses").fetchone()[0]
 
     def find_expenses_by_filter(
         self,
         from_date: Optional[date],
         to_date: Optional[date],
         category: Optional[str],
+        limit: Optional[int] = None,
+        after: Optional[tuple[date, int]] = None,
     ) -> list[DbExpense]:
-        conn = self._connect()
-        cursor = conn.cursor()
-        query = "SELECT id, amount, date, category, description FROM expenses WHERE 1"
-        params = []
+        query, params = self._filter_query(from_date, to_date, category)
+        if limit is not None or after is not None:
+            if after:
+                query += " AND (day, id) > (?, ?)"
+                params += [after[0].toordinal(), after[1]]
+            query += " ORDER BY day, id"
+            if limit is not None:
+                query += " LIMIT ?"
+                params.append(limit)
+        else:
+            # The date index would otherwise return the range in day order.
+            query += " ORDER BY id"
+
+        with self.pool.connection() as conn:
+            results = conn.execute(query, params).fetchall()
+
+        return [self._from_row(result) for result in results]
+
+    def iter_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Generator[DbExpense, None, None]:
+        # Closing this iterator early closes the row iterator, which returns
+        # its connection to the pool.
+        with closing(self.iter_expense_rows(from_date, to_date, category)) as rows:
+            yield from map(self._from_row, rows)
+
+    def iter_expense_rows(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Generator[ExpenseRow, None, None]:
+        query, params = self._filter_query(from_date, to_date, category)
+        # The date index would otherwise return the range in day order.
+        query += " ORDER BY id"
+
+        # The pooled connection stays checked out until the iterator is
+        # exhausted or closed.
+        with self.pool.connection() as conn:
+            cursor = conn.execute(query, params)
+            while results := cursor.fetchmany(FETCH_SIZE):
+                yield from results
+
+    def search_expenses(
+        self,
+        search: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbExpense]:
+        return [
+            expense
+            for expense, _ in self.search_expenses_with_scores(
+                search, from_date, to_date, category
+            )
+        ]
+
+    def search_expenses_with_scores(
+        self,
+        search: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[tuple[DbExpense, float]]:
+        """Like ``search_expenses``, paired with BM25 scores; higher is better."""
+        terms = search_terms(search)
+        if not terms:
+            return []
+
+        where, params = self._filter_where(from_date, to_date, category)
+        # Quoting every term keeps FTS5 query syntax out of user input; terms
+        # are letters and digits only.
+        query = f"""
+            SELECT expenses.id, amount_cents, day, category, expenses.description,
+                   expenses_fts.rank
+            FROM expenses_fts JOIN expenses ON expenses.id = expenses_fts.rowid
+            {where} AND expenses_fts MATCH ?
+            ORDER BY expenses_fts.rank, expenses.id
+        """
+        params.append(" ".join(f'"{term}"' for term in terms))
+
+        with self.pool.connection() as conn:
+            results = conn.execute(query, params).fetchall()
+
+        return [(self._from_row(result), -result[5]) for result in results]
+
+    def summarize_expenses(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        length = SUMMARY_PERIODS[period]
+        where, params = self._filter_where(from_date, to_date, category)
+        # Grouping on the integer day is much cheaper than formatting a date
+        # for every row; the daily totals are then folded into periods.
+        query = f"""
+            SELECT day, category, SUM(amount_cents), COUNT(*)
+            FROM expenses {where}
+            GROUP BY day, category
+        """
+        totals: dict[tuple[str, str], tuple[int, int]] = {}
+        with self.pool.connection() as conn:
+            for day, expense_category, cents, count in conn.execute(query, params):
+                key = (from_day(day).isoformat()[:length], expense_category)
+                total, previous_count = totals.get(key, (0, 0))
+                totals[key] = (total + cents, previous_count + count)
+
+        return [
+            DbSummary(
+                period=key[0],
+                category=key[1],
+                total=Decimal(cents).scaleb(-2),
+                count=count,
+            )
+            for key, (cents, count) in sorted(totals.items())
+        ]
 
+    def get_expense_total(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> DbTotal:
+        # The total up to to_date minus the total before from_date. Nodes in
+        # both prefix sums cancel out and are not read.
+        signs = dict.fromkeys(
+            prefix_positions(to_date.toordinal() if to_date else MAX_DAY), 1
+        )
         if from_date:
-            query += " AND date >= ?"
-            params.append(from_date.isoformat())
+            for node in prefix_positions(from_date.toordinal() - 1):
+                signs[node] = signs.get(node, 0) - 1
+        nodes = [node for node, sign in signs.items() if sign]
+        # One statement, so every node comes from the same snapshot.
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT node, total_cents, count FROM expense_running_totals "
+                f"WHERE category = ? AND node IN ({', '.join('?' * len(nodes))})",
+                (category or ALL_CATEGORIES, *nodes),
+            ).fetchall()
+        cents = sum(signs[node] * node_cents for node, node_cents, _ in rows)
+        count = sum(signs[node] * node_count for node, _, node_count in rows)
+        return DbTotal(total=Decimal(cents).scaleb(-2), count=count)
+
+    def get_category_trends(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        length = SUMMARY_PERIODS[period]
+        query = (
+            "SELECT period, category, total_cents, count FROM expense_rollups "
+            "WHERE granularity = ?"
+        )
+        params = [period]
+        if from_date:
+            query += " AND period >= ?"
+            params.append(from_date.isoformat()[:length])
         if to_date:
-            query += " AND date <= ?"
-            params.append(to_date.isoformat())
+            query += " AND period <= ?"
+            params.append(to_date.isoformat()[:length])
         if category:
             query += " AND category = ?"
             params.append(category)
+        query += " ORDER BY period, category"
 
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        self.close(conn)
+        with self.pool.connection() as conn:
+            results = conn.execute(query, params).fetchall()
 
         return [
-            DbExpense(
-                id=result[0],
-                amount=Decimal(result[1]),
-                date=date.fromisoformat(result[2]),
-                category=result[3],
-                description=result[4],
+            DbSummary(
+                period=result[0],
+                category=result[1],
+                total=Decimal(result[2]).scaleb(-2),
+                count=result[3],
             )
             for result in results
         ]
+
+    def _from_row(self, result) -> DbExpense:
+        return DbExpense(
+            id=result[0],
+            amount=from_cents(result[1]),
+            date=from_day(result[2]),
+            category=result[3],
+            description=result[4],
+        )
+
+    def _filter_query(self, from_date, to_date, category):
+        where, params = self._filter_where(from_date, to_date, category)
+        query = (
+            "SELECT id, amount_cents, day, category, description FROM expenses " + where
+        )
+        return query, params
+
+    def _filter_where(self, from_date, to_date, category):
+        where = "WHERE 1"
+        params = []
+
+        if from_date:
+            where += " AND day >= ?"
+            params.append(from_date.toordinal())
+        if to_date:
+            where += " AND day <= ?"
+            params.append(to_date.toordinal())
+        if category:
+            where += " AND category = ?"
+            params.append(category)
+
+        return where, params
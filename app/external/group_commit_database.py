@@ -0,0 +1,256 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterator, Optional
+from app.external.database import (
+    Database,
+    DbExpense,
+    DbSummary,
+    DbTotal,
+    ExpenseRow,
+)
+
+
+@dataclass
+class GroupCommitMetrics:
+    queue_depth: int
+    groups: int
+    committed: int
+    failed: int
+    max_group_size: int
+    mean_commit_seconds: float
+    max_commit_seconds: float
+
+
+@dataclass
+class _PendingWrite:
+    expenses: list
+    future: Future
+    enqueued_at: float
+
+
+_STOP = object()
+
+
+class GroupCommitDatabase(Database):
+    """Commits the writes of concurrent callers together in one transaction.
+
+    ``save_expense`` and ``save_expenses`` put their expenses on a queue and
+    block until a background writer thread has committed them, then return the
+    expenses with their real ids. The writer commits whatever is queued as one
+    ``save_expenses`` call once ``max_group_size`` expenses are waiting or
+    ``max_delay`` seconds after the first one arrived, so a burst of inserts
+    costs one commit instead of one each. If a group fails, its writes are
+    retried one by one so that a single bad write fails only its own caller;
+    the wrapped database must therefore commit each ``save_expenses`` call
+    entirely or not at all.
+
+    Reads go straight to the wrapped database. ``close`` commits everything
+    already queued before closing the wrapped database.
+
+    Attributes:
+        database (Database): The database the groups are committed to.
+        max_group_size (int): Expenses after which a group is committed at once.
+        max_delay (float): Seconds a group waits for more writes.
+    """
+
+    def __init__(
+        self, database: Database, max_group_size: int = 64, max_delay: float = 0.002
+    ):
+        if max_group_size < 1:
+            raise ValueError("Group size must be at least 1")
+        self.database = database
+        self.max_group_size = max_group_size
+        self.max_delay = max_delay
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._queued = 0
+        self._groups = 0
+        self._committed = 0
+        self._failed = 0
+        self._largest_group = 0
+        self._commit_seconds = 0.0
+        self._max_commit_seconds = 0.0
+        self._writer = threading.Thread(
+            target=self._run, name="group-commit-writer", daemon=True
+        )
+        self._writer.start()
+
+    def save_expense(self, expense) -> DbExpense:
+        return self._submit([expense])[0]
+
+    def save_expenses(self, expenses) -> list[DbExpense]:
+        expenses = list(expenses)
+        if not expenses:
+            return []
+        return self._submit(expenses)
+
+    def get_last_expense(self) -> Optional[DbExpense]:
+        return self.database.get_last_expense()
+
+    def get_expense_count(self) -> int:
+        return self.database.get_expense_count()
+
+    def find_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+        limit: Optional[int] = None,
+        after: Optional[tuple[date, int]] = None,
+    ) -> list[DbExpense]:
+        return self.database.find_expenses_by_filter(
+            from_date, to_date, category, limit=limit, after=after
+        )
+
+    def iter_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Iterator[DbExpense]:
+        return self.database.iter_expenses_by_filter(from_date, to_date, category)
+
+    def iter_expense_rows(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Iterator[ExpenseRow]:
+        return self.database.iter_expense_rows(from_date, to_date, category)
+
+    def search_expenses(
+        self,
+        search: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbExpense]:
+        return self.database.search_expenses(search, from_date, to_date, category)
+
+    def summarize_expenses(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        return self.database.summarize_expenses(period, from_date, to_date, category)
+
+    def get_category_trends(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        return self.database.get_category_trends(period, from_date, to_date, category)
+
+    def get_expense_total(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> DbTotal:
+        return self.database.get_expense_total(from_date, to_date, category)
+
+    def metrics(self) -> GroupCommitMetrics:
+        with self._lock:
+            return GroupCommitMetrics(
+                queue_depth=self._queued,
+                groups=self._groups,
+                committed=self._committed,
+                failed=self._failed,
+                max_group_size=self._largest_group,
+                mean_commit_seconds=(
+                    self._commit_seconds / (self._committed + self._failed)
+                    if self._committed + self._failed
+                    else 0.0
+                ),
+                max_commit_seconds=self._max_commit_seconds,
+            )
+
+    def close(self):
+        """Commit the queued writes, stop the writer and close the database."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._writer.join()
+        close = getattr(self.database, "close", None)
+        if close:
+            close()
+
+    def _submit(self, expenses) -> list[DbExpense]:
+        pending = _PendingWrite(expenses, Future(), time.monotonic())
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Write queue is closed")
+            self._queued += len(expenses)
+            self._queue.put(pending)
+        return pending.future.result()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            group = [first]
+            size = len(first.expenses)
+            deadline = time.monotonic() + self.max_delay
+            while size < self.max_group_size:
+                try:
+                    pending = self._queue.get(
+                        timeout=max(deadline - time.monotonic(), 0)
+                    )
+                except queue.Empty:
+                    break
+                if pending is _STOP:
+                    stopping = True
+                    break
+                group.append(pending)
+                size += len(pending.expenses)
+            self._commit(group)
+
+    def _commit(self, group):
+        try:
+            db_expenses = self.database.save_expenses(
+                [expense for pending in group for expense in pending.expenses]
+            )
+        except Exception as e:
+            if len(group) > 1:
+                for pending in group:
+                    self._commit([pending])
+                return
+            self._record(group, failed=True)
+            group[0].future.set_exception(e)
+            return
+
+        self._record(group, failed=False)
+        start = 0
+        for pending in group:
+            end = start + len(pending.expenses)
+            pending.future.set_result(db_expenses[start:end])
+            start = end
+
+    def _record(self, group, failed):
+        now = time.monotonic()
+        size = sum(len(pending.expenses) for pending in group)
+        with self._lock:
+            self._queued -= size
+            if failed:
+                self._failed += size
+            else:
+                self._groups += 1
+                self._committed += size
+                self._largest_group = max(self._largest_group, size)
+            for pending in group:
+                latency = now - pending.enqueued_at
+                self._commit_seconds += latency * len(pending.expenses)
+                self._max_commit_seconds = max(self._max_commit_seconds, latency)
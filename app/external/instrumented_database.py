@@ -0,0 +1,280 @@
+import time
+from datetime import date
+from typing import Iterator, Optional
+from app.external.database import (
+    ConnectionPool,
+    Database,
+    DbExpense,
+    DbSummary,
+    DbTotal,
+    ExpenseRow,
+    PoolMetrics,
+)
+from app.external.group_commit_database import (
+    GroupCommitDatabase,
+    GroupCommitMetrics,
+)
+from app.metrics import MetricsRegistry
+
+
+def instrument_pool(pool: ConnectionPool, registry: MetricsRegistry):
+    """Record how long checkouts and new connections of ``pool`` take.
+
+    The connections in use and the checkouts that waited for one, or gave up,
+    are read from ``pool.metrics()``.
+    """
+    seconds = registry.histogram(
+        "expenses_db_connection_seconds",
+        "Time to check a connection out of the pool or to open a new one.",
+        ["event"],
+    )
+    pool.observer = lambda event, elapsed: seconds.observe(elapsed, (event,))
+    registry.collected(
+        "expenses_db_pool_connections",
+        "Open connections of the pool, by state.",
+        lambda: _pool_connections(pool.metrics()),
+        ["state"],
+    )
+    registry.collected(
+        "expenses_db_pool_checkouts_total",
+        "Checkouts that had to wait for a connection, and those that timed out.",
+        lambda: _pool_checkouts(pool.metrics()),
+        ["outcome"],
+        type="counter",
+    )
+
+
+def _pool_connections(metrics: PoolMetrics) -> dict:
+    return {("in_use",): metrics.in_use, ("idle",): metrics.idle}
+
+
+def _pool_checkouts(metrics: PoolMetrics) -> dict:
+    return {("waited",): metrics.waits, ("timed_out",): metrics.timeouts}
+
+
+def instrument_group_commit(database: GroupCommitDatabase, registry: MetricsRegistry):
+    """Expose the groups ``database`` committed and the expenses in them."""
+    registry.collected(
+        "expenses_group_commit_groups_total",
+        "Groups of writes committed in one transaction.",
+        lambda: {(): database.metrics().groups},
+        type="counter",
+    )
+    registry.collected(
+        "expenses_group_commit_expenses_total",
+        "Expenses written through group commit, by whether they were saved.",
+        lambda: _group_commit_expenses(database.metrics()),
+        ["result"],
+        type="counter",
+    )
+    registry.collected(
+        "expenses_group_commit_max_group_size",
+        "Expenses in the largest group committed so far.",
+        lambda: {(): database.metrics().max_group_size},
+    )
+    registry.collected(
+        "expenses_group_commit_queue_depth",
+        "Expenses waiting for their group to be committed.",
+        lambda: {(): database.metrics().queue_depth},
+    )
+
+
+def _group_commit_expenses(metrics: GroupCommitMetrics) -> dict:
+    return {("committed",): metrics.committed, ("failed",): metrics.failed}
+
+
+class InstrumentedDatabase(Database):
+    """Times every call to a wrapped Database and counts the rows it returns.
+
+    Streaming reads are timed while the iterator is being advanced, so the time
+    the consumer spends between rows is not counted as query time.
+
+    Attributes:
+        database (Database): The database the calls are forwarded to.
+    """
+
+    def __init__(self, database: Database, registry: MetricsRegistry):
+        self.database = database
+        self.query_seconds = registry.histogram(
+            "expenses_db_query_seconds",
+            "Time spent in each Database method.",
+            ["method"],
+        )
+        self.rows = registry.counter(
+            "expenses_db_rows_total",
+            "Expenses read or written by each Database method.",
+            ["method"],
+        )
+        self.errors = registry.counter(
+            "expenses_db_errors_total",
+            "Database calls that raised an exception.",
+            ["method"],
+        )
+
+    def save_expense(self, expense) -> DbExpense:
+        return self._call("save_expense", 1, self.database.save_expense, expense)
+
+    def save_expenses(self, expenses) -> list[DbExpense]:
+        return self._call("save_expenses", len, self.database.save_expenses, expenses)
+
+    def get_last_expense(self) -> Optional[DbExpense]:
+        return self._call("get_last_expense", None, self.database.get_last_expense)
+
+    def get_expense_count(self) -> int:
+        return self._call("get_expense_count", None, self.database.get_expense_count)
+
+    def find_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+        limit: Optional[int] = None,
+        after: Optional[tuple[date, int]] = None,
+    ) -> list[DbExpense]:
+        return self._call(
+            "find_expenses_by_filter",
+            len,
+            self.database.find_expenses_by_filter,
+            from_date,
+            to_date,
+            category,
+            limit=limit,
+            after=after,
+        )
+
+    def iter_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Iterator[DbExpense]:
+        return self._iterate(
+            "iter_expenses_by_filter",
+            self.database.iter_expenses_by_filter,
+            from_date,
+            to_date,
+            category,
+        )
+
+    def iter_expense_rows(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Iterator[ExpenseRow]:
+        return self._iterate(
+            "iter_expense_rows",
+            self.database.iter_expense_rows,
+            from_date,
+            to_date,
+            category,
+        )
+
+    def search_expenses(
+        self,
+        search: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbExpense]:
+        return self._call(
+            "search_expenses",
+            len,
+            self.database.search_expenses,
+            search,
+            from_date,
+            to_date,
+            category,
+        )
+
+    def summarize_expenses(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        return self._call(
+            "summarize_expenses",
+            len,
+            self.database.summarize_expenses,
+            period,
+            from_date,
+            to_date,
+            category,
+        )
+
+    def get_category_trends(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        return self._call(
+            "get_category_trends",
+            len,
+            self.database.get_category_trends,
+            period,
+            from_date,
+            to_date,
+            category,
+        )
+
+    def get_expense_total(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> DbTotal:
+        return self._call(
+            "get_expense_total",
+            None,
+            self.database.get_expense_total,
+            from_date,
+            to_date,
+            category,
+        )
+
+    def close(self):
+        close = getattr(self.database, "close", None)
+        if close:
+            close()
+
+    def _call(self, method, rows, function, *args, **kwargs):
+        """Time ``function``; ``rows`` is a fixed row count or a function of the result."""
+        labels = (method,)
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except Exception:
+            self.errors.inc(labels)
+            raise
+        finally:
+            self.query_seconds.observe(time.perf_counter() - start, labels)
+        if rows is not None:
+            self.rows.inc(labels, rows(result) if callable(rows) else rows)
+        return result
+
+    def _iterate(self, method, function, *args):
+        labels = (method,)
+        elapsed = 0.0
+        count = 0
+        start = time.perf_counter()
+        rows = function(*args)
+        try:
+            for row in rows:
+                elapsed += time.perf_counter() - start
+                count += 1
+                yield row
+                start = time.perf_counter()
+            elapsed += time.perf_counter() - start
+        except Exception:
+            self.errors.inc(labels)
+            raise
+        finally:
+            close = getattr(rows, "close", None)
+            if close:
+                close()
+            self.query_seconds.observe(elapsed, labels)
+            self.rows.inc(labels, count)
@@ -0,0 +1,36 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+from app.external.database import Database
+
+
+@dataclass
+class ReadSession:
+    """The reads and writes of one client, such as those of one HTTP request.
+
+    Attributes:
+        position (int): The highest expense id the session has written, or
+            has seen elsewhere and asked to read; replicas behind it are
+            skipped.
+        database (Optional[Database]): The database the session's reads are
+            pinned to, so they all see the same replica.
+    """
+
+    position: int = 0
+    database: Optional[Database] = None
+
+
+_session: ContextVar[Optional[ReadSession]] = ContextVar(
+    "expenses_read_session", default=None
+)
+
+
+def begin_read_session(position: int = 0) -> ReadSession:
+    """Start a new session in the current context, replacing any previous one."""
+    session = ReadSession(position=position)
+    _session.set(session)
+    return session
+
+
+def current_read_session() -> Optional[ReadSession]:
+    return _session.get()
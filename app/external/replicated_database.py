@@ -0,0 +1,272 @@
+import itertools
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
+from app.external.clock import Clock, SystemClock
+from app.external.database import (
+    Database,
+    DbExpense,
+    DbSummary,
+    DbTotal,
+    ExpenseRow,
+    PERFORMANCE_PROFILE,
+    SQLiteDatabase,
+)
+from app.external.read_session import current_read_session
+from app.models.expense import Expense
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Replica:
+    def __init__(self, database: SQLiteDatabase, position: int):
+        self.database = database
+        self.position = position
+        # When the replica last held everything committed to the primary.
+        self.synced_at: Optional[datetime] = None
+        # Why the last sync failed; the replica is not read until one succeeds.
+        self.error: Optional[Exception] = None
+
+
+class ReplicatedDatabase(Database):
+    """Sends writes to a primary SQLite file and reads to local replicas.
+
+    A replica file that does not exist yet is seeded with a copy of the
+    primary made by the SQLite backup API. From then on, expenses are only ever
+    inserted, so the expenses table is the replication log: new rows are
+    shipped in id order and saved to each replica, which maintains its own
+    indexes, rollups and running totals.
+
+    Reads go to a replica, in turn, when its last sync succeeded, it caught
+    up with the primary at most ``max_staleness`` ago and it holds every
+    expense the current ReadSession has written. Otherwise they go to the
+    primary. Within a session, reads are pinned to the first database they
+    used.
+
+    Attributes:
+        primary (SQLiteDatabase): The database that is written to.
+        writer (Database): What writes go through; ``primary`` unless given,
+            for example a GroupCommitDatabase over it.
+        max_staleness (timedelta): How far behind a replica may be read.
+        batch_size (int): Expenses shipped to a replica per transaction.
+    """
+
+    def __init__(
+        self,
+        primary: SQLiteDatabase,
+        replica_files: list[str],
+        max_staleness: timedelta = timedelta(seconds=2),
+        sync_interval: Optional[float] = 0.5,
+        writer: Optional[Database] = None,
+        clock: Optional[Clock] = None,
+        batch_size: int = 10000,
+        pool_size: int = 5,
+    ):
+        """Initialize the ReplicatedDatabase and seed missing replicas.
+
+        Args:
+            primary (SQLiteDatabase): The database that is written to.
+            replica_files (list[str]): The replica SQLite files.
+            max_staleness (timedelta): How far behind a replica may be read.
+            sync_interval (Optional[float]): Seconds between the background
+                syncs of the replicas; ``None`` leaves syncing to ``sync``.
+            writer (Optional[Database]): What writes go through, if not
+                ``primary``.
+            clock (Optional[Clock]): Measures how long ago each replica caught
+                up; the system clock by default.
+            batch_size (int): Expenses shipped to a replica per transaction.
+            pool_size (int): Connections per replica.
+
+        Raises:
+            RuntimeError: If a replica has expenses the primary does not.
+        """
+        self.primary = primary
+        self.writer = writer or primary
+        self.max_staleness = max_staleness
+        self.clock = clock or SystemClock()
+        self.batch_size = batch_size
+        self._replicas = []
+        primary_last = primary.get_last_expense()
+        for replica_file in replica_files:
+            if not os.path.exists(replica_file):
+                primary.backup(replica_file)
+            database = SQLiteDatabase(
+                replica_file, pool_size=pool_size, profile=PERFORMANCE_PROFILE
+            )
+            last_expense = database.get_last_expense()
+            position = last_expense.id if last_expense else 0
+            if position > (primary_last.id if primary_last else 0):
+                database.close()
+                raise RuntimeError(
+                    f"{replica_file} has expenses that {primary.db_file} does not"
+                )
+            self._replicas.append(_Replica(database, position))
+        self._turns = itertools.count()
+        self._sync_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.sync()
+        self._syncer = None
+        if sync_interval is not None:
+            self._syncer = threading.Thread(
+                target=self._sync_forever,
+                args=(sync_interval,),
+                name="expenses-replication",
+                daemon=True,
+            )
+            self._syncer.start()
+
+    def sync(self):
+        """Ship every expense committed to the primary so far to the replicas.
+
+        A replica that fails to sync is logged and not read until a later sync
+        succeeds; the other replicas are synced regardless.
+        """
+        with self._sync_lock:
+            for replica in self._replicas:
+                try:
+                    self._sync_replica(replica)
+                except Exception as e:
+                    logger.exception("Syncing %s failed", replica.database.db_file)
+                    replica.error = e
+                else:
+                    replica.error = None
+
+    def _sync_replica(self, replica):
+        # Everything committed before this moment is shipped below.
+        started_at = self.clock.now()
+        while True:
+            db_expenses = self.primary.find_expenses_after(
+                replica.position, self.batch_size
+            )
+            if db_expenses:
+                replica.database.save_expenses(
+                    [Expense.from_db_expense(expense) for expense in db_expenses],
+                    ids=[expense.id for expense in db_expenses],
+                )
+                replica.position = db_expenses[-1].id
+            if len(db_expenses) < self.batch_size:
+                break
+        replica.synced_at = started_at
+
+    def close(self):
+        self._stopped.set()
+        if self._syncer:
+            self._syncer.join()
+        for replica in self._replicas:
+            replica.database.close()
+        # A writer that wraps the primary closes it as well.
+        self.writer.close()
+
+    def _sync_forever(self, interval):
+        while not self._stopped.wait(interval):
+            self.sync()
+
+    def _reader(self) -> Database:
+        session = current_read_session()
+        if session and session.database:
+            return session.database
+        position = session.position if session else 0
+        oldest_sync = self.clock.now() - self.max_staleness
+        fresh = [
+            replica.database
+            for replica in self._replicas
+            if replica.error is None
+            and replica.position >= position
+            and replica.synced_at is not None
+            and replica.synced_at >= oldest_sync
+        ]
+        database = fresh[next(self._turns) % len(fresh)] if fresh else self.primary
+        if session:
+            session.database = database
+        return database
+
+    def _written(self, db_expenses):
+        session = current_read_session()
+        if session and db_expenses:
+            session.position = max(
+                session.position, *(expense.id for expense in db_expenses)
+            )
+            # The pinned replica may not have the new expenses yet.
+            session.database = None
+
+    def save_expense(self, expense) -> DbExpense:
+        db_expense = self.writer.save_expense(expense)
+        self._written([db_expense])
+        return db_expense
+
+    def save_expenses(self, expenses) -> list[DbExpense]:
+        db_expenses = self.writer.save_expenses(expenses)
+        self._written(db_expenses)
+        return db_expenses
+
+    def get_last_expense(self) -> Optional[DbExpense]:
+        return self._reader().get_last_expense()
+
+    def get_expense_count(self) -> int:
+        return self._reader().get_expense_count()
+
+    def find_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+        limit: Optional[int] = None,
+        after: Optional[tuple[date, int]] = None,
+    ) -> list[DbExpense]:
+        return self._reader().find_expenses_by_filter(
+            from_date, to_date, category, limit=limit, after=after
+        )
+
+    def iter_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Iterator[DbExpense]:
+        return self._reader().iter_expenses_by_filter(from_date, to_date, category)
+
+    def iter_expense_rows(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Iterator[ExpenseRow]:
+        return self._reader().iter_expense_rows(from_date, to_date, category)
+
+    def search_expenses(
+        self,
+        search: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbExpense]:
+        return self._reader().search_expenses(search, from_date, to_date, category)
+
+    def summarize_expenses(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        return self._reader().summarize_expenses(period, from_date, to_date, category)
+
+    def get_expense_total(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> DbTotal:
+        return self._reader().get_expense_total(from_date, to_date, category)
+
+    def get_category_trends(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        return self._reader().get_category_trends(period, from_date, to_date, category)
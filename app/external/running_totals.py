@@ -0,0 +1,106 @@
+import threading
+from datetime import date
+from typing import Iterator, Optional
+
+
+# Fenwick tree positions are day ordinals, so every date fits without resizing.
+MAX_DAY = date.max.toordinal()
+
+
+def update_positions(day: int) -> Iterator[int]:
+    """Positions of the nodes that cover ``day``, which an expense on it changes."""
+    position = day
+    while position <= MAX_DAY:
+        yield position
+        position += position & -position
+
+
+def prefix_positions(day: int) -> Iterator[int]:
+    """Positions of the nodes that add up to the totals of the days up to ``day``."""
+    position = min(day, MAX_DAY)
+    while position > 0:
+        yield position
+        position -= position & -position
+
+
+class RunningTotals:
+    """Cumulative cents and counts of expenses per category, indexed by day.
+
+    Each category, and all categories together under ``None``, has a Fenwick
+    tree over day ordinals. Adding an expense and reading the total of a date
+    range both touch at most log2(MAX_DAY), about 22, nodes, however many
+    expenses there are. The trees are sparse dicts, so only the nodes covering
+    days with expenses use memory.
+
+    Added expenses are summed per category and day and only applied to the
+    trees by the next read, so an insert costs one dict update, and expenses
+    on the same day between two reads update the trees once. Reads apply them
+    and sum the nodes under one lock, so both prefix sums of a range come from
+    the same state of the trees.
+    """
+
+    def __init__(self):
+        self._trees = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add(self, day: int, category: str, cents: int, count: int = 1):
+        with self._lock:
+            pending_cents, pending_count = self._pending.get((category, day), (0, 0))
+            self._pending[category, day] = (
+                pending_cents + cents,
+                pending_count + count,
+            )
+
+    def nodes(self) -> Iterator[tuple[Optional[str], int, int, int]]:
+        """(category, position, cents, count) of every node that is set."""
+        with self._lock:
+            self._apply_pending()
+            nodes = [
+                (category, position, cents, count)
+                for category, tree in self._trees.items()
+                for position, (cents, count) in tree.items()
+            ]
+        return iter(nodes)
+
+    def total(
+        self,
+        first_day: Optional[int],
+        last_day: Optional[int],
+        category: Optional[str],
+    ) -> tuple[int, int]:
+        """(cents, count) of the expenses from ``first_day`` to ``last_day``.
+
+        Both bounds are inclusive day ordinals; ``None`` leaves them open.
+        """
+        with self._lock:
+            self._apply_pending()
+            tree = self._trees.get(category)
+            if tree is None:
+                return 0, 0
+            end_cents, end_count = self._prefix(
+                tree, MAX_DAY if last_day is None else last_day
+            )
+            if not first_day:
+                return end_cents, end_count
+            start_cents, start_count = self._prefix(tree, first_day - 1)
+        return end_cents - start_cents, end_count - start_count
+
+    def _apply_pending(self):
+        """Add the pending expenses to the trees; the caller holds the lock."""
+        for (category, day), (cents, count) in self._pending.items():
+            for key in (category, None):
+                tree = self._trees.setdefault(key, {})
+                for position in update_positions(day):
+                    node_cents, node_count = tree.get(position, (0, 0))
+                    tree[position] = (node_cents + cents, node_count + count)
+        self._pending.clear()
+
+    def _prefix(self, tree, day):
+        """Totals of the days up to and including ``day``."""
+        cents = count = 0
+        for position in prefix_positions(day):
+            node_cents, node_count = tree.get(position, (0, 0))
+            cents += node_cents
+            count += node_count
+        return cents, count
@@ -0,0 +1,109 @@
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Optional
+
+
+# Tokens are runs of letters and digits, as with SQLite's unicode61 tokenizer.
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+# BM25 parameters, the same as SQLite FTS5's bm25() defaults.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def search_terms(text: Optional[str]) -> list[str]:
+    """Split ``text`` into case-folded terms without diacritics.
+
+    This mirrors the unicode61 tokenizer of the SQLite FTS5 index, so the
+    in-memory index and SQLite agree on what matches.
+    """
+    if not text:
+        return []
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return TOKEN_PATTERN.findall(stripped)
+
+
+def matches_search(text: Optional[str], search: str) -> bool:
+    """Whether ``text`` contains every term of ``search``."""
+    terms = set(search_terms(text))
+    return all(term in terms for term in search_terms(search))
+
+
+class InvertedIndex:
+    """An in-memory inverted index of expense descriptions ranked by BM25.
+
+    Every added document counts towards the collection statistics, including
+    ones without terms, as rows with a NULL description do in FTS5.
+
+    Added documents are only tokenized by the next search, so saving an expense
+    does not pay for indexing its description, and documents added between two
+    searches are indexed together. A search indexes them and scores the
+    matches under one lock, so it never reads postings that another search is
+    still adding to.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._lengths = {}
+        self._total_length = 0
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def add(self, doc_id: int, text: Optional[str]):
+        with self._lock:
+            self._pending.append((doc_id, text))
+
+    def _index_pending(self):
+        """Index the pending documents; the caller holds the lock."""
+        for doc_id, text in self._pending:
+            self._index(doc_id, text)
+        self._pending.clear()
+
+    def _index(self, doc_id: int, text: Optional[str]):
+        terms = search_terms(text)
+        self._lengths[doc_id] = len(terms)
+        self._total_length += len(terms)
+        for term, frequency in Counter(terms).items():
+            self._postings.setdefault(term, {})[doc_id] = frequency
+
+    def search(self, query: str) -> list[tuple[int, float]]:
+        """(doc_id, score) pairs of documents with every query term, best first.
+
+        Ties are ordered by doc_id.
+        """
+        terms = list(dict.fromkeys(search_terms(query)))
+        if not terms:
+            return []
+        with self._lock:
+            self._index_pending()
+            return self._score(terms)
+
+    def _score(self, terms: list[str]) -> list[tuple[int, float]]:
+        postings = sorted((self._postings.get(term, {}) for term in terms), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        if not candidates:
+            return []
+
+        documents = len(self._lengths)
+        average_length = self._total_length / documents
+        weights = []
+        for posting in postings:
+            idf = math.log((documents - len(posting) + 0.5) / (len(posting) + 0.5))
+            weights.append((posting, max(idf, 1e-6)))
+
+        scores = []
+        for doc_id in candidates:
+            norm = BM25_K1 * (
+                1 - BM25_B + BM25_B * self._lengths[doc_id] / average_length
+            )
+            score = sum(
+                idf * posting[doc_id] * (BM25_K1 + 1) / (posting[doc_id] + norm)
+                for posting, idf in weights
+            )
+            scores.append((doc_id, score))
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        return scores
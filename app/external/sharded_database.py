@@ -0,0 +1,297 @@
+import heapq
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import date
+from decimal import Decimal
+from itertools import chain
+from typing import Iterator, Optional
+from app.external.database import (
+    ConnectionPool,
+    Database,
+    DbExpense,
+    DbSummary,
+    DbTotal,
+    DURABLE_PROFILE,
+    ExpenseRow,
+    SQLiteDatabase,
+    SQLiteProfile,
+)
+
+
+SHARD_FILE_PATTERN = re.compile(r"expenses-(\d{4})\.db")
+SEQUENCE_FILE = "sequence.db"
+
+
+class ShardedDatabase(Database):
+    """Expenses partitioned by year into one SQLite file per year.
+
+    Each expense is saved to ``expenses-<year>.db`` in ``directory``, the year
+    padded to four digits, created on first use. Queries only open the shards
+    whose year overlaps the date range and run on a thread pool, one shard per
+    task.
+
+    Ids are allocated from a sequence kept in ``sequence.db``, so they are
+    unique and increasing across shards. Results are returned shard by shard,
+    oldest year first; insertion order therefore holds within a year. A batch
+    that spans several years is committed one shard at a time, so it is not
+    atomic and must not be wrapped in a GroupCommitDatabase.
+    """
+
+    def __init__(
+        self,
+        directory,
+        pool_size=5,
+        pool_timeout=30.0,
+        profile: SQLiteProfile = DURABLE_PROFILE,
+        max_workers=4,
+    ):
+        self.directory = directory
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.profile = profile
+        os.makedirs(directory, exist_ok=True)
+        self._shards: dict[int, SQLiteDatabase] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="expenses-shard"
+        )
+        for name in os.listdir(directory):
+            match = SHARD_FILE_PATTERN.fullmatch(name)
+            if match:
+                self._open_shard(int(match.group(1)))
+        self._sequence = ConnectionPool(
+            os.path.join(directory, SEQUENCE_FILE),
+            max_size=1,
+            timeout=pool_timeout,
+            pragmas=profile.pragmas(),
+        )
+        self._create_sequence()
+
+    def close(self):
+        self._executor.shutdown()
+        self._sequence.close()
+        for shard in self._shards.values():
+            shard.close()
+
+    def years(self) -> list[int]:
+        with self._lock:
+            return sorted(self._shards)
+
+    def shard(self, year: int) -> Optional[SQLiteDatabase]:
+        with self._lock:
+            return self._shards.get(year)
+
+    def _create_sequence(self):
+        with self._sequence.connection() as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS expense_sequence ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), last_id INTEGER NOT NULL)"
+            )
+            if conn.execute("SELECT COUNT(*) FROM expense_sequence").fetchone()[0]:
+                return
+            # Shards written before the sequence existed continue after their
+            # highest id.
+            last_expenses = [
+                shard.get_last_expense() for shard in self._shards.values()
+            ]
+            last_id = max(
+                (expense.id for expense in last_expenses if expense), default=0
+            )
+            conn.execute(
+                "INSERT INTO expense_sequence (id, last_id) VALUES (0, ?)", (last_id,)
+            )
+
+    def _allocate_ids(self, count) -> range:
+        with self._sequence.connection() as conn, conn:
+            last_id = conn.execute(
+                "UPDATE expense_sequence SET last_id = last_id + ? RETURNING last_id",
+                (count,),
+            ).fetchone()[0]
+        return range(last_id - count + 1, last_id + 1)
+
+    def _open_shard(self, year) -> SQLiteDatabase:
+        shard = self._shards.get(year)
+        if shard is None:
+            shard = SQLiteDatabase(
+                os.path.join(self.directory, f"expenses-{year:04d}.db"),
+                pool_size=self.pool_size,
+                pool_timeout=self.pool_timeout,
+                profile=self.profile,
+            )
+            self._shards[year] = shard
+        return shard
+
+    def _shard_for_year(self, year) -> SQLiteDatabase:
+        with self._lock:
+            return self._open_shard(year)
+
+    def _shards_between(self, from_date, to_date) -> list[SQLiteDatabase]:
+        """Existing shards overlapping the date range, oldest first."""
+        with self._lock:
+            return [
+                shard
+                for year, shard in sorted(self._shards.items())
+                if (not from_date or year >= from_date.year)
+                and (not to_date or year <= to_date.year)
+            ]
+
+    def _map(self, function, shards) -> list:
+        shards = list(shards)
+        if len(shards) <= 1:
+            return [function(shard) for shard in shards]
+        return list(self._executor.map(function, shards))
+
+    def save_expense(self, expense) -> DbExpense:
+        return self.save_expenses([expense])[0]
+
+    def save_expenses(self, expenses) -> list[DbExpense]:
+        expenses = list(expenses)
+        if not expenses:
+            return []
+
+        ids = self._allocate_ids(len(expenses))
+        by_year: dict[int, list[int]] = {}
+        for position, expense in enumerate(expenses):
+            by_year.setdefault(expense.date.year, []).append(position)
+
+        db_expenses: dict[int, DbExpense] = {}
+        for year, positions in sorted(by_year.items()):
+            saved = self._shard_for_year(year).save_expenses(
+                [expenses[position] for position in positions],
+                ids=[ids[position] for position in positions],
+            )
+            db_expenses.update(zip(positions, saved))
+        return [db_expenses[position] for position in range(len(expenses))]
+
+    # These are answered from the end or the size of each shard's b-tree, or
+    # from two of its running totals, which is cheaper than handing the shards
+    # to the thread pool.
+    def get_last_expense(self) -> Optional[DbExpense]:
+        last_expenses = [
+            expense
+            for shard in self._shards_between(None, None)
+            if (expense := shard.get_last_expense()) is not None
+        ]
+        if not last_expenses:
+            return None
+        return max(last_expenses, key=lambda expense: expense.id)
+
+    def get_expense_count(self) -> int:
+        return sum(
+            shard.get_expense_count() for shard in self._shards_between(None, None)
+        )
+
+    def get_expense_total(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> DbTotal:
+        totals = [
+            shard.get_expense_total(from_date, to_date, category)
+            for shard in self._shards_between(from_date, to_date)
+        ]
+        return DbTotal(
+            total=sum((total.total for total in totals), Decimal("0.00")),
+            count=sum(total.count for total in totals),
+        )
+
+    def find_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+        limit: Optional[int] = None,
+        after: Optional[tuple[date, int]] = None,
+    ) -> list[DbExpense]:
+        # Everything after the cursor is on or after the cursor's date.
+        first_date = from_date
+        if after and (first_date is None or after[0] > first_date):
+            first_date = after[0]
+        shards = self._shards_between(first_date, to_date)
+        results = self._map(
+            lambda shard: shard.find_expenses_by_filter(
+                from_date, to_date, category, limit=limit, after=after
+            ),
+            shards,
+        )
+        # Shards partition the dates, so concatenating them in year order keeps
+        # the (date, id) order of paginated results.
+        expenses = list(chain.from_iterable(results))
+        return expenses if limit is None else expenses[:limit]
+
+    def iter_expenses_by_filter(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Iterator[DbExpense]:
+        for shard in self._shards_between(from_date, to_date):
+            with closing(
+                shard.iter_expenses_by_filter(from_date, to_date, category)
+            ) as expenses:
+                yield from expenses
+
+    def iter_expense_rows(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> Iterator[ExpenseRow]:
+        for shard in self._shards_between(from_date, to_date):
+            with closing(shard.iter_expense_rows(from_date, to_date, category)) as rows:
+                yield from rows
+
+    def search_expenses(
+        self,
+        search: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbExpense]:
+        # Each shard scores against its own year's statistics; the scores are
+        # close enough to merge into one ranking.
+        results = self._map(
+            lambda shard: shard.search_expenses_with_scores(
+                search, from_date, to_date, category
+            ),
+            self._shards_between(from_date, to_date),
+        )
+        ranked = heapq.merge(*results, key=lambda result: (-result[1], result[0].id))
+        return [expense for expense, _ in ranked]
+
+    def summarize_expenses(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        # Every period lies within one year, so the shards' summaries are
+        # disjoint and already in period order.
+        results = self._map(
+            lambda shard: shard.summarize_expenses(
+                period, from_date, to_date, category
+            ),
+            self._shards_between(from_date, to_date),
+        )
+        return list(chain.from_iterable(results))
+
+    def get_category_trends(
+        self,
+        period: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        category: Optional[str],
+    ) -> list[DbSummary]:
+        results = self._map(
+            lambda shard: shard.get_category_trends(
+                period, from_date, to_date, category
+            ),
+            self._shards_between(from_date, to_date),
+        )
+        return list(chain.from_iterable(results))
@@ -9,3 +9,8 @@ class Category(Enum):
     EDUCATION = "Education"
     ENTERTAINMENT = "Entertainment"
     OTHER = "Other"
+
+
+# Category(value) goes through the Enum machinery; per-row code looks values up
+# in this table instead.
+CATEGORIES_BY_VALUE = {category.value: category for category in Category}
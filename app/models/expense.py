@@ -2,13 +2,13 @@ from dataclasses import dataclass
 from datetime import date
 from decimal import Decimal
 from typing import Optional
-from app.models.category import Category
+from app.models.category import CATEGORIES_BY_VALUE, Category
 
 
 MAX_DESCRIPTION_LENGTH = 255
 
 
-@dataclass
+@dataclass(slots=True)
 class Expense:
     amount: Decimal
     date: date
@@ -20,6 +20,6 @@ class Expense:
         return cls(
             amount=db_expense.amount,
             date=db_expense.date,
-            category=Category(db_expense.category),
+            category=CATEGORIES_BY_VALUE[db_expense.category],
             description=db_expense.description,
         )
@@ -0,0 +1,25 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict
+from app.models.category import Category
+
+
+@dataclass
+class PeriodSummary:
+    period: str
+    total: Decimal = Decimal(0)
+    count: int = 0
+    by_category: Dict[Category, Decimal] = field(default_factory=dict)
+
+
+@dataclass
+class TrendPoint:
+    period: str
+    total: Decimal
+    count: int
+
+
+@dataclass
+class ExpenseTotal:
+    total: Decimal
+    count: int
@@ -1,106 +1,378 @@
-from flask import Flask, request, jsonify, Response
-from datetime import datetime
-from decimal import Decimal
+import atexit
+import threading
+from io import TextIOWrapper
+from typing import Optional
+from flask import Blueprint, Flask, current_app, request, jsonify, Response
+from app.expense_manager.expense_importer import ExpenseImporter
 from app.expense_manager.expense_service import ExpenseService
-from app.expense_manager.expense_filter import ExpenseFilter
-from app.models.expense import Expense
-from app.models.category import Category
-from app.external.clock import SystemClock
-from app.external.database import SQLiteDatabase
-import csv
-from io import StringIO
+from app.expense_manager.pagination import PageCursor
+from app.expense_manager.report_service import ReportService
+from app.external.clock import Clock, SystemClock
+from app.external.database import Database, to_expense_row
+from app.external.read_session import begin_read_session, current_read_session
+from app.metrics import MetricsRegistry
+from app.rest.serializers import (
+    COLUMNAR_CONTENT_TYPE,
+    batch_result_to_json,
+    batch_status,
+    compress,
+    db_expense_to_json,
+    etag_headers,
+    etag_matches,
+    expenses_etag,
+    import_report_to_json,
+    import_status,
+    iter_columnar,
+    iter_csv,
+    iter_json,
+    negotiate_encoding,
+    parse_csv_expense,
+    parse_expense,
+    parse_expense_batch,
+    parse_filter,
+    parse_page_size,
+    read_csv,
+    summary_to_json,
+    total_to_json,
+    trends_to_json,
+)
+from app.rest.settings import (
+    COLUMNAR_ROW_GROUP_ROWS,
+    COMPRESSION_LEVEL,
+    DEFAULT_PAGE_SIZE,
+    IMPORT_BATCH_ROWS,
+    IMPORT_WORKERS,
+    MAX_PAGE_SIZE,
+    POSITION_HEADER,
+    STREAM_CHUNK_ROWS,
+    create_cache,
+    create_database,
+    create_metrics,
+    create_report_service,
+)
 
 
-app = Flask(__name__)
+class AppServices:
+    """The database and services behind one Flask app, created on first use.
 
-clock = SystemClock()
-database = SQLiteDatabase("expenses.db")
-expense_service = ExpenseService(clock, database)
+    Nothing is opened when the app is created, so a server that imports the
+    app before forking its workers gives each worker its own connections,
+    opened by the worker's first request.
 
+    Attributes:
+        clock (Clock): The clock of the expense service.
+        metrics (Optional[MetricsRegistry]): Where the database is
+            instrumented, if metrics are enabled.
+        serialization_timer (dict): Timers of the export formats, by name;
+            empty when metrics are disabled.
+    """
 
-@app.route("/expenses", methods=["POST"])
+    def __init__(
+        self,
+        clock: Clock,
+        metrics: Optional[MetricsRegistry],
+        database: Optional[Database] = None,
+    ):
+        self.clock = clock
+        self.metrics = metrics
+        self.serialization_timer: dict = {}
+        self._database = database
+        self._started: Optional[tuple[Database, ExpenseService, ReportService]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def database(self) -> Database:
+        return self._start()[0]
+
+    @property
+    def expense_service(self) -> ExpenseService:
+        return self._start()[1]
+
+    @property
+    def report_service(self) -> ReportService:
+        return self._start()[2]
+
+    def _start(self) -> tuple[Database, ExpenseService, ReportService]:
+        started = self._started
+        if started is not None:
+            return started
+        with self._lock:
+            if self._started is None:
+                if self._database is None:
+                    database = create_database(self.metrics)
+                    atexit.register(database.close)
+                    report_service = create_report_service(database)
+                    # Registered last, so its worker processes stop first.
+                    atexit.register(report_service.close)
+                else:
+                    database = self._database
+                    report_service = ReportService(database)
+                cache = create_cache(self.clock, self.metrics)
+                self._started = (
+                    database,
+                    ExpenseService(self.clock, database, cache),
+                    report_service,
+                )
+            return self._started
+
+
+expenses = Blueprint("expenses", __name__)
+
+
+def create_app(
+    database: Optional[Database] = None, clock: Optional[Clock] = None
+) -> Flask:
+    """Create the Flask application.
+
+    Args:
+        database (Optional[Database]): The database to serve. By default the
+            database configured by the environment is opened on the first
+            request and closed at exit.
+        clock (Optional[Clock]): The clock of the expense service; the
+            system clock by default.
+
+    Returns:
+        Flask: The application.
+    """
+    app = Flask(__name__)
+    metrics = create_metrics()
+    services = AppServices(clock or SystemClock(), metrics, database)
+    app.extensions["expenses"] = services
+    if metrics:
+        from app.rest.instrumentation import instrument_app, serialization_timers
+
+        instrument_app(app, metrics)
+        services.serialization_timer = serialization_timers(metrics)
+    app.register_blueprint(expenses)
+    return app
+
+
+def services() -> AppServices:
+    return current_app.extensions["expenses"]
+
+
+@expenses.before_app_request
+def start_read_session():
+    try:
+        begin_read_session(int(request.headers.get(POSITION_HEADER, "0")))
+    except ValueError:
+        return jsonify({"error": f"Invalid {POSITION_HEADER} header"}), 400
+
+
+@expenses.after_app_request
+def add_read_position(response):
+    session = current_read_session()
+    if session and session.position:
+        response.headers[POSITION_HEADER] = str(session.position)
+    return response
+
+
+@expenses.route("/expenses", methods=["POST"])
 def create_expense():
     data = request.json
     try:
-        expense = Expense(
-            amount=Decimal(data["amount"]),
-            date=datetime.fromisoformat(data["date"]).date(),
-            category=Category(data["category"]),
-            description=data.get("description"),
-        )
-        created_expense = expense_service.create_expense(expense)
-        return (
-            jsonify(
-                {
-                    "id": created_expense.id,
-                    "amount": str(created_expense.amount),
-                    "date": created_expense.date.isoformat(),
-                    "category": created_expense.category,
-                    "description": created_expense.description,
-                }
-            ),
-            201,
-        )
+        expense = parse_expense(data)
+        created_expense = services().expense_service.create_expense(expense)
+        return jsonify(db_expense_to_json(created_expense)), 201
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
 
 
-def get_expenses_json(expenses):
-    return jsonify(
-        [
-            {
-                "amount": str(expense.amount),
-                "date": expense.date.isoformat(),
-                "category": expense.category.value,
-                "description": expense.description,
-            }
-            for expense in expenses
-        ]
+@expenses.route("/expenses/batch", methods=["POST"])
+def create_expenses():
+    try:
+        expenses, positions, errors = parse_expense_batch(request.json)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    result = services().expense_service.create_expenses(expenses)
+    return (
+        jsonify(batch_result_to_json(result, positions, errors)),
+        batch_status(result, errors),
     )
 
 
-def get_expenses_csv(expenses):
-    csv_data = StringIO()
-    csv_writer = csv.writer(csv_data)
-    csv_writer.writerow(["Amount", "Date", "Category", "Description"])
-    for expense in expenses:
-        csv_writer.writerow(
-            [
-                str(expense.amount),
-                expense.date.isoformat(),
-                expense.category.value,
-                expense.description,
-            ]
-        )
+@expenses.route("/expenses/import", methods=["POST"])
+def import_expenses():
+    # The CSV is either the request body or a multipart upload named "file".
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("file")
+        if upload is None:
+            return jsonify({"error": "Expected a multipart upload named file"}), 400
+        stream = upload.stream
+    elif request.mimetype == "application/x-www-form-urlencoded":
+        # Flask has already read such a body as form fields.
+        return jsonify({"error": "Expected a CSV body or a multipart upload"}), 415
+    else:
+        stream = request.stream
+    lines = TextIOWrapper(
+        stream,
+        encoding="utf-8-sig",
+        errors="surrogateescape",
+        newline="",
+    )
+    importer = ExpenseImporter(
+        services().expense_service,
+        parse_csv_expense,
+        batch_size=IMPORT_BATCH_ROWS,
+        workers=IMPORT_WORKERS,
+    )
+    try:
+        report = importer.run(read_csv(lines))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(import_report_to_json(report)), import_status(report)
+
+
+def get_expenses_json(rows, encoding=None):
+    return stream_response(
+        iter_json(rows, STREAM_CHUNK_ROWS, services().serialization_timer.get("json")),
+        "application/json",
+        encoding,
+    )
+
 
-    response = Response(csv_data.getvalue(), mimetype="text/csv")
+def get_expenses_csv(rows, encoding=None):
+    response = stream_response(
+        iter_csv(rows, STREAM_CHUNK_ROWS, services().serialization_timer.get("csv")),
+        "text/csv",
+        encoding,
+    )
     response.headers["Content-Disposition"] = "attachment; filename=expenses.csv"
     return response
 
 
-@app.route("/expenses", methods=["GET"])
+def get_expenses_columnar(rows, encoding=None):
+    response = stream_response(
+        iter_columnar(
+            rows,
+            COLUMNAR_ROW_GROUP_ROWS,
+            services().serialization_timer.get("columnar"),
+        ),
+        COLUMNAR_CONTENT_TYPE,
+        encoding,
+    )
+    response.headers["Content-Disposition"] = "attachment; filename=expenses.bin"
+    return response
+
+
+def stream_response(chunks, mimetype, encoding):
+    if not encoding:
+        return Response(chunks, mimetype=mimetype)
+    response = Response(
+        compress(chunks, encoding, COMPRESSION_LEVEL), mimetype=mimetype
+    )
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+@expenses.route("/expenses", methods=["GET"])
 def get_expenses():
-    from_date = request.args.get("from_date")
-    to_date = request.args.get("to_date")
-    category = request.args.get("category")
+    page_size = request.args.get("page_size")
+    page_token = request.args.get("page_token")
+    paginated = page_size is not None or page_token is not None
+    expense_service = services().expense_service
 
     try:
-        expense_filter = ExpenseFilter(
-            from_date=datetime.fromisoformat(from_date).date() if from_date else None,
-            to_date=datetime.fromisoformat(to_date).date() if to_date else None,
-            category=Category(category) if category else None,
+        expense_filter = parse_filter(
+            request.args,
+            page_size=(
+                parse_page_size(page_size, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+                if paginated
+                else None
+            ),
+            after=PageCursor.decode(page_token) if page_token else None,
+            search=request.args.get("search") or None,
         )
-        expenses = expense_service.get_expenses_by_filter(expense_filter)
-
+        expense_filter.validate()
         content_type = request.headers.get("Content-Type", "").lower()
+        # Read before the expenses, so a concurrent insert can only make the
+        # validator older than the body: that costs a refetch, never a stale 304.
+        # Cached results are only served for this same version.
+        version = expense_service.get_data_version(expense_filter)
+        etag = expenses_etag(expense_filter, content_type, version)
+        if etag_matches(request.headers.get("If-None-Match", ""), etag):
+            return conditional_headers(Response(status=304), etag)
+
+        next_cursor = None
+        if paginated:
+            page = expense_service.get_expenses_page(expense_filter, version)
+            rows = map(to_expense_row, page.expenses)
+            next_cursor = page.next_cursor
+        else:
+            rows = expense_service.iter_expense_rows(expense_filter, version)
 
+        encoding = negotiate_encoding(
+            request.headers.get("Accept-Encoding", ""), COMPRESSION_LEVEL
+        )
         if content_type == "text/csv":
-            return get_expenses_csv(expenses)
+            response = get_expenses_csv(rows, encoding)
+        elif content_type == COLUMNAR_CONTENT_TYPE:
+            response = get_expenses_columnar(rows, encoding)
         else:
-            return get_expenses_json(expenses)
+            response = get_expenses_json(rows, encoding)
+        if next_cursor:
+            response.headers["X-Next-Page-Token"] = next_cursor.encode()
+        return conditional_headers(response, etag)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def conditional_headers(response, etag):
+    response.headers.update(etag_headers(etag))
+    return response
+
+
+@expenses.route("/expenses/total", methods=["GET"])
+def get_expense_total():
+    try:
+        total = services().report_service.total(parse_filter(request.args))
+        return jsonify(total_to_json(total))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@expenses.route("/reports/monthly", methods=["GET"])
+def get_monthly_report():
+    try:
+        summaries = services().report_service.monthly_summary(
+            parse_filter(request.args)
+        )
+        return jsonify([summary_to_json(summary) for summary in summaries])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@expenses.route("/reports/yearly", methods=["GET"])
+def get_yearly_report():
+    try:
+        summaries = services().report_service.yearly_summary(parse_filter(request.args))
+        return jsonify([summary_to_json(summary) for summary in summaries])
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
 
 
+@expenses.route("/reports/trends", methods=["GET"])
+def get_category_trends():
+    try:
+        trends = services().report_service.category_trends(
+            parse_filter(request.args), request.args.get("granularity", "month")
+        )
+        return jsonify(trends_to_json(trends))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+app = create_app()
+
+
+def __getattr__(name):
+    # The database and services of ``app``, for callers that used to import
+    # them from this module; reading them opens the database.
+    if name in ("database", "expense_service", "report_service"):
+        return getattr(app.extensions["expenses"], name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,365 @@
+"""An asyncio-native (ASGI) variant of the /expenses endpoints of app.rest.api.
+
+The endpoints accept and return the same data as the Flask app, but database
+calls go through an AsyncDatabase, so one process serves many concurrent
+connections without a thread per request. Run it with any ASGI server, e.g.:
+
+    uvicorn --factory app.rest.asgi:create_app
+"""
+
+import json
+from typing import Optional
+from urllib.parse import parse_qsl
+from app.expense_manager.async_expense_service import AsyncExpenseService
+from app.expense_manager.pagination import PageCursor
+from app.external.async_database import AsyncDatabase
+from app.external.clock import SystemClock
+from app.external.database import Database, to_expense_row
+from app.external.read_session import begin_read_session, current_read_session
+from app.rest.serializers import (
+    COLUMNAR_CONTENT_TYPE,
+    batch_result_to_json,
+    batch_status,
+    batched,
+    columnar_chunk,
+    columnar_end,
+    columnar_header,
+    create_compressor,
+    csv_chunk,
+    db_expense_to_json,
+    etag_headers,
+    etag_matches,
+    expenses_etag,
+    json_chunk,
+    json_end,
+    negotiate_encoding,
+    parse_expense,
+    parse_expense_batch,
+    parse_filter,
+    parse_page_size,
+)
+from app.rest.settings import (
+    COLUMNAR_ROW_GROUP_ROWS,
+    COMPRESSION_LEVEL,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    POSITION_HEADER,
+    STREAM_CHUNK_ROWS,
+    create_cache,
+    create_database,
+)
+
+
+JSON_CONTENT_TYPE = b"application/json"
+CSV_CONTENT_TYPE = b"text/csv; charset=utf-8"
+
+
+class ExpenseApp:
+    """An ASGI application serving the /expenses endpoints.
+
+    Attributes:
+        database (AsyncDatabase): The database used by the endpoints.
+        expense_service (AsyncExpenseService): The service handling expenses.
+    """
+
+    def __init__(
+        self,
+        database: AsyncDatabase,
+        expense_service: AsyncExpenseService,
+        owns_database: bool = False,
+    ):
+        self.database = database
+        self.expense_service = expense_service
+        self._owns_database = owns_database
+        self._routes = {
+            "/expenses": {"GET": self.get_expenses, "POST": self.create_expense},
+            "/expenses/batch": {"POST": self.create_expenses},
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        methods = self._routes.get(scope["path"])
+        if methods is None:
+            await send_json(send, {"error": "Not found"}, 404)
+            return
+        handler = methods.get(scope["method"])
+        if handler is None:
+            await send_json(send, {"error": "Method not allowed"}, 405)
+            return
+        request = Request(scope, receive)
+        try:
+            position = int(request.headers.get(POSITION_HEADER.lower().encode(), 0))
+        except ValueError:
+            await send_json(send, {"error": f"Invalid {POSITION_HEADER} header"}, 400)
+            return
+        begin_read_session(position)
+        await handler(request, add_read_position(send))
+
+    async def create_expense(self, request, send):
+        try:
+            expense = parse_expense(await request.json())
+            created_expense = await self.expense_service.create_expense(expense)
+        except ValueError as e:
+            await send_json(send, {"error": str(e)}, 400)
+            return
+        await send_json(send, db_expense_to_json(created_expense), 201)
+
+    async def create_expenses(self, request, send):
+        try:
+            expenses, positions, errors = parse_expense_batch(await request.json())
+        except ValueError as e:
+            await send_json(send, {"error": str(e)}, 400)
+            return
+
+        result = await self.expense_service.create_expenses(expenses)
+        await send_json(
+            send,
+            batch_result_to_json(result, positions, errors),
+            batch_status(result, errors),
+        )
+
+    async def get_expenses(self, request, send):
+        page_size = request.args.get("page_size")
+        page_token = request.args.get("page_token")
+        paginated = page_size is not None or page_token is not None
+
+        headers = []
+        try:
+            expense_filter = parse_filter(
+                request.args,
+                page_size=(
+                    parse_page_size(page_size, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+                    if paginated
+                    else None
+                ),
+                after=PageCursor.decode(page_token) if page_token else None,
+                search=request.args.get("search") or None,
+            )
+            expense_filter.validate()
+            requested_type = request.headers.get(b"content-type", b"").lower()
+            # Read before the expenses, as in the Flask app.
+            version = await self.expense_service.get_data_version(expense_filter)
+            etag = expenses_etag(expense_filter, requested_type.decode(), version)
+            headers.extend(encode_headers(etag_headers(etag)))
+            if etag_matches(header_value(request, b"if-none-match"), etag):
+                await send(
+                    {"type": "http.response.start", "status": 304, "headers": headers}
+                )
+                await send({"type": "http.response.body", "body": b""})
+                return
+            if paginated:
+                page = await self.expense_service.get_expenses_page(
+                    expense_filter, version
+                )
+                expenses = page.expenses
+                if page.next_cursor:
+                    headers.append(
+                        (b"x-next-page-token", page.next_cursor.encode().encode())
+                    )
+        except ValueError as e:
+            await send_json(send, {"error": str(e)}, 400)
+            return
+
+        encoding = negotiate_encoding(
+            header_value(request, b"accept-encoding"), COMPRESSION_LEVEL
+        )
+        if encoding:
+            headers.append((b"content-encoding", encoding.encode()))
+        if requested_type == b"text/csv":
+            content_type = CSV_CONTENT_TYPE
+            headers.append(
+                (b"content-disposition", b"attachment; filename=expenses.csv")
+            )
+        elif requested_type == COLUMNAR_CONTENT_TYPE.encode():
+            content_type = COLUMNAR_CONTENT_TYPE.encode()
+            headers.append(
+                (b"content-disposition", b"attachment; filename=expenses.bin")
+            )
+        else:
+            content_type = JSON_CONTENT_TYPE
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", content_type), *headers],
+            }
+        )
+        batch_rows = (
+            COLUMNAR_ROW_GROUP_ROWS
+            if content_type == COLUMNAR_CONTENT_TYPE.encode()
+            else STREAM_CHUNK_ROWS
+        )
+        if paginated:
+            batches = as_async_batches(
+                batched(map(to_expense_row, expenses), batch_rows)
+            )
+        else:
+            batches = async_batched(
+                self.expense_service.iter_expense_rows(expense_filter, version),
+                batch_rows,
+            )
+        if content_type == CSV_CONTENT_TYPE:
+            chunks = stream_csv(batches)
+        elif content_type == COLUMNAR_CONTENT_TYPE.encode():
+            chunks = stream_columnar(batches)
+        else:
+            chunks = stream_json(batches)
+        if encoding:
+            chunks = stream_compressed(chunks, encoding)
+        async for chunk in chunks:
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk if isinstance(chunk, bytes) else chunk.encode(),
+                    "more_body": True,
+                }
+            )
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def close(self):
+        self.database.close()
+        if self._owns_database:
+            self.database.database.close()
+
+
+class Request:
+    """The parts of an ASGI HTTP request the endpoints need."""
+
+    def __init__(self, scope, receive):
+        self.args = dict(parse_qsl(scope.get("query_string", b"").decode()))
+        self.headers = dict(scope.get("headers", []))
+        self._receive = receive
+
+    async def body(self) -> bytes:
+        chunks = []
+        while True:
+            message = await self._receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def json(self):
+        try:
+            return json.loads(await self.body())
+        except ValueError:
+            raise ValueError("Invalid JSON")
+
+
+def add_read_position(send):
+    """Wrap ``send`` to return the read session's position with the response."""
+
+    async def send_with_position(message):
+        session = current_read_session()
+        if message["type"] == "http.response.start" and session and session.position:
+            message = {
+                **message,
+                "headers": [
+                    *message.get("headers", []),
+                    (POSITION_HEADER.lower().encode(), str(session.position).encode()),
+                ],
+            }
+        await send(message)
+
+    return send_with_position
+
+
+def header_value(request, name) -> str:
+    return request.headers.get(name, b"").decode("latin-1")
+
+
+def encode_headers(headers):
+    return [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+
+
+async def send_json(send, data, status):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", JSON_CONTENT_TYPE)],
+        }
+    )
+    await send({"type": "http.response.body", "body": json.dumps(data).encode()})
+
+
+async def async_batched(rows, size):
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def as_async_batches(batches):
+    for batch in batches:
+        yield batch
+
+
+async def stream_json(batches):
+    first = True
+    async for batch in batches:
+        yield json_chunk(batch, first)
+        first = False
+    yield json_end(first)
+
+
+async def stream_csv(batches):
+    yield csv_chunk([], header=True)
+    async for batch in batches:
+        yield csv_chunk(batch)
+
+
+async def stream_columnar(batches):
+    yield columnar_header()
+    async for batch in batches:
+        yield columnar_chunk(batch)
+    yield columnar_end()
+
+
+async def stream_compressed(chunks, encoding):
+    compressor = create_compressor(encoding, COMPRESSION_LEVEL)
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def create_app(database: Optional[Database] = None, read_workers: int = 4):
+    """Create the ASGI application.
+
+    Args:
+        database (Optional[Database]): The database to serve. By default the
+            SQLite database configured by the environment is opened, as for
+            the Flask app, and closed on lifespan shutdown.
+        read_workers (int): Threads running database reads.
+
+    Returns:
+        ExpenseApp: The ASGI application.
+    """
+    owns_database = database is None
+    if database is None:
+        database = create_database()
+    clock = SystemClock()
+    async_database = AsyncDatabase(database, read_workers=read_workers)
+    expense_service = AsyncExpenseService(clock, async_database, create_cache(clock))
+    return ExpenseApp(async_database, expense_service, owns_database)
@@ -0,0 +1,53 @@
+"""Request and serialization metrics for the Flask app, and its /metrics endpoint."""
+
+import time
+from flask import Flask, Response, g, request
+from app.metrics import CONTENT_TYPE, MetricsRegistry
+
+
+def instrument_app(app: Flask, registry: MetricsRegistry):
+    """Time every request by route and serve ``registry`` at GET /metrics.
+
+    A streamed response is timed until its last chunk has been sent.
+    """
+    request_seconds = registry.histogram(
+        "expenses_http_request_seconds",
+        "Time to handle a request and send the whole response.",
+        ["method", "route", "status"],
+    )
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop("request_start", None)
+        if start is None:
+            return response
+        labels = (
+            request.method,
+            request.url_rule.rule if request.url_rule else "unmatched",
+            str(response.status_code),
+        )
+        response.call_on_close(
+            lambda: request_seconds.observe(time.perf_counter() - start, labels)
+        )
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def get_metrics():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+def serialization_timers(registry: MetricsRegistry) -> dict:
+    """Callbacks recording serialization time, keyed by response format."""
+    seconds = registry.histogram(
+        "expenses_serialization_seconds",
+        "Time spent serializing chunks of GET /expenses responses.",
+        ["format"],
+    )
+    return {
+        format: lambda elapsed, labels=(format,): seconds.observe(elapsed, labels)
+        for format in ("json", "csv", "columnar")
+    }
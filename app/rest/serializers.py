@@ -0,0 +1,563 @@
+"""Request parsing and response serialization shared by the Flask and ASGI apps."""
+
+import hashlib
+import struct
+import sys
+import time
+import zlib
+from array import array
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from io import StringIO
+from functools import lru_cache
+from itertools import accumulate, islice
+from json.encoder import encode_basestring_ascii as encode_json_string
+from typing import Callable, Iterable, Iterator, Mapping, Optional, Union
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.external.database import ExpenseRow, to_cents
+from app.models.category import CATEGORIES_BY_VALUE, Category
+from app.models.expense import Expense
+
+
+CSV_HEADER = ["Amount", "Date", "Category", "Description"]
+
+# A compact binary export that stores each column of a row group contiguously:
+#
+#   header:    b"EXPC", version (u8), category count (u8), then each category
+#              name as its UTF-8 length (u8) and bytes
+#   row group: row count (u32), then for the n rows
+#              amount_cents  i64[n]
+#              date          i32[n]    days since 1970-01-01
+#              category      u8[n]     index into the header's categories
+#              has_desc      u8[n]     0 where the description is null
+#              desc_offsets  u32[n+1]  into desc_data
+#              desc_data     UTF-8 bytes
+#   end:       a row group with a row count of 0
+#
+# All integers are little-endian.
+COLUMNAR_CONTENT_TYPE = "application/vnd.expenses.columnar"
+COLUMNAR_MAGIC = b"EXPC"
+COLUMNAR_VERSION = 1
+COLUMNAR_CATEGORIES = [category.value for category in Category]
+COLUMNAR_CATEGORY_CODES = {name: code for code, name in enumerate(COLUMNAR_CATEGORIES)}
+UNIX_EPOCH_DAY = date(1970, 1, 1).toordinal()
+ROW_COUNT = struct.Struct("<I")
+
+# zlib window bits for each supported Content-Encoding. HTTP's "deflate" is the
+# zlib format, not raw deflate.
+CONTENT_ENCODINGS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def parse_expense(data):
+    if not isinstance(data, dict):
+        raise ValueError("Expected an expense object")
+    try:
+        amount = data["amount"]
+    except KeyError:
+        raise ValueError("Missing field: amount")
+    # Decimal also accepts tuples, lists and booleans, none of which is an amount.
+    if isinstance(amount, bool) or not isinstance(amount, (str, int, float)):
+        raise ValueError("Invalid amount")
+    try:
+        # A JSON number such as 19.99 arrives as the nearest binary float;
+        # its shortest repr is the number that was written.
+        amount = Decimal(str(amount) if isinstance(amount, float) else amount)
+    except InvalidOperation:
+        raise ValueError("Invalid amount")
+    description = data.get("description")
+    if description is not None and not isinstance(description, str):
+        raise ValueError("Invalid description")
+    try:
+        expense_date = datetime.fromisoformat(data["date"]).date()
+        category = data["category"]
+    except KeyError as e:
+        raise ValueError(f"Missing field: {e.args[0]}")
+    except TypeError:
+        raise ValueError("Invalid date")
+    if not isinstance(category, str):
+        raise ValueError("Invalid category")
+    return Expense(
+        amount=amount,
+        date=expense_date,
+        category=Category(category),
+        description=description,
+    )
+
+
+def parse_expense_batch(data):
+    """Parse a batch request body.
+
+    Returns the parsed expenses, the position of each of them in ``data`` and
+    the parse errors keyed by position.
+    """
+    if not isinstance(data, list):
+        raise ValueError("Expected a list of expenses")
+
+    errors = {}
+    positions = []
+    expenses = []
+    for index, item in enumerate(data):
+        try:
+            expenses.append(parse_expense(item))
+            positions.append(index)
+        except ValueError as e:
+            errors[index] = str(e)
+    return expenses, positions, errors
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[tuple[int, Union[list, ValueError]]]:
+    """Yield the line number and fields of each record of a CSV export.
+
+    ``lines`` must be in the layout written by ``iter_csv``, header included.
+    Blank lines are skipped. A record spanning several lines, because of a
+    quoted newline, is numbered by its first line. A record the CSV reader
+    rejects, such as one with a field over ``csv.field_size_limit()``, is
+    yielded as a ValueError, which ``parse_csv_expense`` raises; reading goes
+    on with the next line. Decode ``lines`` with ``errors="surrogateescape"``
+    so that bytes that are not UTF-8 reach ``parse_csv_expense``, which rejects
+    their record, instead of failing the import part-way.
+    """
+    import csv
+
+    reader = csv.reader(lines)
+    try:
+        header = next(reader, None)
+    except csv.Error:
+        header = None
+    if header != CSV_HEADER:
+        raise ValueError(f"Expected the CSV header {','.join(CSV_HEADER)}")
+    line = reader.line_num
+    while True:
+        try:
+            fields = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield line + 1, ValueError(f"Invalid CSV: {e}")
+        else:
+            if fields:
+                yield line + 1, fields
+        line = reader.line_num
+
+
+def parse_csv_expense(fields: Union[list, ValueError]) -> Expense:
+    """Parse the fields of a record read by ``read_csv``.
+
+    An empty description is read as no description, which is how ``iter_csv``
+    writes one.
+    """
+    if isinstance(fields, ValueError):
+        raise fields
+    try:
+        "".join(fields).encode()
+    except UnicodeEncodeError:
+        raise ValueError("Invalid UTF-8")
+    if len(fields) != len(CSV_HEADER):
+        raise ValueError(f"Expected {len(CSV_HEADER)} fields, found {len(fields)}")
+    amount, day, category, description = fields
+    try:
+        amount = Decimal(amount)
+    except InvalidOperation:
+        raise ValueError("Invalid amount")
+    try:
+        day = date.fromisoformat(day)
+    except ValueError:
+        raise ValueError("Invalid date")
+    try:
+        category = CATEGORIES_BY_VALUE[category]
+    except KeyError:
+        raise ValueError(f"{category!r} is not a valid Category")
+    return Expense(
+        amount=amount, date=day, category=category, description=description or None
+    )
+
+
+def parse_page_size(page_size, default, maximum):
+    if page_size is None:
+        return default
+    try:
+        page_size = int(page_size)
+    except ValueError:
+        raise ValueError("page_size must be an integer")
+    if not 1 <= page_size <= maximum:
+        raise ValueError(f"page_size must be between 1 and {maximum}")
+    return page_size
+
+
+def parse_filter(args: Mapping, **kwargs) -> ExpenseFilter:
+    from_date = args.get("from_date")
+    to_date = args.get("to_date")
+    category = args.get("category")
+    return ExpenseFilter(
+        from_date=datetime.fromisoformat(from_date).date() if from_date else None,
+        to_date=datetime.fromisoformat(to_date).date() if to_date else None,
+        category=Category(category) if category else None,
+        **kwargs,
+    )
+
+
+def db_expense_to_json(db_expense):
+    return {
+        "id": db_expense.id,
+        "amount": format_cents(to_cents(db_expense.amount)),
+        "date": db_expense.date.isoformat(),
+        "category": db_expense.category,
+        "description": db_expense.description,
+    }
+
+
+def batch_status(result, errors) -> int:
+    """201 if every expense was created, 207 if some were, 400 if none were."""
+    if not errors and not result.errors:
+        return 201
+    return 207 if result.created else 400
+
+
+def batch_result_to_json(result, positions, errors):
+    errors = {
+        **errors,
+        **{positions[index]: error for index, error in result.errors.items()},
+    }
+    return {
+        "created": [
+            {"index": positions[index], **db_expense_to_json(db_expense)}
+            for index, db_expense in result.created.items()
+        ],
+        "errors": [
+            {"index": index, "error": error} for index, error in sorted(errors.items())
+        ],
+    }
+
+
+def import_status(report) -> int:
+    """201 if every row was imported, 207 if some were, 400 if none were."""
+    if not report.errors:
+        return 201
+    return 207 if report.imported else 400
+
+
+def import_report_to_json(report):
+    return {
+        "imported": report.imported,
+        "errors": [
+            {"line": line, "error": error}
+            for line, error in sorted(report.errors.items())
+        ],
+        "seconds": round(report.seconds, 3),
+        "rows_per_second": round(report.rows_per_second),
+    }
+
+
+def expense_to_json(expense):
+    return {
+        "amount": format_cents(to_cents(expense.amount)),
+        "date": expense.date.isoformat(),
+        "category": expense.category.value,
+        "description": expense.description,
+    }
+
+
+def expense_to_row(expense: Expense, expense_id: int) -> ExpenseRow:
+    return (
+        expense_id,
+        to_cents(expense.amount),
+        expense.date.toordinal(),
+        expense.category.value,
+        expense.description,
+    )
+
+
+@lru_cache(maxsize=65536)
+def format_cents(cents: int) -> str:
+    """Format integer cents the way ``str`` formats a two-place Decimal."""
+    sign = "-" if cents < 0 else ""
+    units, cents = divmod(abs(cents), 100)
+    return f"{sign}{units}.{cents:02d}"
+
+
+@lru_cache(maxsize=65536)
+def format_day(day: int) -> str:
+    return date.fromordinal(day).isoformat()
+
+
+def row_to_json(row: ExpenseRow) -> str:
+    """Serialize a row exactly like ``json.dumps(expense_to_json(...))``."""
+    _, cents, day, category, description = row
+    return (
+        f'{{"amount": "{format_cents(cents)}", "date": "{format_day(day)}", '
+        f'"category": {encode_json_string(category)}, "description": '
+        f'{"null" if description is None else encode_json_string(description)}}}'
+    )
+
+
+def json_chunk(rows: Iterable[ExpenseRow], first: bool) -> str:
+    """Serialize a non-empty run of rows as part of a JSON array."""
+    return ("[" if first else ",") + ",".join(map(row_to_json, rows))
+
+
+def json_end(empty: bool) -> str:
+    return "[]" if empty else "]"
+
+
+def csv_chunk(rows: Iterable[ExpenseRow], header: bool = False) -> str:
+    # Imported on the first CSV response; most traffic is JSON.
+    import csv
+
+    csv_data = StringIO()
+    csv_writer = csv.writer(csv_data)
+    if header:
+        csv_writer.writerow(CSV_HEADER)
+    csv_writer.writerows(
+        (format_cents(cents), format_day(day), category, description)
+        for _, cents, day, category, description in rows
+    )
+    return csv_data.getvalue()
+
+
+def columnar_header() -> bytes:
+    header = bytearray(COLUMNAR_MAGIC)
+    header += bytes([COLUMNAR_VERSION, len(COLUMNAR_CATEGORIES)])
+    for name in COLUMNAR_CATEGORIES:
+        encoded = name.encode()
+        header += bytes([len(encoded)]) + encoded
+    return bytes(header)
+
+
+def columnar_chunk(rows: Iterable[ExpenseRow]) -> bytes:
+    """Serialize a non-empty run of rows as one row group."""
+    _, cents, days, categories, descriptions = zip(*rows)
+    encoded = [
+        b"" if description is None else description.encode()
+        for description in descriptions
+    ]
+    columns = [
+        array("q", cents),
+        array("i", [day - UNIX_EPOCH_DAY for day in days]),
+        array("I", accumulate(map(len, encoded), initial=0)),
+    ]
+    if sys.byteorder == "big":
+        for column in columns:
+            column.byteswap()
+    return b"".join(
+        [
+            ROW_COUNT.pack(len(cents)),
+            columns[0].tobytes(),
+            columns[1].tobytes(),
+            bytes(map(COLUMNAR_CATEGORY_CODES.__getitem__, categories)),
+            bytes(description is not None for description in descriptions),
+            columns[2].tobytes(),
+            *encoded,
+        ]
+    )
+
+
+def columnar_end() -> bytes:
+    return ROW_COUNT.pack(0)
+
+
+def read_columnar(data: bytes) -> Iterator[dict]:
+    """Read a columnar export back, one dict of columns per row group.
+
+    The columns are "amount_cents" and "date", as arrays of integers with dates
+    in days since 1970-01-01, and "category" and "description", as lists.
+    """
+    view = memoryview(data)
+    if bytes(view[:4]) != COLUMNAR_MAGIC or view[4] != COLUMNAR_VERSION:
+        raise ValueError("Not a columnar expense export")
+    categories = []
+    position = 6
+    for _ in range(view[5]):
+        length = view[position]
+        categories.append(str(view[position + 1 : position + 1 + length], "utf-8"))
+        position += 1 + length
+
+    def column(typecode, count):
+        nonlocal position
+        values = array(typecode)
+        values.frombytes(view[position : position + values.itemsize * count])
+        if sys.byteorder == "big":
+            values.byteswap()
+        position += values.itemsize * count
+        return values
+
+    while True:
+        (rows,) = ROW_COUNT.unpack_from(view, position)
+        position += ROW_COUNT.size
+        if not rows:
+            return
+        cents = column("q", rows)
+        days = column("i", rows)
+        codes = column("B", rows)
+        has_description = column("B", rows)
+        offsets = column("I", rows + 1)
+        text = view[position : position + offsets[-1]]
+        position += offsets[-1]
+        yield {
+            "amount_cents": cents,
+            "date": days,
+            "category": [categories[code] for code in codes],
+            "description": [
+                (
+                    str(text[offsets[row] : offsets[row + 1]], "utf-8")
+                    if has_description[row]
+                    else None
+                )
+                for row in range(rows)
+            ],
+        }
+
+
+def iter_json(
+    rows: Iterable[ExpenseRow], chunk_rows: int, timer: Optional[Callable] = None
+) -> Iterator[str]:
+    """Serialize rows as a JSON array, ``chunk_rows`` rows per chunk.
+
+    ``timer``, when given, is called with the seconds spent serializing each
+    chunk, not counting the time spent reading its rows.
+    """
+    first = True
+    for batch in batched(rows, chunk_rows):
+        yield timed(json_chunk, timer, batch, first)
+        first = False
+    yield json_end(first)
+
+
+def iter_csv(
+    rows: Iterable[ExpenseRow], chunk_rows: int, timer: Optional[Callable] = None
+) -> Iterator[str]:
+    """Serialize rows as CSV with a header, ``chunk_rows`` rows per chunk.
+
+    ``timer`` is used as in ``iter_json``.
+    """
+    yield csv_chunk([], header=True)
+    for batch in batched(rows, chunk_rows):
+        yield timed(csv_chunk, timer, batch)
+
+
+def compress(chunks: Iterable, encoding: str, level: int) -> Iterator[bytes]:
+    """Encode and compress streamed chunks with ``encoding`` from CONTENT_ENCODINGS.
+
+    Output is yielded whenever zlib has produced some, so memory use stays
+    bounded for large bodies.
+    """
+    compressor = create_compressor(encoding, level)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def create_compressor(encoding: str, level: int):
+    """A zlib compressor producing ``encoding`` from CONTENT_ENCODINGS."""
+    return zlib.compressobj(level, zlib.DEFLATED, CONTENT_ENCODINGS[encoding])
+
+
+def negotiate_encoding(accept_encoding: str, level: int) -> Optional[str]:
+    """The encoding from CONTENT_ENCODINGS to send a response in, if any.
+
+    ``accept_encoding`` is the Accept-Encoding header of the request. The
+    encoding with the highest quality wins, gzip on a tie. Nothing is
+    compressed when ``level`` is 0.
+    """
+    if not level:
+        return None
+    qualities = {}
+    for item in accept_encoding.split(","):
+        name, *params = item.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    default = qualities.get("*", 0.0)
+    best = max(CONTENT_ENCODINGS, key=lambda name: qualities.get(name, default))
+    return best if qualities.get(best, default) > 0 else None
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag`` by weak comparison."""
+    return any(
+        tag == "*" or tag.removeprefix("W/").strip('"') == etag
+        for tag in (tag.strip() for tag in if_none_match.split(","))
+    )
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    """Headers of a response validated by ``etag``, and of its 304.
+
+    The tag is weak because the gzip and deflate encodings of a body share it.
+    """
+    return {
+        "ETag": f'W/"{etag}"',
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+
+
+def expenses_etag(filter: ExpenseFilter, content_type: str, version) -> str:
+    """A validator for one representation of the expenses matching ``filter``.
+
+    ``version`` must change whenever an expense matching ``filter`` is
+    created, like the value of ExpenseService.get_data_version.
+    """
+    key = repr((filter, content_type, version)).encode()
+    return hashlib.blake2b(key, digest_size=16).hexdigest()
+
+
+def iter_columnar(
+    rows: Iterable[ExpenseRow], group_rows: int, timer: Optional[Callable] = None
+) -> Iterator[bytes]:
+    """Serialize rows in the columnar format, ``group_rows`` rows per group.
+
+    ``timer`` is used as in ``iter_json``.
+    """
+    yield columnar_header()
+    for batch in batched(rows, group_rows):
+        yield timed(columnar_chunk, timer, batch)
+    yield columnar_end()
+
+
+def timed(function, timer, *args):
+    if timer is None:
+        return function(*args)
+    start = time.perf_counter()
+    result = function(*args)
+    timer(time.perf_counter() - start)
+    return result
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+def summary_to_json(summary):
+    return {
+        "period": summary.period,
+        "total": str(summary.total),
+        "count": summary.count,
+        "categories": {
+            category.value: str(total)
+            for category, total in summary.by_category.items()
+        },
+    }
+
+
+def total_to_json(total):
+    return {"total": str(total.total), "count": total.count}
+
+
+def trends_to_json(trends):
+    return {
+        category.value: [
+            {"period": point.period, "total": str(point.total), "count": point.count}
+            for point in points
+        ]
+        for category, points in trends.items()
+    }
@@ -0,0 +1,134 @@
+"""Configuration read from the environment, shared by the Flask and ASGI apps.
+
+The optional wrappers of the database and the report service are imported by
+``create_database`` and ``create_report_service`` only when the environment
+enables them, so a worker does not load them, or the multiprocessing behind
+ParallelReportService, at boot.
+"""
+
+import os
+from datetime import timedelta
+from typing import Optional
+from app.expense_manager.expense_cache import ExpenseCache, instrument_cache
+from app.expense_manager.report_service import ReportService
+from app.external.clock import Clock
+from app.external.database import Database, SQLiteDatabase, SQLITE_PROFILES
+from app.metrics import MetricsRegistry
+
+
+DATABASE_FILE = "expenses.db"
+
+# Carries the session position of ReplicatedDatabase between a client's
+# requests: returned after writes and sent back to read them.
+POSITION_HEADER = "X-Expenses-Position"
+
+# Rows serialized into each chunk of a streamed GET /expenses response.
+STREAM_CHUNK_ROWS = 500
+
+# Rows per row group of a streamed columnar GET /expenses response.
+COLUMNAR_ROW_GROUP_ROWS = 10000
+
+# Rows of POST /expenses/import parsed, validated and saved together, and the
+# worker processes that parse and validate them; 0 does both in the request's
+# thread.
+IMPORT_BATCH_ROWS = 10000
+IMPORT_WORKERS = int(os.environ.get("EXPENSES_IMPORT_WORKERS", "0"))
+
+DEFAULT_PAGE_SIZE = int(os.environ.get("EXPENSES_DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.environ.get("EXPENSES_MAX_PAGE_SIZE", "1000"))
+
+# zlib level for gzip/deflate responses; 0 disables compression. Level 1 gets
+# most of the size reduction of JSON and CSV exports at a fraction of the CPU.
+COMPRESSION_LEVEL = int(os.environ.get("EXPENSES_COMPRESSION_LEVEL", "1"))
+
+
+def create_database(metrics: Optional[MetricsRegistry] = None) -> Database:
+    """Open the configured database, instrumented when ``metrics`` is given."""
+    pool_size = int(os.environ.get("EXPENSES_DB_POOL_SIZE", "5"))
+    profile = SQLITE_PROFILES[os.environ.get("EXPENSES_DB_PROFILE", "performance")]
+    shard_directory = os.environ.get("EXPENSES_DB_SHARD_DIR")
+    database: Database
+    if shard_directory:
+        from app.external.sharded_database import ShardedDatabase
+
+        database = ShardedDatabase(
+            shard_directory, pool_size=pool_size, profile=profile
+        )
+    else:
+        database = sqlite_database = SQLiteDatabase(
+            DATABASE_FILE, pool_size=pool_size, profile=profile
+        )
+        if metrics:
+            from app.external.instrumented_database import instrument_pool
+
+            instrument_pool(sqlite_database.pool, metrics)
+    primary = database
+    group_size = int(os.environ.get("EXPENSES_GROUP_COMMIT_SIZE", "0"))
+    # A failed group is retried write by write, which would save again the
+    # shards a multi-year batch had already committed, so shards are not grouped.
+    if group_size and isinstance(primary, SQLiteDatabase):
+        from app.external.group_commit_database import GroupCommitDatabase
+
+        database = GroupCommitDatabase(
+            database,
+            max_group_size=group_size,
+            max_delay=float(os.environ.get("EXPENSES_GROUP_COMMIT_DELAY_MS", "2"))
+            / 1000,
+        )
+        if metrics:
+            from app.external.instrumented_database import instrument_group_commit
+
+            instrument_group_commit(database, metrics)
+    replica_files = os.environ.get("EXPENSES_DB_REPLICAS")
+    # Replicas are copies of one SQLite file, so shards are not replicated.
+    if replica_files and isinstance(primary, SQLiteDatabase):
+        from app.external.replicated_database import ReplicatedDatabase
+
+        max_staleness = float(os.environ.get("EXPENSES_REPLICA_MAX_STALENESS", "2"))
+        database = ReplicatedDatabase(
+            primary,
+            replica_files.split(","),
+            max_staleness=timedelta(seconds=max_staleness),
+            sync_interval=max_staleness / 4,
+            writer=database,
+            pool_size=pool_size,
+        )
+    if metrics:
+        from app.external.instrumented_database import InstrumentedDatabase
+
+        database = InstrumentedDatabase(database, metrics)
+    return database
+
+
+def create_metrics() -> Optional[MetricsRegistry]:
+    """A registry when EXPENSES_METRICS is enabled; otherwise nothing is measured."""
+    if os.environ.get("EXPENSES_METRICS", "0").lower() in ("0", "false", "no", ""):
+        return None
+    return MetricsRegistry()
+
+
+def create_report_service(database: Database) -> ReportService:
+    """Summaries run on EXPENSES_REPORT_WORKERS processes when it is above 1."""
+    workers = int(os.environ.get("EXPENSES_REPORT_WORKERS", "0"))
+    if workers > 1 and not os.environ.get("EXPENSES_DB_SHARD_DIR"):
+        from app.expense_manager.parallel_report_service import ParallelReportService
+
+        return ParallelReportService(database, DATABASE_FILE, workers=workers)
+    return ReportService(database)
+
+
+def create_cache(
+    clock: Clock, metrics: Optional[MetricsRegistry] = None
+) -> Optional[ExpenseCache]:
+    """A cache of EXPENSES_CACHE_SIZE results, whose stats go to ``metrics``."""
+    cache_size = int(os.environ.get("EXPENSES_CACHE_SIZE", "0"))
+    if not cache_size:
+        return None
+    cache = ExpenseCache(
+        clock,
+        max_entries=cache_size,
+        ttl=timedelta(seconds=float(os.environ.get("EXPENSES_CACHE_TTL", "60"))),
+    )
+    if metrics:
+        instrument_cache(cache, metrics)
+    return cache
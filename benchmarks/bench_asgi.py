@@ -0,0 +1,130 @@
+"""Throughput and latency of the Flask and ASGI apps under concurrent load.
+
+Both apps serve the same SQLite file in process, so the numbers compare the
+serving models rather than the network stack: the Flask app gets one thread
+per in-flight request, the ASGI app runs every request on one event loop with
+database calls on its reader and writer threads. One request in
+``--write-every`` is a POST, the rest read a page of expenses.
+
+Usage:
+    python -m benchmarks.bench_asgi --rows 20000 --requests 2000 --concurrency 8 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from app.external.database import PERFORMANCE_PROFILE, SQLiteDatabase
+from app.rest.asgi import create_app
+from app.rest.serializers import expense_to_json
+from benchmarks.data import START_DATE, generate_expenses
+
+
+def make_requests(count, write_every):
+    new_expenses = generate_expenses(count, seed=1)
+    for index, expense in zip(range(count), new_expenses):
+        if index % write_every == 0:
+            yield "POST", "/expenses", "", expense_to_json(expense)
+        else:
+            from_date = START_DATE + timedelta(days=index * 7 % 3000)
+            yield "GET", "/expenses", f"from_date={from_date}&page_size=50", None
+
+
+def summarize(name, concurrency, latencies, elapsed):
+    latencies.sort()
+    print(
+        f"{name:<6} concurrency={concurrency:>4} "
+        f"requests/s={len(latencies) / elapsed:>8.0f} "
+        f"p50={statistics.median(latencies) * 1000:>7.2f}ms "
+        f"p99={latencies[int(len(latencies) * 0.99)] * 1000:>7.2f}ms"
+    )
+
+
+def run_flask(database, requests, concurrency):
+    from app.rest.api import create_app
+
+    client = create_app(database).test_client()
+
+    def handle(request):
+        method, path, query, body = request
+        start = time.perf_counter()
+        response = client.open(path, method=method, query_string=query, json=body)
+        response.get_data()
+        assert response.status_code < 300, response.get_data()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        latencies = list(executor.map(handle, requests))
+    summarize("flask", concurrency, latencies, time.perf_counter() - start)
+
+
+def run_asgi(database, requests, concurrency, read_workers):
+    app = create_app(database, read_workers=read_workers)
+
+    async def handle(request, slots):
+        method, path, query, body = request
+        messages = [{"type": "http.request", "body": json.dumps(body).encode()}]
+        status = []
+
+        async def receive():
+            return messages.pop()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "query_string": query.encode(),
+            "headers": [(b"content-type", b"application/json")],
+        }
+        async with slots:
+            start = time.perf_counter()
+            await app(scope, receive, send)
+            assert status[0] < 300
+            return time.perf_counter() - start
+
+    async def load():
+        slots = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(handle(request, slots) for request in requests))
+
+    start = time.perf_counter()
+    latencies = asyncio.run(load())
+    summarize("asgi", concurrency, latencies, time.perf_counter() - start)
+    app.database.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 64])
+    parser.add_argument("--write-every", type=int, default=10)
+    parser.add_argument("--read-workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = SQLiteDatabase(
+            os.path.join(directory, "bench.db"),
+            pool_size=max(args.concurrency) + 1,
+            profile=PERFORMANCE_PROFILE,
+        )
+        database.save_expenses(generate_expenses(args.rows))
+        requests = list(make_requests(args.requests, args.write_every))
+
+        for concurrency in args.concurrency:
+            run_flask(database, requests, concurrency)
+            run_asgi(database, requests, concurrency, args.read_workers)
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
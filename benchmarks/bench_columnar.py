@@ -0,0 +1,67 @@
+"""Memory use and filter latency of MockDatabase versus ColumnarDatabase.
+
+Usage:
+    python -m benchmarks.bench_columnar --rows 200000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import timedelta
+from app.external.columnar_database import ColumnarDatabase
+from app.external.database import MockDatabase
+from app.models.category import Category
+from benchmarks.data import START_DATE, generate_expenses
+
+
+def load(database_class, rows):
+    gc.collect()
+    tracemalloc.start()
+    database = database_class()
+    for expense in generate_expenses(rows):
+        database.save_expense(expense)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return database, used
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from_date = START_DATE + timedelta(days=1000)
+    queries = {
+        "month": (from_date, from_date + timedelta(days=30), None),
+        "category": (None, None, Category.FOOD.value),
+        "month+category": (
+            from_date,
+            from_date + timedelta(days=30),
+            Category.FOOD.value,
+        ),
+    }
+
+    for database_class in (MockDatabase, ColumnarDatabase):
+        database, used = load(database_class, args.rows)
+        timings = " ".join(
+            f"{name}={timed(lambda: database.find_expenses_by_filter(*query), args.repeat):.1f}ms"
+            for name, query in queries.items()
+        )
+        print(
+            f"{database_class.__name__:<17} memory={used / 2**20:>7.1f}MiB "
+            f"({used / args.rows:>5.0f}B/row) {timings}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Read throughput with and without a concurrent writer for each SQLite profile.
+
+Usage:
+    python -m benchmarks.bench_concurrent_reads --rows 2000 --duration 2
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from app.external.database import SQLITE_PROFILES, SQLiteDatabase
+from benchmarks.data import START_DATE, generate_expenses
+
+
+def run_readers(database, readers, duration, stop_writer=None):
+    reads = [0] * readers
+    errors = [0] * readers
+    deadline = time.monotonic() + duration
+
+    def read(index):
+        from_date = START_DATE + timedelta(days=index * 30)
+        to_date = from_date + timedelta(days=90)
+        while time.monotonic() < deadline:
+            try:
+                database.find_expenses_by_filter(from_date, to_date, None)
+                reads[index] += 1
+            except sqlite3.OperationalError:
+                errors[index] += 1
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if stop_writer:
+        stop_writer.set()
+    return sum(reads) / duration, sum(errors)
+
+
+def run_writer(database, stop):
+    result = {"writes": 0, "errors": 0}
+
+    def write():
+        for expense in generate_expenses(10**9, seed=1):
+            if stop.is_set():
+                return
+            try:
+                database.save_expense(expense)
+                result["writes"] += 1
+            except sqlite3.OperationalError:
+                result["errors"] += 1
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    return thread, result
+
+
+def benchmark_profile(name, profile, rows, readers, duration):
+    with tempfile.TemporaryDirectory() as directory:
+        database = SQLiteDatabase(
+            os.path.join(directory, "bench.db"),
+            pool_size=readers + 1,
+            profile=profile,
+        )
+        for expense in generate_expenses(rows):
+            database.save_expense(expense)
+
+        idle_reads, _ = run_readers(database, readers, duration)
+
+        stop = threading.Event()
+        writer, written = run_writer(database, stop)
+        busy_reads, read_errors = run_readers(database, readers, duration, stop)
+        writer.join()
+        database.close()
+
+    print(
+        f"{name:<12} reads/s idle={idle_reads:>9.0f} "
+        f"with-writer={busy_reads:>9.0f} "
+        f"ratio={busy_reads / idle_reads if idle_reads else 0:>5.2f} "
+        f"writes/s={written['writes'] / duration:>8.0f} "
+        f"errors={read_errors + written['errors']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=2.0)
+    args = parser.parse_args()
+
+    for name, profile in SQLITE_PROFILES.items():
+        benchmark_profile(name, profile, args.rows, args.readers, args.duration)
+
+
+if __name__ == "__main__":
+    main()
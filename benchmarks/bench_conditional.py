@@ -0,0 +1,64 @@
+"""Cost of a polled GET /expenses: full body, 304 Not Modified and compression.
+
+Requests go through the Flask test client against an in-memory SQLite
+database. The revalidation case sends the ETag of the previous response.
+
+Usage:
+    python -m benchmarks.bench_conditional --rows 100000
+"""
+
+import argparse
+import time
+from datetime import datetime, timezone
+from app.external.clock import MockClock
+from app.external.database import SQLiteDatabase
+from benchmarks.data import generate_expenses
+
+
+def best_of(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.rest.api import create_app
+
+    database = SQLiteDatabase(":memory:")
+    database.save_expenses(generate_expenses(args.rows))
+    client = create_app(
+        database, MockClock(datetime(2025, 1, 1, tzinfo=timezone.utc))
+    ).test_client()
+    etag = client.get("/expenses").headers["ETag"]
+
+    cases = {
+        "full body": {},
+        "gzip": {"Accept-Encoding": "gzip"},
+        "revalidated": {"If-None-Match": etag},
+    }
+    sizes = {}
+    timings = {}
+    for name, headers in cases.items():
+        sizes[name] = len(client.get("/expenses", headers=headers).data)
+        timings[name] = best_of(
+            lambda: client.get("/expenses", headers=headers).data, args.repeat
+        )
+    database.close()
+
+    for name in cases:
+        print(
+            f"{name:<12} {timings[name] * 1000:>9.2f}ms {sizes[name]:>10} bytes "
+            f"speedup={timings['full body'] / timings[name]:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Size and speed of the columnar export compared with CSV and JSON.
+
+Rows are read with ``iter_expense_rows`` from an in-memory SQLite database
+and serialized without going through Flask. Every export is also gzipped at
+the default compression level, and the timings include that compression.
+
+Usage:
+    python -m benchmarks.bench_export --rows 1000000
+"""
+
+import argparse
+import time
+import zlib
+from app.external.database import SQLiteDatabase
+from app.rest.serializers import iter_columnar, iter_csv, iter_json
+from app.rest.settings import COLUMNAR_ROW_GROUP_ROWS, STREAM_CHUNK_ROWS
+from benchmarks.data import generate_expenses
+
+
+def export(database, serializer, chunk_rows):
+    compressor = zlib.compressobj(1, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    size = compressed = 0
+    rows = database.iter_expense_rows(None, None, None)
+    for chunk in serializer(rows, chunk_rows):
+        data = chunk.encode() if isinstance(chunk, str) else chunk
+        size += len(data)
+        compressed += len(compressor.compress(data))
+    compressed += len(compressor.flush())
+    return size, compressed
+
+
+def best_of(function, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    database = SQLiteDatabase(":memory:")
+    database.save_expenses(generate_expenses(args.rows))
+
+    formats = {
+        "json": (iter_json, STREAM_CHUNK_ROWS),
+        "csv": (iter_csv, STREAM_CHUNK_ROWS),
+        "columnar": (iter_columnar, COLUMNAR_ROW_GROUP_ROWS),
+    }
+    results = {
+        name: best_of(lambda: export(database, serializer, chunk_rows), args.repeat)
+        for name, (serializer, chunk_rows) in formats.items()
+    }
+    database.close()
+
+    csv_seconds, (csv_size, _) = results["csv"]
+    for name, (seconds, (size, compressed)) in results.items():
+        print(
+            f"{name:<9} {seconds * 1000:>9.1f}ms {size:>12} bytes "
+            f"{compressed:>11} gzipped  size={size / csv_size:>5.2f}x csv "
+            f"speedup={csv_seconds / seconds:>5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Insert throughput of concurrent writers with and without group commit.
+
+Usage:
+    python -m benchmarks.bench_group_commit --writers 16 --writes 200
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from app.external.database import SQLITE_PROFILES, SQLiteDatabase
+from app.external.group_commit_database import GroupCommitDatabase
+from benchmarks.data import generate_expenses
+
+
+def run_writers(database, writers, writes):
+    def write(seed):
+        for expense in generate_expenses(writes, seed=seed):
+            database.save_expense(expense)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return writers * writes / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--group-size", type=int, default=64)
+    parser.add_argument("--delay-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    for name, profile in SQLITE_PROFILES.items():
+        with tempfile.TemporaryDirectory() as directory:
+            database = SQLiteDatabase(
+                os.path.join(directory, "direct.db"),
+                pool_size=args.writers,
+                profile=profile,
+            )
+            direct = run_writers(database, args.writers, args.writes)
+            database.close()
+
+            group_commit = GroupCommitDatabase(
+                SQLiteDatabase(os.path.join(directory, "group.db"), profile=profile),
+                max_group_size=args.group_size,
+                max_delay=args.delay_ms / 1000,
+            )
+            grouped = run_writers(group_commit, args.writers, args.writes)
+            metrics = group_commit.metrics()
+            group_commit.close()
+
+        print(
+            f"{name:<12} writes/s direct={direct:>8.0f} grouped={grouped:>8.0f} "
+            f"groups={metrics.groups:>6} largest={metrics.max_group_size:>4} "
+            f"mean-latency={metrics.mean_commit_seconds * 1000:>6.2f}ms "
+            f"max-latency={metrics.max_commit_seconds * 1000:>7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Bulk CSV import compared with creating the same expenses one at a time.
+
+A CSV export of synthetic expenses is written to a temporary file and
+imported into a fresh SQLite file, once with parsing in-process and once
+with each requested number of worker processes. The baseline saves
+``--single-rows`` of the expenses with ExpenseService.create_expense, one
+transaction each, as one POST /expenses per row would.
+
+Usage:
+    python -m benchmarks.bench_import --rows 200000 --workers 2 4
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from app.expense_manager.expense_importer import ExpenseImporter
+from app.expense_manager.expense_service import ExpenseService
+from app.external.clock import MockClock
+from app.external.database import SQLiteDatabase
+from app.rest.serializers import expense_to_row, iter_csv, parse_csv_expense, read_csv
+from benchmarks.data import generate_expenses
+
+
+CLOCK = MockClock(datetime(2025, 1, 1, tzinfo=timezone.utc))
+
+
+def import_file(directory, csv_file, workers, batch_size):
+    database = SQLiteDatabase(os.path.join(directory, f"import-{workers}.db"))
+    importer = ExpenseImporter(
+        ExpenseService(CLOCK, database),
+        parse_csv_expense,
+        batch_size=batch_size,
+        workers=workers,
+    )
+    with open(csv_file, encoding="utf-8", newline="") as lines:
+        report = importer.run(read_csv(lines))
+    database.close()
+    return report
+
+
+def create_one_by_one(directory, rows):
+    database = SQLiteDatabase(os.path.join(directory, "single.db"))
+    service = ExpenseService(CLOCK, database)
+    expenses = list(generate_expenses(rows))
+    start = time.perf_counter()
+    for expense in expenses:
+        service.create_expense(expense)
+    seconds = time.perf_counter() - start
+    database.close()
+    return rows / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--single-rows", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file = os.path.join(directory, "expenses.csv")
+        with open(csv_file, "w", encoding="utf-8", newline="") as output:
+            rows = (
+                expense_to_row(expense, expense_id)
+                for expense_id, expense in enumerate(
+                    generate_expenses(args.rows), start=1
+                )
+            )
+            output.writelines(iter_csv(rows, 1000))
+
+        single = create_one_by_one(directory, args.single_rows)
+        print(f"{'one by one':<12} {single:>10.0f} rows/s")
+        for workers in [0, *args.workers]:
+            report = import_file(directory, csv_file, workers, args.batch_size)
+            name = f"{workers} workers" if workers > 1 else "in-process"
+            print(
+                f"{name:<12} {report.rows_per_second:>10.0f} rows/s "
+                f"{report.seconds:>8.2f}s  speedup={report.rows_per_second / single:>6.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Filter query latency against history size, with and without indexes.
+
+The synthetic history keeps a constant number of expenses per day, so a
+fixed-width date range returns the same number of rows at every size. With the
+indexes in place its latency should stay roughly flat while the full scan grows
+linearly with the table.
+
+Usage:
+    python -m benchmarks.bench_indexes --sizes 10000 100000 1000000
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+import time
+from datetime import timedelta
+from app.external.database import EXPENSE_INDEXES, PERFORMANCE_PROFILE, SQLiteDatabase
+from app.models.category import Category
+from benchmarks.data import START_DATE, generate_expenses
+
+
+EXPENSES_PER_DAY = 30
+BATCH_SIZE = 50000
+
+
+def load(database, rows):
+    days = max(rows // EXPENSES_PER_DAY, 1)
+    expenses = generate_expenses(rows, days=days)
+    while batch := list(itertools.islice(expenses, BATCH_SIZE)):
+        database.save_expenses(batch)
+    return days
+
+
+def time_query(database, from_date, to_date, category, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        database.find_expenses_by_filter(from_date, to_date, category)
+    return (time.perf_counter() - start) / repeat
+
+
+def drop_indexes(database):
+    with database.pool.connection() as conn:
+        for name in EXPENSE_INDEXES:
+            conn.execute(f"DROP INDEX {name}")
+
+
+def print_plans(database, from_date, to_date):
+    for use_from, use_to, use_category in itertools.product([False, True], repeat=3):
+        arguments = (
+            from_date if use_from else None,
+            to_date if use_to else None,
+            Category.FOOD.value if use_category else None,
+        )
+        label = "+".join(
+            name
+            for name, used in zip(
+                ("from_date", "to_date", "category"), (use_from, use_to, use_category)
+            )
+            if used
+        )
+        print(f"  {label or 'no filter':<30} {'; '.join(database.explain(*arguments))}")
+
+
+def benchmark_size(rows, repeat, show_plans):
+    with tempfile.TemporaryDirectory() as directory:
+        database = SQLiteDatabase(
+            os.path.join(directory, "bench.db"), profile=PERFORMANCE_PROFILE
+        )
+        days = load(database, rows)
+        from_date = START_DATE + timedelta(days=days // 2)
+        to_date = from_date + timedelta(days=6)
+        if show_plans:
+            print_plans(database, from_date, to_date)
+
+        queries = {
+            "week": (from_date, to_date, None),
+            "week+category": (from_date, to_date, Category.FOOD.value),
+        }
+        indexed = {
+            name: time_query(database, *query, repeat)
+            for name, query in queries.items()
+        }
+        drop_indexes(database)
+        scanned = {
+            name: time_query(database, *query, repeat)
+            for name, query in queries.items()
+        }
+        database.close()
+
+    for name in queries:
+        print(
+            f"rows={rows:>9} {name:<14} indexed={indexed[name] * 1000:>8.2f}ms "
+            f"full-scan={scanned[name] * 1000:>8.2f}ms "
+            f"speedup={scanned[name] / indexed[name]:>7.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10000, 100000, 1000000]
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for index, rows in enumerate(args.sizes):
+        benchmark_size(rows, args.repeat, show_plans=index == 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Cost of instrumentation on the GET /expenses read path.
+
+Streams every expense to JSON through the uninstrumented database and
+serializer, then through InstrumentedDatabase with serialization timers, and
+times a small filtered query both ways.
+
+Usage:
+    python -m benchmarks.bench_metrics --rows 100000
+"""
+
+import argparse
+import time
+from datetime import timedelta
+from app.external.database import SQLiteDatabase
+from app.external.instrumented_database import InstrumentedDatabase, instrument_pool
+from app.metrics import MetricsRegistry
+from app.rest.instrumentation import serialization_timers
+from app.rest.serializers import iter_json
+from benchmarks.data import START_DATE, generate_expenses
+
+
+def best_of(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    database = SQLiteDatabase(":memory:")
+    database.save_expenses(generate_expenses(args.rows))
+    registry = MetricsRegistry()
+    instrumented = InstrumentedDatabase(database, registry)
+    timer = serialization_timers(registry)["json"]
+    from_date = START_DATE + timedelta(days=100)
+
+    def stream(db, timer):
+        return lambda: sum(
+            map(len, iter_json(db.iter_expense_rows(None, None, None), 500, timer))
+        )
+
+    def queries(db):
+        def run():
+            for _ in range(args.queries):
+                db.find_expenses_by_filter(from_date, from_date, None)
+
+        return run
+
+    disabled_stream = best_of(stream(database, None), args.repeat)
+    disabled_queries = best_of(queries(database), args.repeat)
+    instrument_pool(database.pool, registry)
+    enabled_stream = best_of(stream(instrumented, timer), args.repeat)
+    enabled_queries = best_of(queries(instrumented), args.repeat)
+
+    print(
+        f"stream {args.rows} rows  disabled={disabled_stream * 1000:>8.1f}ms "
+        f"enabled={enabled_stream * 1000:>8.1f}ms "
+        f"overhead={enabled_stream / disabled_stream - 1:>6.1%}"
+    )
+    print(
+        f"{args.queries} small queries disabled={disabled_queries * 1000:>8.1f}ms "
+        f"enabled={enabled_queries * 1000:>8.1f}ms "
+        f"overhead={enabled_queries / disabled_queries - 1:>6.1%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
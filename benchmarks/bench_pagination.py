@@ -0,0 +1,73 @@
+"""Latency of shallow and deep pages with keyset pagination versus OFFSET.
+
+Usage:
+    python -m benchmarks.bench_pagination --rows 200000 --page-size 100
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+import time
+from datetime import date
+from app.external.database import PERFORMANCE_PROFILE, SQLiteDatabase
+from benchmarks.data import generate_expenses
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = SQLiteDatabase(
+            os.path.join(directory, "bench.db"), profile=PERFORMANCE_PROFILE
+        )
+        expenses = generate_expenses(args.rows)
+        while batch := list(itertools.islice(expenses, 50000)):
+            database.save_expenses(batch)
+
+        with database.pool.connection() as conn:
+            keys = conn.execute(
+                "SELECT day, id FROM expenses ORDER BY day, id"
+            ).fetchall()
+
+        for fraction in (0, 0.25, 0.5, 0.99):
+            offset = int(len(keys) * fraction)
+            after = None
+            if offset:
+                last_day, last_id = keys[offset - 1]
+                after = (date.fromordinal(last_day), last_id)
+            keyset_ms, _ = timed(
+                lambda: database.find_expenses_by_filter(
+                    None, None, None, limit=args.page_size, after=after
+                ),
+                args.repeat,
+            )
+            with database.pool.connection() as conn:
+                offset_ms, _ = timed(
+                    lambda: conn.execute(
+                        "SELECT id, amount_cents, day, category, description "
+                        "FROM expenses ORDER BY day, id LIMIT ? OFFSET ?",
+                        (args.page_size, offset),
+                    ).fetchall(),
+                    args.repeat,
+                )
+            print(
+                f"offset={offset:>8} keyset={keyset_ms:>8.3f}ms "
+                f"limit/offset={offset_ms:>8.3f}ms"
+            )
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Scaling of monthly summaries with the number of report worker processes.
+
+Summaries over the whole seeded history are computed in-process by
+ReportService and by ParallelReportService with an increasing worker count.
+The pool is warmed up first, so process start-up is not measured.
+
+Usage:
+    python -m benchmarks.bench_parallel_reports --rows 1000000 --workers 1 2 4 8
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+import time
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.expense_manager.parallel_report_service import ParallelReportService
+from app.expense_manager.report_service import ReportService
+from app.external.database import PERFORMANCE_PROFILE, SQLiteDatabase
+from benchmarks.data import generate_expenses
+
+
+def timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    filter = ExpenseFilter()
+    with tempfile.TemporaryDirectory() as directory:
+        db_file = os.path.join(directory, "bench.db")
+        database = SQLiteDatabase(db_file, profile=PERFORMANCE_PROFILE)
+        expenses = generate_expenses(args.rows)
+        while batch := list(itertools.islice(expenses, 50000)):
+            database.save_expenses(batch)
+
+        baseline_ms = timed(
+            lambda: ReportService(database).monthly_summary(filter), args.repeat
+        )
+        print(f"rows={args.rows} cpus={os.cpu_count()}")
+        print(f"in-process   {baseline_ms:>9.1f}ms")
+        for workers in args.workers:
+            service = ParallelReportService(database, db_file, workers=workers)
+            service.monthly_summary(filter)
+            elapsed_ms = timed(lambda: service.monthly_summary(filter), args.repeat)
+            service.close()
+            print(
+                f"workers={workers:<4} {elapsed_ms:>9.1f}ms "
+                f"speedup={baseline_ms / elapsed_ms:>5.2f}x"
+            )
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Insert latency while exports run, with and without read replicas.
+
+Reader threads stream full CSV-style exports with ``iter_expense_rows``
+while one writer inserts expenses one at a time. The readers use either the
+primary file or ReplicatedDatabase, which sends them to a replica file that
+is synced in the background. By default the primary has a connection for
+every thread; with a smaller ``--pool-size``, exports that read the primary
+also hold connections the writer waits for, and inserts that wait longer
+than ``--pool-timeout`` are counted as timeouts.
+
+Usage:
+    python -m benchmarks.bench_replicas --rows 100000 --readers 4 --duration 5
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from app.external.database import PERFORMANCE_PROFILE, SQLiteDatabase
+from app.external.replicated_database import ReplicatedDatabase
+from benchmarks.data import generate_expenses
+
+
+def run(database, readers, duration):
+    stop = threading.Event()
+    exports = [0] * readers
+
+    def export(index):
+        while not stop.is_set():
+            for _ in database.iter_expense_rows(None, None, None):
+                pass
+            exports[index] += 1
+
+    threads = [threading.Thread(target=export, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    latencies = []
+    timeouts = 0
+    deadline = time.monotonic() + duration
+    for expense in generate_expenses(10**9, seed=1):
+        if time.monotonic() > deadline:
+            break
+        start = time.perf_counter()
+        try:
+            database.save_expense(expense)
+        except TimeoutError:
+            timeouts += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, timeouts, sum(exports)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--pool-size", type=int)
+    parser.add_argument("--pool-timeout", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        primary = SQLiteDatabase(
+            os.path.join(directory, "primary.db"),
+            pool_size=args.pool_size or args.readers + 1,
+            pool_timeout=args.pool_timeout,
+            profile=PERFORMANCE_PROFILE,
+        )
+        primary.save_expenses(generate_expenses(args.rows))
+        replicated = ReplicatedDatabase(
+            primary,
+            [os.path.join(directory, "replica.db")],
+            max_staleness=timedelta(seconds=2),
+            pool_size=args.readers,
+        )
+        for name, database in (("primary", primary), ("replicas", replicated)):
+            latencies, timeouts, exports = run(database, args.readers, args.duration)
+            latencies.sort()
+            p50 = statistics.median(latencies) * 1000 if latencies else float("nan")
+            p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else p50
+            print(
+                f"{name:<9} inserts={len(latencies):>6} timeouts={timeouts:>4} "
+                f"p50={p50:>7.2f}ms p99={p99:>7.2f}ms exports={exports:>4}"
+            )
+        replicated.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Monthly summary computed by the database versus aggregating in the client.
+
+Usage:
+    python -m benchmarks.bench_reports --rows 100000
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from app.external.clock import MockClock
+from app.external.database import MockDatabase, PERFORMANCE_PROFILE, SQLiteDatabase
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.expense_manager.expense_service import ExpenseService
+from app.expense_manager.report_service import ReportService
+from benchmarks.data import generate_expenses
+
+
+def client_side_monthly_summary(expense_service):
+    totals = {}
+    for expense in expense_service.get_expenses_by_filter(ExpenseFilter()):
+        key = (expense.date.isoformat()[:7], expense.category)
+        totals[key] = totals.get(key, Decimal(0)) + expense.amount
+    return totals
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def benchmark(name, database, rows, repeat):
+    expenses = generate_expenses(rows)
+    while batch := list(itertools.islice(expenses, 50000)):
+        database.save_expenses(batch)
+
+    clock = MockClock(datetime(2030, 1, 1, tzinfo=timezone.utc))
+    expense_service = ExpenseService(clock, database)
+    report_service = ReportService(database)
+
+    server_ms = timed(lambda: report_service.monthly_summary(ExpenseFilter()), repeat)
+    client_ms = timed(lambda: client_side_monthly_summary(expense_service), repeat)
+    print(
+        f"{name:<7} rows={rows:>8} report={server_ms:>9.1f}ms "
+        f"client-side={client_ms:>9.1f}ms speedup={client_ms / server_ms:>6.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    benchmark("mock", MockDatabase(), args.rows, args.repeat)
+    with tempfile.TemporaryDirectory() as directory:
+        database = SQLiteDatabase(
+            os.path.join(directory, "bench.db"), profile=PERFORMANCE_PROFILE
+        )
+        benchmark("sqlite", database, args.rows, args.repeat)
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Per-row cost of the object read path versus the ExpenseRow path.
+
+The object path is the one GET /expenses used before rows existed: DbExpense,
+then Expense, then a dict passed to json.dumps. The row path serializes the
+ExpenseRow tuples straight to JSON or CSV. For each backend the benchmark
+reports the time per row to serialize every expense to JSON, and the memory
+and allocated blocks per row of the objects each path builds before the
+output string.
+
+Usage:
+    python -m benchmarks.bench_rows --rows 100000
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from app.external.columnar_database import ColumnarDatabase
+from app.external.database import SQLiteDatabase
+from app.models.expense import Expense
+from app.rest.serializers import expense_to_json, iter_csv, row_to_json
+from benchmarks.data import generate_expenses
+
+
+def time_per_row(function, rows, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best / rows * 1e6
+
+
+def allocated_per_row(build, rows):
+    """Memory and allocated blocks per row of the objects ``build`` returns."""
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    values = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return values, size / rows, (sys.getallocatedblocks() - blocks) / rows
+
+
+def benchmark(name, database, rows, repeat):
+    db_expenses, *db_cost = allocated_per_row(
+        lambda: list(database.iter_expenses_by_filter(None, None, None)), rows
+    )
+    expenses, *expense_cost = allocated_per_row(
+        lambda: [Expense.from_db_expense(db_expense) for db_expense in db_expenses],
+        rows,
+    )
+    _, *dict_cost = allocated_per_row(
+        lambda: [expense_to_json(expense) for expense in expenses], rows
+    )
+    _, *row_cost = allocated_per_row(
+        lambda: list(database.iter_expense_rows(None, None, None)), rows
+    )
+    del db_expenses, expenses
+
+    objects_us = time_per_row(
+        lambda: [
+            json.dumps(expense_to_json(Expense.from_db_expense(db_expense)))
+            for db_expense in database.iter_expenses_by_filter(None, None, None)
+        ],
+        rows,
+        repeat,
+    )
+    rows_us = time_per_row(
+        lambda: [
+            row_to_json(row) for row in database.iter_expense_rows(None, None, None)
+        ],
+        rows,
+        repeat,
+    )
+    csv_us = time_per_row(
+        lambda: list(iter_csv(database.iter_expense_rows(None, None, None), 500)),
+        rows,
+        repeat,
+    )
+    for case, costs, json_us in (
+        ("objects", [db_cost, expense_cost, dict_cost], objects_us),
+        ("rows", [row_cost], rows_us),
+    ):
+        print(
+            f"{name:<9} {case:<8} json={json_us:>6.2f}us/row "
+            f"memory={sum(cost[0] for cost in costs):>6.0f}B/row "
+            f"blocks={sum(cost[1] for cost in costs):>5.1f}/row"
+        )
+    print(f"{name:<9} {'rows':<8} csv={csv_us:>7.2f}us/row")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    expenses = list(generate_expenses(args.rows))
+    for name, database in (
+        ("sqlite", SQLiteDatabase(":memory:")),
+        ("columnar", ColumnarDatabase()),
+    ):
+        database.save_expenses(expenses)
+        benchmark(name, database, args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
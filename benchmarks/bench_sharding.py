@@ -0,0 +1,91 @@
+"""Query latency of one SQLite file versus per-year shards.
+
+Both layouts hold the same seeded decade of expenses. The queries cover a
+recent month, one year, the whole history and the expense count.
+
+Usage:
+    python -m benchmarks.bench_sharding --rows 1000000
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+import time
+from datetime import timedelta
+from app.external.database import PERFORMANCE_PROFILE, SQLiteDatabase
+from app.external.sharded_database import ShardedDatabase
+from benchmarks.data import DAYS, START_DATE, generate_expenses
+
+
+def fill(database, rows):
+    expenses = generate_expenses(rows)
+    while batch := list(itertools.islice(expenses, 50000)):
+        database.save_expenses(batch)
+
+
+def queries(database):
+    last_day = START_DATE + timedelta(days=DAYS - 1)
+    month_start = last_day - timedelta(days=30)
+    year_start = last_day - timedelta(days=364)
+    return {
+        "recent month": lambda: database.find_expenses_by_filter(
+            month_start, last_day, None
+        ),
+        "recent year": lambda: database.find_expenses_by_filter(
+            year_start, last_day, None
+        ),
+        "full scan": lambda: database.find_expenses_by_filter(None, None, None),
+        "count": database.get_expense_count,
+    }
+
+
+def timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        single = SQLiteDatabase(
+            os.path.join(directory, "single.db"), profile=PERFORMANCE_PROFILE
+        )
+        sharded = ShardedDatabase(
+            os.path.join(directory, "shards"),
+            profile=PERFORMANCE_PROFILE,
+            max_workers=args.workers,
+        )
+        fill(single, args.rows)
+        fill(sharded, args.rows)
+
+        results = {}
+        for name, database in (("single", single), ("sharded", sharded)):
+            results[name] = {
+                query: timed(function, args.repeat)
+                for query, function in queries(database).items()
+            }
+        single.close()
+        sharded.close()
+
+    print(f"rows={args.rows} workers={args.workers}")
+    for query in results["single"]:
+        single_ms = results["single"][query]
+        sharded_ms = results["sharded"][query]
+        print(
+            f"{query:<13} single={single_ms:>9.2f}ms sharded={sharded_ms:>9.2f}ms "
+            f"speedup={single_ms / sharded_ms:>5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
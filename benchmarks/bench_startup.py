@@ -0,0 +1,80 @@
+"""Cold start of the Flask app: import time and first-request latency.
+
+Each run starts a new interpreter in an empty directory, imports
+``app.rest.api`` and sends two ``GET /expenses`` requests through the test
+client. An interpreter that only starts and exits is timed as well, so the
+cost of the app itself can be told apart from Python's.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+from app.rest import api
+imported = time.perf_counter()
+client = api.app.test_client()
+client.get("/expenses").get_data()
+first = time.perf_counter()
+client.get("/expenses").get_data()
+second = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "first request": first - imported,
+    "second request": second - first,
+}))
+"""
+
+
+def run_child(code, directory):
+    env = dict(os.environ, PYTHONPATH=REPOSITORY)
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=directory,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    total = time.perf_counter() - start
+    return total, json.loads(output) if output.strip() else {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    timings = {}
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as directory:
+            total, _ = run_child("pass", directory)
+            timings.setdefault("interpreter", []).append(total)
+            total, phases = run_child(CHILD, directory)
+            for phase, seconds in phases.items():
+                timings.setdefault(phase, []).append(seconds)
+            timings.setdefault("process total", []).append(total)
+
+    for phase, samples in timings.items():
+        print(
+            f"{phase:<15} median={statistics.median(samples) * 1000:>8.2f}ms "
+            f"min={min(samples) * 1000:>8.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Read latency of the legacy DECIMAL/ISO-text storage format versus integer storage.
+
+The legacy file is written in the format used before storage versions existed
+and read the way that format was read; the same file is then migrated in place
+and read through SQLiteDatabase.
+
+Usage:
+    python -m benchmarks.bench_storage --rows 1000000
+"""
+
+import argparse
+import itertools
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from app.external.database import DbExpense, PERFORMANCE_PROFILE, SQLiteDatabase
+from benchmarks.data import START_DATE, generate_expenses
+
+
+LEGACY_SCHEMA = """
+    CREATE TABLE expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        amount DECIMAL(10, 2) NOT NULL,
+        date DATE NOT NULL,
+        category TEXT NOT NULL,
+        description TEXT
+    )
+"""
+
+
+def create_legacy_database(db_file, rows):
+    conn = sqlite3.connect(db_file)
+    conn.execute(LEGACY_SCHEMA)
+    expenses = generate_expenses(rows)
+    while batch := list(itertools.islice(expenses, 50000)):
+        conn.executemany(
+            "INSERT INTO expenses (amount, date, category, description) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                (
+                    str(expense.amount),
+                    expense.date.isoformat(),
+                    expense.category.value,
+                    expense.description,
+                )
+                for expense in batch
+            ],
+        )
+    conn.execute("CREATE INDEX idx_expenses_date ON expenses (date)")
+    conn.commit()
+    return conn
+
+
+def legacy_queries(conn, from_date, to_date):
+    def find(where="", params=()):
+        return [
+            DbExpense(
+                id=row[0],
+                amount=Decimal(row[1]),
+                date=date.fromisoformat(row[2]),
+                category=row[3],
+                description=row[4],
+            )
+            for row in conn.execute(
+                "SELECT id, amount, date, category, description FROM expenses " + where,
+                params,
+            )
+        ]
+
+    return {
+        "full scan": lambda: find(),
+        "one year": lambda: find(
+            "WHERE date >= ? AND date <= ?",
+            (from_date.isoformat(), to_date.isoformat()),
+        ),
+        "monthly sums": lambda: conn.execute(
+            "SELECT substr(date, 1, 7), category, "
+            "SUM(CAST(ROUND(amount * 100) AS INTEGER)), COUNT(*) "
+            "FROM expenses GROUP BY 1, 2"
+        ).fetchall(),
+    }
+
+
+def integer_queries(database, from_date, to_date):
+    return {
+        "full scan": lambda: database.find_expenses_by_filter(None, None, None),
+        "one year": lambda: database.find_expenses_by_filter(from_date, to_date, None),
+        "monthly sums": lambda: database.summarize_expenses("month", None, None, None),
+    }
+
+
+def timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from_date = START_DATE + timedelta(days=365 * 5)
+    to_date = from_date + timedelta(days=364)
+    with tempfile.TemporaryDirectory() as directory:
+        db_file = os.path.join(directory, "bench.db")
+        conn = create_legacy_database(db_file, args.rows)
+        legacy = {
+            name: timed(query, args.repeat)
+            for name, query in legacy_queries(conn, from_date, to_date).items()
+        }
+        conn.close()
+
+        start = time.perf_counter()
+        database = SQLiteDatabase(db_file, profile=PERFORMANCE_PROFILE)
+        migration_s = time.perf_counter() - start
+        integer = {
+            name: timed(query, args.repeat)
+            for name, query in integer_queries(database, from_date, to_date).items()
+        }
+        database.close()
+
+    print(f"rows={args.rows} migration={migration_s:.2f}s")
+    for name in legacy:
+        print(
+            f"{name:<13} legacy={legacy[name]:>9.1f}ms integer={integer[name]:>9.1f}ms "
+            f"speedup={legacy[name] / integer[name]:>5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Range totals from running totals versus summing the matching expenses.
+
+For each range ending on the last generated day, the Food total is computed
+with ``ReportService.total`` and by summing the expenses returned by
+``find_expenses_by_filter`` in the client. For SQLite, a ``SUM`` over the
+expenses table is timed as well.
+
+Usage:
+    python -m benchmarks.bench_totals --rows 1000000
+"""
+
+import argparse
+import itertools
+import time
+from datetime import timedelta
+from app.external.columnar_database import ColumnarDatabase
+from app.external.database import MockDatabase, SQLiteDatabase
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.expense_manager.report_service import ReportService
+from app.models.category import Category
+from benchmarks.data import DAYS, START_DATE, generate_expenses
+
+
+LAST_DAY = START_DATE + timedelta(days=DAYS - 1)
+RANGES = {"month": 30, "year": 365, "all": DAYS}
+
+
+def best_of(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def client_side_total(database, from_date):
+    return sum(
+        expense.amount
+        for expense in database.find_expenses_by_filter(from_date, LAST_DAY, "Food")
+    )
+
+
+def sql_total(database, from_date):
+    with database.pool.connection() as conn:
+        return conn.execute(
+            "SELECT SUM(amount_cents), COUNT(*) FROM expenses "
+            "WHERE day BETWEEN ? AND ? AND category = 'Food'",
+            (from_date.toordinal(), LAST_DAY.toordinal()),
+        ).fetchone()
+
+
+def benchmark(name, database, rows, repeat):
+    expenses = generate_expenses(rows)
+    start = time.perf_counter()
+    while batch := list(itertools.islice(expenses, 50000)):
+        database.save_expenses(batch)
+    print(f"{name}: {rows} rows saved in {time.perf_counter() - start:.1f}s")
+
+    report_service = ReportService(database)
+    for range_name, days in RANGES.items():
+        from_date = LAST_DAY - timedelta(days=days - 1)
+        expense_filter = ExpenseFilter(
+            from_date=from_date, to_date=LAST_DAY, category=Category.FOOD
+        )
+        total = best_of(lambda: report_service.total(expense_filter), repeat)
+        client = best_of(lambda: client_side_total(database, from_date), repeat)
+        extra = ""
+        if isinstance(database, SQLiteDatabase):
+            scan = best_of(lambda: sql_total(database, from_date), repeat)
+            extra = f" sql-sum={scan * 1000:>8.2f}ms"
+        print(
+            f"  {range_name:<6} total={total * 1000:>6.3f}ms{extra} "
+            f"client-side={client * 1000:>8.2f}ms speedup={client / total:>7.0f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    benchmark("sqlite", SQLiteDatabase(":memory:"), args.rows, args.repeat)
+    benchmark("columnar", ColumnarDatabase(), args.rows, args.repeat)
+    benchmark("mock", MockDatabase(), args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from app.models.category import Category
+from app.models.expense import Expense
+
+
+DESCRIPTIONS = [
+    "Grocery shopping",
+    "Bus ticket",
+    "Monthly rent",
+    "Pharmacy",
+    "Online course",
+    "Movie ticket",
+    "Uber ride",
+    "Coffee",
+    None,
+]
+START_DATE = date(2015, 1, 1)
+DAYS = 3650
+
+
+def generate_expenses(count, seed=0, start_date=START_DATE, days=DAYS):
+    """Yield ``count`` reproducible synthetic expenses spread over ``days`` days."""
+    rng = random.Random(seed)
+    categories = list(Category)
+    for _ in range(count):
+        yield Expense(
+            amount=Decimal(rng.randint(100, 50000)).scaleb(-2),
+            date=start_date + timedelta(days=rng.randrange(days)),
+            category=rng.choice(categories),
+            description=rng.choice(DESCRIPTIONS),
+        )
@@ -0,0 +1,216 @@
+"""Benchmark suite for the service and REST hot paths, with baseline comparison.
+
+Each case runs against MockDatabase and SQLiteDatabase filled with the same
+seeded synthetic history, at every requested size. The REST cases go through
+the Flask test client. Each case reports the best time out of ``--repeat``
+runs after a warm-up run. The results are written as JSON and compared with a
+stored baseline. The run fails when a case is slower than its baseline by more
+than ``--threshold``.
+
+A change that makes a case slower on purpose refreshes the baseline in the same
+commit with ``--update-baseline`` and says why in the commit message.
+``--update-baseline`` replaces only the cases that were run, so a refresh at
+one size keeps the baseline of the others.
+
+Usage:
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --sizes 10000 --save-baseline
+    python -m benchmarks.suite --sizes 10000 --update-baseline
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --threshold 0.25
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.expense_manager.expense_service import ExpenseService
+from app.external.clock import MockClock
+from app.external.database import MockDatabase, SQLiteDatabase
+from app.models.category import Category
+from benchmarks.data import START_DATE, generate_expenses
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_SIZES = [10000, 100000, 1000000]
+BACKENDS = {
+    "mock": lambda directory: MockDatabase(),
+    "sqlite": lambda directory: SQLiteDatabase(os.path.join(directory, "suite.db")),
+}
+
+# Expenses created by the create_expense case in each run.
+CREATES = 200
+# Filtered queries run by the get_expenses_by_filter case in each run.
+QUERIES = 20
+
+
+def make_cases(service, client):
+    """Map case names to (function, operations) pairs."""
+    month = ExpenseFilter(
+        from_date=START_DATE + timedelta(days=730),
+        to_date=START_DATE + timedelta(days=760),
+        category=Category.FOOD,
+    )
+    new_expenses = itertools.cycle(list(generate_expenses(CREATES, seed=1)))
+
+    def create_expense():
+        for _ in range(CREATES):
+            service.create_expense(next(new_expenses))
+
+    def get_expenses_by_filter():
+        for _ in range(QUERIES):
+            service.get_expenses_by_filter(month)
+
+    def get_all_expenses():
+        service.get_expenses_by_filter(ExpenseFilter())
+
+    def export(content_type):
+        def run():
+            response = client.get("/expenses", headers={"Content-Type": content_type})
+            assert response.status_code == 200
+            response.get_data()
+
+        return run
+
+    return {
+        "create_expense": (create_expense, CREATES),
+        "get_expenses_by_filter": (get_expenses_by_filter, QUERIES),
+        "get_all_expenses": (get_all_expenses, 1),
+        "rest_export_json": (export("application/json"), 1),
+        "rest_export_csv": (export("text/csv"), 1),
+    }
+
+
+def best_of(function, repeat):
+    """Best time of ``repeat`` runs after one untimed warm-up run.
+
+    The garbage collector is paused while timing, as in ``timeit``.
+    """
+    function()
+    best = float("inf")
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+    return best
+
+
+def run_suite(sizes, backends, repeat, directory):
+    from app.rest.api import create_app
+
+    clock = MockClock(datetime(2025, 1, 1, tzinfo=timezone.utc))
+    results = {}
+    for backend, size in itertools.product(backends, sizes):
+        with tempfile.TemporaryDirectory(dir=directory) as data_directory:
+            database = BACKENDS[backend](data_directory)
+            expenses = generate_expenses(size)
+            while batch := list(itertools.islice(expenses, 50000)):
+                database.save_expenses(batch)
+            service = ExpenseService(clock, database)
+            client = create_app(database, clock).test_client()
+
+            for case, (function, operations) in make_cases(service, client).items():
+                seconds = best_of(function, repeat)
+                results[f"{backend}/{size}/{case}"] = {
+                    "seconds": seconds,
+                    "per_operation_us": seconds / operations * 1e6,
+                }
+                print(
+                    f"{backend:<7} {size:>8} {case:<24} {seconds * 1000:>10.2f}ms",
+                    flush=True,
+                )
+            close = getattr(database, "close", None)
+            if close:
+                close()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Cases slower than ``baseline`` by more than ``threshold``, as messages."""
+    regressions = []
+    for name, result in sorted(results.items()):
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        ratio = result["seconds"] / expected["seconds"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {result['seconds'] * 1000:.2f}ms vs baseline "
+                f"{expected['seconds'] * 1000:.2f}ms ({ratio - 1:+.0%})"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--backends", nargs="+", choices=sorted(BACKENDS), default=sorted(BACKENDS)
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed slowdown against the baseline, e.g. 0.2 for 20%%",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store the results as the new baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="replace the baseline of the cases that were run instead of comparing",
+    )
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run_suite(args.sizes, args.backends, args.repeat, directory)
+    report = {
+        "created": date.today().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    if args.update_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            report["results"] = {**json.load(baseline_file)["results"], **results}
+    if args.save_baseline or args.update_baseline:
+        with open(args.baseline, "w") as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(regressions)} regressions over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,27 @@
+import pytest
+from app.external.columnar_database import ColumnarDatabase
+from app.external.database import MockDatabase, SQLiteDatabase
+
+
 def pytest_addoption(parser):
     parser.addoption(
         "--database",
         action="store",
         default="mock",
-        choices=["mock", "sqlite"],
-        help="Specify the database type to use for testing: mock or sqlite",
+        choices=["mock", "sqlite", "columnar"],
+        help="Specify the database type to use for testing: mock, sqlite or columnar",
     )
+
+
+# To use SQLiteDatabase, run pytest with: pytest --database=sqlite
+# To use ColumnarDatabase, run pytest with: pytest --database=columnar
+# To use MockDatabase (default), run pytest with: pytest
+# or explicitly with: pytest --database=mock
+@pytest.fixture()
+def database(request):
+    database_type = request.config.getoption("--database")
+    if database_type == "sqlite":
+        return SQLiteDatabase(":memory:")
+    if database_type == "columnar":
+        return ColumnarDatabase()
+    return MockDatabase()
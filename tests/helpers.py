@@ -0,0 +1,13 @@
+from datetime import date
+from decimal import Decimal
+from app.models.category import Category
+from app.models.expense import Expense
+
+
+def make_expense(
+    amount="10.00",
+    expense_date=date(2023, 5, 20),
+    category=Category.FOOD,
+    description=None,
+):
+    return Expense(Decimal(amount), expense_date, category, description)
@@ -0,0 +1,294 @@
+import pytest
+import asyncio
+import json
+import csv
+import gzip
+import zlib
+from datetime import date, timedelta
+from decimal import Decimal
+from app.external.database import SQLiteDatabase
+from app.external.replicated_database import ReplicatedDatabase
+from app.models.category import Category
+from app.rest import asgi
+from app.rest.asgi import create_app
+
+
+@pytest.fixture()
+def app(database):
+    app = create_app(database, read_workers=0)
+    yield app
+    app.close()
+
+
+def call(app, method, path, query="", body=None, headers=()):
+    """Run one request through the ASGI app and collect the response."""
+    status, response_headers, data, chunks = call_raw(
+        app, method, path, query, body, headers
+    )
+    return status, response_headers, data.decode(), chunks
+
+
+def call_raw(app, method, path, query="", body=None, headers=()):
+    """Like ``call``, but return the response body as bytes."""
+    requests = [
+        {
+            "type": "http.request",
+            "body": json.dumps(body).encode() if body is not None else b"",
+        }
+    ]
+    messages = []
+
+    async def receive():
+        return requests.pop(0)
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+    }
+    asyncio.run(app(scope, receive, send))
+    start, *bodies = messages
+    return (
+        start["status"],
+        {name.decode(): value.decode() for name, value in start["headers"]},
+        b"".join(message["body"] for message in bodies),
+        len(bodies),
+    )
+
+
+def expense_json(amount, days_ago=0, category=Category.FOOD, description=None):
+    return {
+        "amount": amount,
+        "date": (date.today() - timedelta(days=days_ago)).isoformat(),
+        "category": category.value,
+        "description": description,
+    }
+
+
+def amounts(expenses):
+    return [Decimal(expense["amount"]) for expense in expenses]
+
+
+def test_create_and_retrieve_expenses(app):
+    status, _, body, _ = call(
+        app, "POST", "/expenses", body=expense_json("50.00", description="Lunch")
+    )
+    assert status == 201
+    assert json.loads(body)["id"] == 1
+
+    call(app, "POST", "/expenses", body=expense_json("30.00", 1, Category.TRANSPORT))
+    status, headers, body, _ = call(app, "GET", "/expenses")
+
+    assert status == 200
+    assert headers["content-type"] == "application/json"
+    assert amounts(json.loads(body)) == [Decimal("50.00"), Decimal("30.00")]
+    assert json.loads(body)[0]["description"] == "Lunch"
+
+
+def test_list_expenses_date_range_in_insertion_order(app):
+    for days_ago in (5, 15, 10):
+        call(app, "POST", "/expenses", body=expense_json("1.00", days_ago))
+    from_date = (date.today() - timedelta(days=30)).isoformat()
+
+    for query in (f"from_date={from_date}", "category=Food"):
+        _, _, body, _ = call(app, "GET", "/expenses", query)
+        assert [expense["date"] for expense in json.loads(body)] == [
+            (date.today() - timedelta(days=days_ago)).isoformat()
+            for days_ago in (5, 15, 10)
+        ]
+
+
+def test_invalid_expense_is_rejected(app):
+    status, _, body, _ = call(app, "POST", "/expenses", body=expense_json("-1"))
+
+    assert status == 400
+    assert json.loads(body) == {"error": "Amount must be positive"}
+
+
+def test_batch_reports_created_expenses_and_errors(app):
+    status, _, body, _ = call(
+        app,
+        "POST",
+        "/expenses/batch",
+        body=[expense_json("10.00"), {"amount": "5.00"}, expense_json("0")],
+    )
+
+    assert status == 207
+    data = json.loads(body)
+    assert [item["index"] for item in data["created"]] == [0]
+    assert data["errors"] == [
+        {"index": 1, "error": "Missing field: date"},
+        {"index": 2, "error": "Amount must be positive"},
+    ]
+
+
+def test_batch_must_be_a_list(app):
+    status, _, _, _ = call(app, "POST", "/expenses/batch", body={"amount": "1"})
+    assert status == 400
+
+
+def test_filter_and_stream_as_csv(app, monkeypatch):
+    monkeypatch.setattr(asgi, "STREAM_CHUNK_ROWS", 2)
+    call(
+        app,
+        "POST",
+        "/expenses/batch",
+        body=[expense_json(f"{amount}.00", amount % 2) for amount in range(1, 6)],
+    )
+
+    status, headers, body, chunks = call(
+        app,
+        "GET",
+        "/expenses",
+        query=f"from_date={date.today().isoformat()}",
+        headers=[("Content-Type", "text/csv")],
+    )
+
+    assert status == 200
+    assert headers["content-type"] == "text/csv; charset=utf-8"
+    assert headers["content-disposition"] == "attachment; filename=expenses.csv"
+    rows = list(csv.reader(body.splitlines()))
+    assert rows[0] == ["Amount", "Date", "Category", "Description"]
+    assert [Decimal(row[0]) for row in rows[1:]] == [Decimal(2), Decimal(4)]
+    assert chunks > 2
+
+
+def test_empty_result_is_valid_json(app):
+    _, _, body, _ = call(app, "GET", "/expenses", query="category=Education")
+    assert json.loads(body) == []
+
+
+def test_retrieve_page_by_page(app):
+    call(
+        app,
+        "POST",
+        "/expenses/batch",
+        body=[expense_json(f"{amount}.00", amount) for amount in range(1, 6)],
+    )
+
+    _, headers, body, _ = call(app, "GET", "/expenses", query="page_size=3")
+    token = headers["x-next-page-token"]
+    _, last_headers, last_body, _ = call(
+        app, "GET", "/expenses", query=f"page_size=3&page_token={token}"
+    )
+
+    assert amounts(json.loads(body)) == [Decimal(5), Decimal(4), Decimal(3)]
+    assert amounts(json.loads(last_body)) == [Decimal(2), Decimal(1)]
+    assert "x-next-page-token" not in last_headers
+
+
+def test_unchanged_expenses_are_not_modified(app, monkeypatch):
+    call(app, "POST", "/expenses", body=expense_json("12.00"))
+    _, headers, _, _ = call(app, "GET", "/expenses", "category=Food")
+    etag = headers["etag"]
+    assert etag.startswith('W/"')
+    assert headers["cache-control"] == "no-cache"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the expenses should not be read")
+
+    monkeypatch.setattr(app.expense_service, "iter_expense_rows", fail)
+    status, headers, body, _ = call(
+        app, "GET", "/expenses", "category=Food", headers=[("If-None-Match", etag)]
+    )
+
+    assert status == 304
+    assert body == ""
+    assert headers["etag"] == etag
+
+
+def test_new_expense_changes_the_etag(app):
+    _, headers, _, _ = call(app, "GET", "/expenses")
+    call(app, "POST", "/expenses", body=expense_json("12.00"))
+
+    status, new_headers, _, _ = call(
+        app, "GET", "/expenses", headers=[("If-None-Match", headers["etag"])]
+    )
+
+    assert status == 200
+    assert new_headers["etag"] != headers["etag"]
+
+
+def test_responses_are_compressed_when_accepted(app):
+    call(app, "POST", "/expenses/batch", body=[expense_json("12.00")] * 50)
+    csv_type = ("Content-Type", "text/csv")
+    _, plain_headers, plain, _ = call_raw(app, "GET", "/expenses", headers=[csv_type])
+    _, gzip_headers, gzipped, _ = call_raw(
+        app, "GET", "/expenses", headers=[csv_type, ("Accept-Encoding", "gzip, br")]
+    )
+    _, deflate_headers, deflated, _ = call_raw(
+        app, "GET", "/expenses", headers=[("Accept-Encoding", "gzip;q=0.5, deflate")]
+    )
+
+    assert "content-encoding" not in plain_headers
+    assert gzip_headers["content-encoding"] == "gzip"
+    assert gzip.decompress(gzipped) == plain
+    assert deflate_headers["content-encoding"] == "deflate"
+    assert zlib.decompress(deflated) == call_raw(app, "GET", "/expenses")[2]
+    assert gzip_headers["vary"] == "Accept-Encoding"
+
+
+def test_invalid_filter_is_rejected(app):
+    status, _, body, _ = call(
+        app, "GET", "/expenses", query="from_date=2024-02-01&to_date=2024-01-01"
+    )
+
+    assert status == 400
+    assert "error" in json.loads(body)
+
+
+def test_unknown_routes(app):
+    assert call(app, "GET", "/unknown")[0] == 404
+    assert call(app, "DELETE", "/expenses")[0] == 405
+
+
+def test_read_position_is_returned_and_sent_back(tmp_path):
+    primary = SQLiteDatabase(str(tmp_path / "primary.db"))
+    database = ReplicatedDatabase(
+        primary, [str(tmp_path / "replica.db")], sync_interval=None
+    )
+    app = create_app(database, read_workers=2)
+
+    status, headers, _, _ = call(
+        app, "POST", "/expenses", body=expense_json("50.00", description="Lunch")
+    )
+    assert status == 201
+    assert headers["x-expenses-position"] == "1"
+
+    _, _, body, _ = call(app, "GET", "/expenses")
+    assert json.loads(body) == []
+    _, _, body, _ = call(
+        app, "GET", "/expenses", headers=[("X-Expenses-Position", "1")]
+    )
+    assert amounts(json.loads(body)) == [Decimal("50.00")]
+    status, _, _, _ = call(
+        app, "GET", "/expenses", headers=[("X-Expenses-Position", "latest")]
+    )
+    assert status == 400
+    app.close()
+    database.close()
+
+
+def test_lifespan_closes_an_owned_database(database):
+    closed = []
+    app = create_app(database)
+    app._owns_database = True
+    database.close = lambda: closed.append(True)
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    asyncio.run(app({"type": "lifespan"}, receive, send))
+
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert closed == [True]
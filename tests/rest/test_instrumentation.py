@@ -0,0 +1,77 @@
+from flask import Flask, Response
+from app.metrics import MetricsRegistry
+from app.rest import api
+from app.rest.instrumentation import instrument_app, serialization_timers
+from app.rest.serializers import iter_json
+
+
+def create_app():
+    app = Flask(__name__)
+    registry = MetricsRegistry()
+    instrument_app(app, registry)
+    timers = serialization_timers(registry)
+
+    @app.route("/rows")
+    def get_rows():
+        rows = [(1, 1000, 738000, "Food", None)] * 5
+        return Response(iter_json(rows, 2, timers["json"]), mimetype="application/json")
+
+    return app, registry
+
+
+def fetch(client, path):
+    # Servers close the response once it is sent, which stops its timer.
+    response = client.get(path)
+    response.get_data()
+    response.close()
+    return response
+
+
+def test_requests_are_timed_by_route_and_status():
+    app, registry = create_app()
+    client = app.test_client()
+
+    fetch(client, "/rows")
+    fetch(client, "/missing")
+
+    seconds = registry.get("expenses_http_request_seconds")
+    assert seconds.count(("GET", "/rows", "200")) == 1
+    assert seconds.count(("GET", "unmatched", "404")) == 1
+
+
+def test_serialization_is_timed_per_chunk():
+    app, registry = create_app()
+
+    fetch(app.test_client(), "/rows")
+
+    assert registry.get("expenses_serialization_seconds").count(("json",)) == 3
+
+
+def test_metrics_endpoint_renders_prometheus_text():
+    app, _ = create_app()
+    client = app.test_client()
+    fetch(client, "/rows")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = response.get_data(as_text=True)
+    assert "# TYPE expenses_http_request_seconds histogram" in body
+    assert (
+        'expenses_http_request_seconds_count{method="GET",route="/rows",status="200"} 1'
+        in body
+    )
+
+
+def test_cache_stats_are_served_with_the_app_metrics(database, monkeypatch):
+    monkeypatch.setenv("EXPENSES_METRICS", "1")
+    monkeypatch.setenv("EXPENSES_CACHE_SIZE", "8")
+    client = api.create_app(database).test_client()
+
+    fetch(client, "/expenses?page_size=10")
+    fetch(client, "/expenses?page_size=10")
+    body = client.get("/metrics").get_data(as_text=True)
+
+    assert 'expenses_cache_lookups_total{result="hit"} 1' in body
+    assert 'expenses_cache_lookups_total{result="miss"} 1' in body
@@ -1,11 +1,21 @@
 import pytest
 import json
 import csv
+import gzip
+import zlib
 from datetime import date, timedelta
 from decimal import Decimal
+from io import BytesIO
+from app.rest import api
 from app.rest.api import app, database
+from app.external.columnar_database import ColumnarDatabase
+from app.external.database import MockDatabase, SQLiteDatabase
 from app.models.category import Category
+from app.models.expense import Expense
+from app.rest.serializers import read_columnar
 import os
+import subprocess
+import sys
 
 
 @pytest.fixture(scope="module")
@@ -19,7 +29,10 @@ def client():
 def setup_database():
     yield
 
-    os.remove("expenses.db")
+    database.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(f"expenses.db{suffix}"):
+            os.remove(f"expenses.db{suffix}")
 
 
 def test_add_expenses(client, setup_database):
@@ -101,3 +114,472 @@ def test_retrieve_as_csv(client, setup_database):
     assert Decimal(rows[1][0]) == Decimal("50.00")
     assert Decimal(rows[2][0]) == Decimal("30.00")
     assert Decimal(rows[3][0]) == Decimal("25.00")
+
+
+def test_retrieve_as_columnar(client, setup_database):
+    response = client.get(
+        "/expenses", headers={"Content-Type": "application/vnd.expenses.columnar"}
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/vnd.expenses.columnar"
+
+    (group,) = read_columnar(response.data)
+    assert [Decimal(cents).scaleb(-2) for cents in group["amount_cents"]] == [
+        Decimal("50.00"),
+        Decimal("30.00"),
+        Decimal("25.00"),
+    ]
+    assert group["description"] == ["Grocery shopping", "Bus ticket", "Movie ticket"]
+
+
+@pytest.mark.parametrize("amount", ["0.001", "Infinity", "1e30"])
+def test_add_expense_with_unstorable_amount(client, setup_database, amount):
+    response = client.post(
+        "/expenses",
+        json={
+            "amount": amount,
+            "date": date.today().isoformat(),
+            "category": Category.FOOD.value,
+        },
+    )
+
+    assert response.status_code == 400
+
+
+def test_add_expenses_in_batch(client, setup_database):
+    response = client.post(
+        "/expenses/batch",
+        json=[
+            {
+                "amount": "12.50",
+                "date": date.today().isoformat(),
+                "category": Category.FOOD.value,
+                "description": "Lunch",
+            },
+            {
+                "amount": "-1.00",
+                "date": date.today().isoformat(),
+                "category": Category.FOOD.value,
+            },
+            {"amount": "5.00", "category": Category.OTHER.value},
+            {
+                "amount": "8.00",
+                "date": date.today().isoformat(),
+                "category": Category.HEALTH.value,
+            },
+        ],
+    )
+    assert response.status_code == 207
+    data = json.loads(response.data)
+    assert [row["index"] for row in data["created"]] == [0, 3]
+    assert data["created"][1]["id"] == data["created"][0]["id"] + 1
+    assert data["errors"] == [
+        {"index": 1, "error": "Amount must be positive"},
+        {"index": 2, "error": "Missing field: date"},
+    ]
+
+
+def test_add_expenses_in_batch_with_no_valid_expense(client, setup_database):
+    response = client.post(
+        "/expenses/batch",
+        json=[{"amount": "-1.00", "date": "2023-01-01", "category": "Food"}],
+    )
+
+    assert response.status_code == 400
+    assert json.loads(response.data) == {
+        "created": [],
+        "errors": [{"index": 0, "error": "Amount must be positive"}],
+    }
+
+
+def test_add_expenses_in_batch_with_fields_of_the_wrong_type(client, setup_database):
+    response = client.post(
+        "/expenses/batch",
+        json=[
+            {
+                "amount": "1.00",
+                "date": date.today().isoformat(),
+                "category": Category.FOOD.value,
+                "description": 42,
+            },
+            {"amount": "1.00", "date": date.today().isoformat(), "category": 3},
+        ],
+    )
+
+    assert response.status_code == 400
+    assert json.loads(response.data) == {
+        "created": [],
+        "errors": [
+            {"index": 0, "error": "Invalid description"},
+            {"index": 1, "error": "Invalid category"},
+        ],
+    }
+
+
+def test_add_expenses_in_batch_requires_a_list(client, setup_database):
+    response = client.post("/expenses/batch", json={"amount": "1.00"})
+    assert response.status_code == 400
+
+
+def test_responses_are_streamed_in_chunks(client, setup_database, monkeypatch):
+    monkeypatch.setattr(api, "STREAM_CHUNK_ROWS", 2)
+
+    json_response = client.get("/expenses")
+    csv_response = client.get("/expenses", headers={"Content-Type": "text/csv"})
+
+    assert json_response.is_streamed
+    assert len(json.loads(json_response.data)) == 5
+    assert csv_response.is_streamed
+    assert len(list(csv.reader(csv_response.data.decode("utf-8").splitlines()))) == 6
+
+
+def test_empty_result_is_valid_json(client, setup_database):
+    response = client.get("/expenses?category=Education")
+    assert response.status_code == 200
+    assert json.loads(response.data) == []
+
+
+def test_retrieve_page_by_page(client, setup_database):
+    first = client.get("/expenses?page_size=3")
+    token = first.headers["X-Next-Page-Token"]
+    second = client.get(f"/expenses?page_size=3&page_token={token}")
+
+    assert first.status_code == 200
+    assert len(json.loads(first.data)) == 3
+    assert json.loads(first.data)[0]["description"] == "Bus ticket"
+    assert second.status_code == 200
+    assert len(json.loads(second.data)) == 2
+    assert "X-Next-Page-Token" not in second.headers
+
+
+def test_retrieve_page_with_invalid_parameters(client, setup_database):
+    assert client.get("/expenses?page_size=0").status_code == 400
+    assert client.get("/expenses?page_size=abc").status_code == 400
+    assert client.get("/expenses?page_token=garbage").status_code == 400
+
+
+def test_search_descriptions(client, setup_database):
+    response = client.get("/expenses?search=TICKET")
+    assert response.status_code == 200
+    descriptions = {expense["description"] for expense in json.loads(response.data)}
+    assert descriptions == {"Bus ticket", "Movie ticket"}
+
+    response = client.get("/expenses?search=bus+ticket")
+    assert [expense["description"] for expense in json.loads(response.data)] == [
+        "Bus ticket"
+    ]
+    assert client.get("/expenses?search=ticket&page_size=2").status_code == 400
+
+
+def test_monthly_report(client, setup_database):
+    month = date.today().isoformat()[:7]
+    response = client.get(f"/reports/monthly?category={Category.FOOD.value}")
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data[-1]["period"] == month
+    assert data[-1]["categories"] == {"Food": data[-1]["total"]}
+
+
+def test_yearly_report(client, setup_database):
+    response = client.get("/reports/yearly")
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert sum(row["count"] for row in data) == 5
+    assert sum(Decimal(row["total"]) for row in data) == Decimal("125.50")
+
+
+@pytest.mark.parametrize(
+    "make_database",
+    [MockDatabase, ColumnarDatabase, lambda: SQLiteDatabase(":memory:")],
+)
+def test_report_amounts_are_formatted_like_expenses(make_database):
+    client = api.create_app(make_database()).test_client()
+    client.post(
+        "/expenses",
+        json={"amount": "5", "date": "2023-01-01", "category": Category.FOOD.value},
+    )
+
+    for report in ("monthly", "yearly"):
+        data = client.get(f"/reports/{report}").get_json()
+        assert data[0]["total"] == "5.00"
+        assert data[0]["categories"] == {"Food": "5.00"}
+    trends = client.get("/reports/trends?granularity=month").get_json()
+    assert trends["Food"][0]["total"] == "5.00"
+    assert client.get("/expenses/total").get_json()["total"] == "5.00"
+
+
+def test_report_with_invalid_filter(client, setup_database):
+    response = client.get("/reports/yearly?from_date=2023-02-01&to_date=2023-01-01")
+    assert response.status_code == 400
+
+
+def test_category_trends(client, setup_database):
+    response = client.get("/reports/trends?granularity=day")
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert sum(point["count"] for point in data["Food"]) == 2
+    assert data["Transport"][0]["total"] == "30.00"
+
+
+def test_category_trends_invalid_granularity(client, setup_database):
+    response = client.get("/reports/trends?granularity=week")
+    assert response.status_code == 400
+
+
+def test_unchanged_expenses_are_not_modified(client, setup_database, monkeypatch):
+    first = client.get("/expenses?category=Food")
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the expenses should not be read")
+
+    monkeypatch.setattr(api.expense_service, "iter_expense_rows", fail)
+    second = client.get("/expenses?category=Food", headers={"If-None-Match": etag})
+
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == etag
+
+
+def test_etag_depends_on_filter_and_format(client, setup_database):
+    etag = client.get("/expenses?category=Food").headers["ETag"]
+
+    other_filter = client.get(
+        "/expenses?category=Transport", headers={"If-None-Match": etag}
+    )
+    other_format = client.get(
+        "/expenses?category=Food",
+        headers={"If-None-Match": etag, "Content-Type": "text/csv"},
+    )
+
+    assert other_filter.status_code == 200
+    assert other_format.status_code == 200
+    assert other_format.headers["ETag"] != etag
+
+
+def test_responses_are_compressed_when_accepted(client, setup_database):
+    plain = client.get("/expenses", headers={"Content-Type": "text/csv"})
+    gzipped = client.get(
+        "/expenses",
+        headers={"Content-Type": "text/csv", "Accept-Encoding": "gzip, deflate"},
+    )
+    deflated = client.get("/expenses", headers={"Accept-Encoding": "deflate"})
+
+    assert "Content-Encoding" not in plain.headers
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gzipped.data) == plain.data
+    assert deflated.headers["Content-Encoding"] == "deflate"
+    assert zlib.decompress(deflated.data) == client.get("/expenses").data
+    assert "Accept-Encoding" in gzipped.headers["Vary"]
+
+
+def test_new_expense_changes_the_etag(client, setup_database):
+    etag = client.get("/expenses").headers["ETag"]
+    food_etag = client.get("/expenses?category=Food").headers["ETag"]
+    client.post(
+        "/expenses",
+        json={
+            "amount": "12.00",
+            "date": date.today().isoformat(),
+            "category": Category.OTHER.value,
+            "description": "Umbrella",
+        },
+    )
+
+    response = client.get("/expenses", headers={"If-None-Match": etag})
+    food = client.get("/expenses?category=Food", headers={"If-None-Match": food_etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert food.status_code == 304
+
+
+def test_import_expenses(client, setup_database):
+    data = (
+        "Amount,Date,Category,Description\r\n"
+        "8.00,2023-05-20,Food,Imported\r\n"
+        "-1.00,2023-05-20,Food,\r\n"
+    )
+
+    response = client.post(
+        "/expenses/import", data=data, headers={"Content-Type": "text/csv"}
+    )
+
+    assert response.status_code == 207
+    assert response.json["imported"] == 1
+    assert response.json["errors"] == [{"line": 3, "error": "Amount must be positive"}]
+    assert client.get("/expenses?search=imported").json == [
+        {
+            "amount": "8.00",
+            "date": "2023-05-20",
+            "category": "Food",
+            "description": "Imported",
+        }
+    ]
+
+
+def test_import_expenses_without_header(client, setup_database):
+    response = client.post("/expenses/import", data="8.00,2023-05-20,Food,\r\n")
+
+    assert response.status_code == 400
+
+
+def test_import_reports_a_field_over_the_csv_limit(client, setup_database):
+    response = client.post(
+        "/expenses/import",
+        data=(
+            "Amount,Date,Category,Description\r\n"
+            f'1.00,2023-01-01,Food,"{"x" * 200000}"\r\n'
+        ),
+    )
+
+    assert response.status_code == 400
+    assert response.get_json()["imported"] == 0
+    assert response.get_json()["errors"][0]["line"] == 2
+
+
+def test_import_expenses_from_a_multipart_upload(client, setup_database):
+    data = b"Amount,Date,Category,Description\r\n-1.00,2023-01-01,Food,\r\n"
+
+    response = client.post(
+        "/expenses/import", data={"file": (BytesIO(data), "expenses.csv")}
+    )
+    missing = client.post("/expenses/import", data={"other": (BytesIO(data), "x")})
+
+    assert response.status_code == 400
+    assert response.get_json()["errors"] == [
+        {"line": 2, "error": "Amount must be positive"}
+    ]
+    assert missing.status_code == 400
+    assert missing.get_json() == {"error": "Expected a multipart upload named file"}
+
+
+def test_import_rejects_a_form_urlencoded_body(client, setup_database):
+    response = client.post(
+        "/expenses/import",
+        data="Amount,Date,Category,Description\r\n",
+        content_type="application/x-www-form-urlencoded",
+    )
+
+    assert response.status_code == 415
+
+
+def test_import_reports_a_line_that_is_not_utf8(client, setup_database):
+    response = client.post(
+        "/expenses/import",
+        data=b"Amount,Date,Category,Description\r\n"
+        b"1.00,2023-01-01,Food,Caf\xe9\r\n"
+        b"-1.00,2023-01-01,Food,\r\n",
+    )
+
+    assert response.status_code == 400
+    assert response.get_json()["errors"] == [
+        {"line": 2, "error": "Invalid UTF-8"},
+        {"line": 3, "error": "Amount must be positive"},
+    ]
+
+
+def test_expense_total(client, setup_database):
+    query = f"from_date={date.today() - timedelta(days=1)}&category=Food"
+    expenses = client.get(f"/expenses?{query}").json
+
+    response = client.get(f"/expenses/total?{query}")
+
+    assert response.status_code == 200
+    assert response.json == {
+        "total": str(sum(Decimal(expense["amount"]) for expense in expenses)),
+        "count": len(expenses),
+    }
+
+
+def test_expense_total_with_invalid_filter(client, setup_database):
+    response = client.get("/expenses/total?from_date=2023-02-01&to_date=2023-01-01")
+
+    assert response.status_code == 400
+
+
+def test_invalid_position_header(client, setup_database):
+    response = client.get("/expenses", headers={"X-Expenses-Position": "latest"})
+
+    assert response.status_code == 400
+
+
+def test_app_opens_its_database_on_first_request(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    lazy_app = api.create_app()
+    assert not os.path.exists("expenses.db")
+
+    response = lazy_app.test_client().get("/expenses/total")
+
+    assert response.status_code == 200
+    assert os.path.exists("expenses.db")
+    lazy_app.extensions["expenses"].database.close()
+
+
+def test_optional_components_are_not_imported_with_the_app():
+    optional = [
+        "app.external.replicated_database",
+        "app.external.sharded_database",
+        "app.external.group_commit_database",
+        "app.external.instrumented_database",
+        "app.expense_manager.parallel_report_service",
+        "multiprocessing",
+    ]
+    code = (
+        "import sys, app.rest.api; "
+        f"print([name for name in {optional!r} if name in sys.modules])"
+    )
+
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert output.strip() == "[]"
+
+
+def test_app_serves_the_given_database():
+    given = MockDatabase()
+    given.save_expense(
+        Expense(
+            amount=Decimal("12.50"),
+            date=date(2023, 1, 1),
+            category=Category.FOOD,
+            description=None,
+        )
+    )
+
+    response = api.create_app(given).test_client().get("/expenses/total")
+
+    assert response.get_json() == {"total": "12.50", "count": 1}
+
+
+def test_created_expense_amount_is_formatted_like_retrieved():
+    client = api.create_app(MockDatabase()).test_client()
+
+    response = client.post(
+        "/expenses",
+        json={"amount": "5", "date": "2023-01-01", "category": Category.OTHER.value},
+    )
+
+    assert response.get_json()["amount"] == "5.00"
+    assert client.get("/expenses").get_json()[0]["amount"] == "5.00"
+
+
+def test_list_expenses_date_range_in_insertion_order(database):
+    client = api.create_app(database).test_client()
+    days = ["2023-04-20", "2023-04-10", "2023-04-15"]
+    for day in days:
+        client.post(
+            "/expenses",
+            json={"amount": "1.00", "date": day, "category": Category.FOOD.value},
+        )
+
+    for query in ("from_date=2023-04-01", "category=Food"):
+        response = client.get(f"/expenses?{query}")
+        assert [expense["date"] for expense in response.get_json()] == days
@@ -0,0 +1,147 @@
+import pytest
+import csv
+import json
+from datetime import date
+from decimal import Decimal
+from app.models.category import Category
+from app.models.expense import Expense
+from app.rest.serializers import (
+    etag_matches,
+    expense_to_json,
+    expense_to_row,
+    format_cents,
+    iter_columnar,
+    iter_csv,
+    iter_json,
+    negotiate_encoding,
+    parse_expense,
+    read_columnar,
+    row_to_json,
+)
+
+
+EXPENSES = [
+    Expense(Decimal("50.00"), date(2023, 5, 20), Category.FOOD, "Grocery shopping"),
+    Expense(Decimal("0.05"), date(2023, 5, 21), Category.OTHER, 'Said "hi"\nżółw'),
+    Expense(Decimal("1234.50"), date(2023, 5, 22), Category.HOUSING, None),
+]
+
+
+@pytest.mark.parametrize("expense", EXPENSES)
+def test_row_json_matches_expense_json(expense):
+    assert row_to_json(expense_to_row(expense, 1)) == json.dumps(
+        expense_to_json(expense)
+    )
+
+
+@pytest.mark.parametrize(
+    "cents, text", [(5000, "50.00"), (5, "0.05"), (-310, "-3.10"), (0, "0.00")]
+)
+def test_format_cents(cents, text):
+    assert format_cents(cents) == text
+
+
+@pytest.mark.parametrize(
+    "amount, expected",
+    [(19.99, Decimal("19.99")), (0.1, Decimal("0.1")), (12, Decimal("12"))],
+)
+def test_json_number_amounts_keep_their_written_digits(amount, expected):
+    expense = parse_expense(
+        json.loads(
+            json.dumps({"amount": amount, "date": "2023-05-20", "category": "Food"})
+        )
+    )
+
+    assert expense.amount == expected
+    assert str(expense.amount) == str(expected)
+
+
+@pytest.mark.parametrize("amount", [[1], [0, [1], 2], {"value": 1}, True, None])
+def test_amounts_that_are_not_strings_or_numbers_are_invalid(amount):
+    with pytest.raises(ValueError, match="^Invalid amount$"):
+        parse_expense({"amount": amount, "date": "2023-05-20", "category": "Food"})
+
+
+def test_streams_split_rows_into_chunks():
+    rows = [
+        expense_to_row(expense, expense_id)
+        for expense_id, expense in enumerate(EXPENSES, start=1)
+    ]
+
+    json_chunks = list(iter_json(rows, 2))
+    csv_chunks = list(iter_csv(rows, 2))
+
+    assert len(json_chunks) == 3
+    assert json.loads("".join(json_chunks)) == [
+        expense_to_json(expense) for expense in EXPENSES
+    ]
+    assert len(csv_chunks) == 3
+    assert list(csv.reader("".join(csv_chunks).splitlines()))[3] == [
+        "1234.50",
+        "2023-05-22",
+        "Housing",
+        "",
+    ]
+
+
+def test_empty_json_stream():
+    assert "".join(iter_json([], 2)) == "[]"
+
+
+def test_columnar_export_round_trips():
+    rows = [
+        expense_to_row(expense, expense_id)
+        for expense_id, expense in enumerate(EXPENSES, start=1)
+    ]
+
+    chunks = list(iter_columnar(rows, 2))
+    groups = list(read_columnar(b"".join(chunks)))
+
+    assert len(chunks) == 4
+    assert [len(group["category"]) for group in groups] == [2, 1]
+    assert [cents for group in groups for cents in group["amount_cents"]] == [
+        5000,
+        5,
+        123450,
+    ]
+    assert groups[0]["date"][0] == (date(2023, 5, 20) - date(1970, 1, 1)).days
+    assert [name for group in groups for name in group["category"]] == [
+        "Food",
+        "Other",
+        "Housing",
+    ]
+    assert [text for group in groups for text in group["description"]] == [
+        "Grocery shopping",
+        'Said "hi"\nżółw',
+        None,
+    ]
+
+
+def test_empty_columnar_export():
+    assert list(read_columnar(b"".join(iter_columnar([], 2)))) == []
+    with pytest.raises(ValueError, match="Not a columnar"):
+        list(read_columnar(b"[]"))
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, encoding",
+    [
+        ("", None),
+        ("gzip, deflate", "gzip"),
+        ("deflate, gzip;q=0.5", "deflate"),
+        ("br, *", "gzip"),
+        ("*;q=0.1, gzip;q=0", "deflate"),
+        ("identity", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, encoding):
+    assert negotiate_encoding(accept_encoding, 1) == encoding
+    assert negotiate_encoding(accept_encoding, 0) is None
+
+
+def test_etag_matches_by_weak_comparison():
+    assert etag_matches('W/"abc"', "abc")
+    assert etag_matches('"other", "abc"', "abc")
+    assert etag_matches("*", "abc")
+    assert not etag_matches('W/"other"', "abc")
+    assert not etag_matches("", "abc")
@@ -0,0 +1,118 @@
+import pytest
+import asyncio
+import threading
+from datetime import date
+from decimal import Decimal
+from app.external import async_database
+from app.external.async_database import AsyncDatabase
+from app.models.category import Category
+from app.models.expense import Expense
+
+
+@pytest.fixture()
+def async_db(database):
+    async_db = AsyncDatabase(database, read_workers=2)
+    yield async_db
+    async_db.close()
+
+
+def make_expenses(count):
+    return [
+        Expense(Decimal(index + 1), date(2024, 1, 1 + index % 28), Category.FOOD)
+        for index in range(count)
+    ]
+
+
+def test_writes_and_reads_run_off_the_event_loop(async_db):
+    database_threads = []
+    get_expense_count = async_db.database.get_expense_count
+
+    def count_expenses():
+        database_threads.append(threading.get_ident())
+        return get_expense_count()
+
+    async_db.database.get_expense_count = count_expenses
+
+    async def scenario():
+        saved = await async_db.save_expenses(make_expenses(3))
+        last = await async_db.get_last_expense()
+        count = await async_db.get_expense_count()
+        found = await async_db.find_expenses_by_filter(None, None, "Food", limit=2)
+        return saved, last, count, found
+
+    saved, last, count, found = asyncio.run(scenario())
+
+    assert [expense.id for expense in saved] == [1, 2, 3]
+    assert last.id == 3
+    assert count == 3
+    assert database_threads != [threading.get_ident()]
+    assert [expense.id for expense in found] == [1, 2]
+
+
+def test_iteration_streams_all_expenses_in_order(async_db, monkeypatch):
+    monkeypatch.setattr(async_database, "ITER_BATCH_ROWS", 4)
+    async_db.database.save_expenses(make_expenses(30))
+
+    async def collect():
+        return [
+            expense.id
+            async for expense in async_db.iter_expenses_by_filter(None, None, None)
+        ]
+
+    assert asyncio.run(collect()) == list(range(1, 31))
+
+
+def test_closing_iteration_early_stops_the_reader(async_db, monkeypatch):
+    monkeypatch.setattr(async_database, "ITER_BATCH_ROWS", 1)
+    async_db.database.save_expenses(make_expenses(50))
+
+    async def first_two():
+        ids = []
+        expenses = async_db.iter_expenses_by_filter(None, None, None)
+        async for expense in expenses:
+            ids.append(expense.id)
+            if len(ids) == 2:
+                break
+        await expenses.aclose()
+        return ids
+
+    assert asyncio.run(first_two()) == [1, 2]
+    # The reader gave up its thread instead of waiting for a consumer.
+    async_db.close()
+
+
+def test_paused_streams_do_not_hold_reader_threads(database, monkeypatch):
+    monkeypatch.setattr(async_database, "ITER_BATCH_ROWS", 1)
+    async_db = AsyncDatabase(database, read_workers=1)
+    async_db.database.save_expenses(make_expenses(20))
+
+    async def read_while_streaming():
+        streams = [
+            async_db.iter_expenses_by_filter(None, None, None) for _ in range(4)
+        ]
+        first_ids = [(await anext(stream)).id for stream in streams]
+        # Every stream is waiting on its consumer; the only reader is free.
+        count = await asyncio.wait_for(async_db.get_expense_count(), 5)
+        for stream in streams:
+            await stream.aclose()
+        return first_ids, count
+
+    try:
+        assert asyncio.run(read_while_streaming()) == ([1, 1, 1, 1], 20)
+    finally:
+        async_db.close()
+
+
+def test_reader_errors_are_raised_in_the_consumer(async_db):
+    def fail(*args):
+        raise RuntimeError("disk I/O error")
+        yield
+
+    async_db.database.iter_expenses_by_filter = fail
+
+    async def consume():
+        async for _ in async_db.iter_expenses_by_filter(None, None, None):
+            pass
+
+    with pytest.raises(RuntimeError, match="disk I/O error"):
+        asyncio.run(consume())
@@ -0,0 +1,114 @@
+import pytest
+import threading
+from app.external.database import ConnectionPool, SQLiteDatabase
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    return str(tmp_path / "pool.db")
+
+
+def test_connection_is_reused(db_file):
+    pool = ConnectionPool(db_file, max_size=2)
+
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    metrics = pool.metrics()
+    assert metrics.created == 1
+    assert metrics.reused == 1
+    assert metrics.in_use == 0
+    assert metrics.idle == 1
+
+
+def test_same_thread_gets_the_same_connection(db_file):
+    pool = ConnectionPool(db_file, max_size=1, timeout=0.1)
+
+    with pool.connection() as outer:
+        with pool.connection() as inner:
+            assert inner is outer
+
+    assert pool.metrics().in_use == 0
+
+
+def test_pool_is_bounded(db_file):
+    pool = ConnectionPool(db_file, max_size=1, timeout=0.05)
+    acquired = threading.Event()
+    release = threading.Event()
+
+    def hold_connection():
+        with pool.connection():
+            acquired.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold_connection)
+    holder.start()
+    acquired.wait()
+    try:
+        with pytest.raises(TimeoutError):
+            with pool.connection():
+                pass
+    finally:
+        release.set()
+        holder.join()
+
+    assert pool.metrics().timeouts == 1
+    assert pool.metrics().size == 1
+
+
+def test_pragmas_are_applied_to_new_connections(db_file):
+    pool = ConnectionPool(db_file, pragmas={"foreign_keys": "ON"})
+
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+
+def test_broken_idle_connection_is_replaced(db_file):
+    pool = ConnectionPool(db_file, health_check_interval=0)
+
+    with pool.connection() as broken:
+        pass
+    broken.close()
+
+    with pool.connection() as conn:
+        assert conn is not broken
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
+
+    assert pool.metrics().discarded == 1
+
+
+def test_open_transaction_is_rolled_back_on_release(db_file):
+    pool = ConnectionPool(db_file)
+    with pool.connection() as conn, conn:
+        conn.execute("CREATE TABLE items (name TEXT)")
+
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO items VALUES ('uncommitted')")
+
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+
+
+def test_database_serves_concurrent_threads_from_the_pool(db_file):
+    database = SQLiteDatabase(db_file, pool_size=3)
+    errors = []
+
+    def count_expenses():
+        try:
+            for _ in range(20):
+                database.get_expense_count()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=count_expenses) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert database.pool_metrics().size <= 3
+    database.close()
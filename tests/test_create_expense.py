@@ -5,7 +5,7 @@ from app.models.expense import Expense, MAX_DESCRIPTION_LENGTH
 from app.models.category import Category
 from app.expense_manager.expense_service import ExpenseService
 from app.external.clock import MockClock
-from app.external.database import MockDatabase, SQLiteDatabase, Database
+from app.external.database import Database
 
 
 class DbAssertObject:
@@ -39,17 +39,6 @@ def mock_clock():
     return MockClock(datetime(2024, 10, 10, 8, 0, tzinfo=timezone.utc))
 
 
-# To use SQLiteDatabase, run pytest with: pytest --database-type=sqlite
-# To use MockDatabase (default), run pytest with: pytest
-# or explicitly with: pytest --database-type=mock
-@pytest.fixture()
-def database(request):
-    database_type = request.config.getoption("--database")
-    if database_type == "sqlite":
-        return SQLiteDatabase(":memory:")
-    return MockDatabase()
-
-
 @pytest.fixture()
 def expense_service(mock_clock, database):
     return ExpenseService(mock_clock, database)
@@ -137,3 +126,52 @@ def test_create_expense_long_description(expense_service, db_assert):
         expense_service.create_expense(expense)
 
     db_assert.assert_no_expense_inserted()
+
+
+@pytest.mark.parametrize(
+    "amount", ["0.001", "10.005", "Infinity", "NaN", "1e30", "92233720368547758.08"]
+)
+def test_create_expense_amount_not_storable_in_cents(
+    expense_service, db_assert, amount
+):
+    with pytest.raises(ValueError):
+        expense = Expense(
+            amount=Decimal(amount),
+            date=date(2023, 4, 15),
+            category=Category.FOOD,
+            description=None,
+        )
+        expense_service.create_expense(expense)
+
+    db_assert.assert_no_expense_inserted()
+
+
+def test_create_expenses_saves_valid_and_reports_invalid(expense_service, database):
+    valid = Expense(
+        amount=Decimal("20.00"),
+        date=date(2023, 4, 15),
+        category=Category.FOOD,
+        description="Dinner",
+    )
+    invalid = Expense(
+        amount=Decimal("0.00"),
+        date=date(2023, 4, 15),
+        category=Category.FOOD,
+        description="Free lunch",
+    )
+
+    result = expense_service.create_expenses([valid, invalid, valid])
+
+    assert sorted(result.created) == [0, 2]
+    assert result.errors == {1: "Amount must be positive"}
+    assert result.created[2].id == result.created[0].id + 1
+    assert database.get_expense_count() == 2
+    assert database.get_last_expense().id == result.created[2].id
+
+
+def test_create_expenses_with_no_valid_expense(expense_service, db_assert):
+    result = expense_service.create_expenses([])
+
+    assert result.created == {}
+    assert result.errors == {}
+    db_assert.assert_no_expense_inserted()
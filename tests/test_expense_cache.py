@@ -0,0 +1,141 @@
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from app.external.clock import Clock, MockClock
+from app.expense_manager.expense_cache import ExpenseCache
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.expense_manager.expense_service import ExpenseService
+from app.models.category import Category
+from tests.helpers import make_expense
+
+
+class MovableClock(Clock):
+    def __init__(self, time: datetime):
+        self.time = time
+
+    def now(self) -> datetime:
+        return self.time
+
+
+@pytest.fixture
+def cache_clock():
+    return MovableClock(datetime(2024, 10, 10, 8, 0, tzinfo=timezone.utc))
+
+
+@pytest.fixture
+def cache(cache_clock):
+    return ExpenseCache(cache_clock, max_entries=2, ttl=timedelta(seconds=30))
+
+
+@pytest.fixture
+def expense_service(database, cache):
+    clock = MockClock(datetime(2024, 10, 10, 8, 0, tzinfo=timezone.utc))
+    return ExpenseService(clock, database, cache)
+
+
+APRIL = ExpenseFilter(from_date=date(2023, 4, 1), to_date=date(2023, 4, 30))
+APRIL_FOOD = ExpenseFilter(
+    from_date=date(2023, 4, 1), to_date=date(2023, 4, 30), category=Category.FOOD
+)
+MAY = ExpenseFilter(from_date=date(2023, 5, 1), to_date=date(2023, 5, 31))
+
+
+def test_repeated_filter_is_served_from_cache(expense_service, cache):
+    expense_service.create_expense(make_expense("10.00", date(2023, 4, 15)))
+
+    first = expense_service.get_expenses_by_filter(APRIL)
+    second = expense_service.get_expenses_by_filter(APRIL)
+
+    assert first == second
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries, stats.rows) == (1, 1, 1, 1)
+
+
+def test_new_expense_invalidates_only_matching_entries(expense_service, cache):
+    for expense_filter in (APRIL_FOOD, MAY):
+        expense_service.get_expenses_by_filter(expense_filter)
+
+    expense_service.create_expense(
+        make_expense("10.00", date(2023, 4, 15), Category.HEALTH)
+    )
+    expense_service.get_expenses_by_filter(MAY)
+    assert cache.stats().invalidations == 0
+    assert cache.stats().hits == 1
+
+    expense_service.create_expense(make_expense("10.00", date(2023, 4, 16)))
+    assert len(expense_service.get_expenses_by_filter(APRIL_FOOD)) == 1
+    assert cache.stats().invalidations == 1
+
+
+def test_bulk_insert_invalidates_matching_entries(expense_service, cache):
+    expense_service.get_expenses_by_filter(MAY)
+
+    expense_service.create_expenses([make_expense("10.00", date(2023, 5, 2))])
+
+    assert len(expense_service.get_expenses_by_filter(MAY)) == 1
+    assert cache.stats().invalidations == 1
+
+
+def test_least_recently_used_entry_is_evicted(expense_service, cache):
+    expense_service.get_expenses_by_filter(APRIL)
+    expense_service.get_expenses_by_filter(MAY)
+    expense_service.get_expenses_by_filter(APRIL)
+    expense_service.get_expenses_by_filter(APRIL_FOOD)
+
+    assert cache.get(MAY) is None
+    assert cache.get(APRIL) is not None
+    assert cache.stats().evictions == 1
+
+
+def test_entries_expire(expense_service, cache, cache_clock):
+    expense_service.get_expenses_by_filter(APRIL)
+    cache_clock.time += timedelta(seconds=31)
+
+    expense_service.get_expenses_by_filter(APRIL)
+
+    assert cache.stats().expirations == 1
+    assert cache.stats().hits == 0
+
+
+def test_streamed_results_are_cached_once_consumed(expense_service, cache):
+    expense_service.create_expense(make_expense("10.00", date(2023, 4, 15)))
+
+    assert len(list(expense_service.iter_expenses_by_filter(APRIL))) == 1
+    assert len(list(expense_service.iter_expenses_by_filter(APRIL))) == 1
+    assert cache.stats().hits == 1
+
+
+def test_result_read_before_a_write_is_not_cached(cache):
+    generation = cache.generation
+    cache.invalidate([make_expense("10.00", date(2023, 1, 1))])
+
+    cache.put(APRIL, [], 0, generation)
+
+    assert cache.get(APRIL) is None
+
+
+def test_versioned_result_is_not_served_for_another_version(expense_service, database):
+    expense_service.create_expense(make_expense("10.00", date(2023, 4, 15)))
+    version = expense_service.get_data_version(APRIL)
+    assert len(list(expense_service.iter_expense_rows(APRIL, version))) == 1
+
+    # Written by another process, so this process's cache is not invalidated.
+    database.save_expense(make_expense("10.00", date(2023, 4, 16)))
+    new_version = expense_service.get_data_version(APRIL)
+
+    assert new_version != version
+    assert len(list(expense_service.iter_expense_rows(APRIL, new_version))) == 2
+
+
+def test_pages_are_cached_and_invalidated(expense_service, cache):
+    expense_service.create_expense(make_expense("10.00", date(2023, 4, 15)))
+    expense_service.create_expense(make_expense("10.00", date(2023, 4, 16)))
+    first_page = ExpenseFilter(page_size=1)
+
+    page = expense_service.get_expenses_page(first_page)
+    assert expense_service.get_expenses_page(first_page) == page
+    assert cache.stats().hits == 1
+
+    expense_service.create_expense(make_expense("10.00", date(2023, 4, 1)))
+    assert expense_service.get_expenses_page(first_page).expenses[0].date == date(
+        2023, 4, 1
+    )
@@ -0,0 +1,167 @@
+import random
+import sys
+import threading
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from app.external.database import SQLiteDatabase
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.expense_manager.report_service import ReportService
+from app.models.category import Category
+from app.models.summary import ExpenseTotal
+from tests.helpers import make_expense
+
+
+@pytest.fixture()
+def report_service(database):
+    return ReportService(database)
+
+
+def random_expenses(rng, count):
+    return [
+        make_expense(
+            Decimal(rng.randint(1, 10000)).scaleb(-2),
+            date(2023, 1, 1) + timedelta(days=rng.randrange(60)),
+            rng.choice([Category.FOOD, Category.HEALTH, Category.OTHER]),
+        )
+        for _ in range(count)
+    ]
+
+
+def test_total_of_date_range_and_category(database, report_service):
+    database.save_expenses(
+        [
+            make_expense("10.00", date(2023, 1, 5)),
+            make_expense("2.50", date(2023, 1, 20), Category.HEALTH),
+            make_expense("4.00", date(2023, 2, 1)),
+        ]
+    )
+
+    assert report_service.total(ExpenseFilter()) == ExpenseTotal(Decimal("16.50"), 3)
+    assert report_service.total(
+        ExpenseFilter(from_date=date(2023, 1, 20), to_date=date(2023, 2, 1))
+    ) == ExpenseTotal(Decimal("6.50"), 2)
+    assert report_service.total(
+        ExpenseFilter(to_date=date(2023, 1, 31), category=Category.FOOD)
+    ) == ExpenseTotal(Decimal("10.00"), 1)
+    assert report_service.total(
+        ExpenseFilter(category=Category.HOUSING)
+    ) == ExpenseTotal(Decimal("0.00"), 0)
+
+
+def test_total_matches_expenses_after_out_of_order_inserts(database, report_service):
+    rng = random.Random(1)
+    expenses = random_expenses(rng, 200)
+    for position in range(0, 100, 10):
+        database.save_expenses(expenses[position : position + 10])
+    for expense in expenses[100:]:
+        database.save_expense(expense)
+
+    for _ in range(50):
+        from_date = date(2023, 1, 1) + timedelta(days=rng.randrange(-5, 60))
+        to_date = from_date + timedelta(days=rng.randrange(30))
+        category = rng.choice([None, Category.FOOD, Category.OTHER])
+        matching = [
+            expense
+            for expense in expenses
+            if from_date <= expense.date <= to_date
+            and category in (None, expense.category)
+        ]
+
+        total = report_service.total(
+            ExpenseFilter(from_date=from_date, to_date=to_date, category=category)
+        )
+
+        assert total == ExpenseTotal(
+            sum((expense.amount for expense in matching), Decimal("0.00")),
+            len(matching),
+        )
+
+
+def test_total_includes_expenses_saved_after_a_read(database, report_service):
+    database.save_expense(make_expense("1.00", date(2023, 1, 5)))
+    assert report_service.total(ExpenseFilter()) == ExpenseTotal(Decimal("1.00"), 1)
+
+    database.save_expense(make_expense("2.00", date(2023, 1, 5)))
+    database.save_expense(make_expense("4.00", date(2023, 1, 9)))
+
+    assert report_service.total(ExpenseFilter()) == ExpenseTotal(Decimal("7.00"), 3)
+    assert report_service.total(
+        ExpenseFilter(from_date=date(2023, 1, 6))
+    ) == ExpenseTotal(Decimal("4.00"), 1)
+
+
+def test_totals_read_during_writes_are_consistent(database, report_service):
+    expenses = random_expenses(random.Random(4), 3000)
+    empty_range = ExpenseFilter(from_date=date(2023, 6, 1), to_date=date(2023, 12, 1))
+    done = threading.Event()
+    wrong_totals = []
+
+    def write():
+        for expense in expenses:
+            database.save_expense(expense)
+        done.set()
+
+    def read():
+        while not done.is_set():
+            total = report_service.total(empty_range)
+            if total != ExpenseTotal(Decimal("0.00"), 0):
+                wrong_totals.append(total)
+
+    # Switch threads often, so the readers interleave with each other.
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    threads = [threading.Thread(target=write)]
+    threads += [threading.Thread(target=read) for _ in range(3)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert wrong_totals == []
+    assert report_service.total(ExpenseFilter()).count == len(expenses)
+
+
+def test_total_with_invalid_filter(report_service):
+    with pytest.raises(ValueError):
+        report_service.total(
+            ExpenseFilter(from_date=date(2023, 2, 1), to_date=date(2023, 1, 1))
+        )
+
+
+def test_running_totals_are_built_for_existing_databases(tmp_path):
+    db_file = str(tmp_path / "expenses.db")
+    database = SQLiteDatabase(db_file)
+    database.save_expenses(random_expenses(random.Random(2), 50))
+    with database.pool.connection() as conn, conn:
+        conn.execute("DROP TABLE expense_running_totals")
+    database.close()
+
+    database = SQLiteDatabase(db_file)
+
+    assert database.verify_rollups() == []
+    assert database.get_expense_total(None, None, None).count == 50
+    database.close()
+
+
+def test_verify_reports_running_total_drift(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "expenses.db"))
+    database.save_expense(make_expense("10.00", date(2023, 1, 5)))
+    with database.pool.connection() as conn, conn:
+        conn.execute(
+            "UPDATE expense_running_totals SET total_cents = 1 WHERE node = ?",
+            (date(2023, 1, 5).toordinal(),),
+        )
+
+    mismatches = database.verify_rollups()
+
+    assert [(m.granularity, m.period, m.category) for m in mismatches] == [
+        ("running", "2023-01-05", ""),
+        ("running", "2023-01-05", "Food"),
+    ]
+    database.rebuild_rollups()
+    assert database.verify_rollups() == []
+    database.close()
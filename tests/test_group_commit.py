@@ -0,0 +1,142 @@
+import pytest
+import threading
+import time
+from decimal import Decimal
+from app.external.group_commit_database import GroupCommitDatabase
+from tests.helpers import make_expense
+
+
+def hold_first_commit(database):
+    """Make the first commit wait until ``release`` is set."""
+    release = threading.Event()
+    save_expenses = database.save_expenses
+    calls = []
+
+    def save_after_release(expenses):
+        calls.append(len(expenses))
+        if len(calls) == 1:
+            release.wait()
+        return save_expenses(expenses)
+
+    database.save_expenses = save_after_release
+    return release, calls
+
+
+def wait_for_queue_depth(group_commit, depth):
+    deadline = time.monotonic() + 5
+    while group_commit.metrics().queue_depth < depth:
+        assert time.monotonic() < deadline, "writes were not queued"
+        time.sleep(0.001)
+
+
+def test_concurrent_writes_are_committed_together(database):
+    release, calls = hold_first_commit(database)
+    group_commit = GroupCommitDatabase(database, max_group_size=100, max_delay=0)
+    results = []
+
+    threads = [
+        threading.Thread(
+            target=lambda amount=amount: results.append(
+                group_commit.save_expense(make_expense(amount))
+            )
+        )
+        for amount in range(1, 11)
+    ]
+    # The first write must be committing alone before the others queue up.
+    threads[0].start()
+    wait_for_queue_depth(group_commit, 1)
+    while not calls:
+        time.sleep(0.001)
+    for thread in threads[1:]:
+        thread.start()
+    wait_for_queue_depth(group_commit, 10)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(expense.id for expense in results) == list(range(1, 11))
+    assert {expense.id: expense.amount for expense in results} == {
+        expense.id: expense.amount
+        for expense in database.find_expenses_by_filter(None, None, None)
+    }
+    assert calls == [1, 9]
+    metrics = group_commit.metrics()
+    assert metrics.groups == 2
+    assert metrics.committed == 10
+    assert metrics.max_group_size == 9
+    assert metrics.queue_depth == 0
+    assert metrics.max_commit_seconds > 0
+    group_commit.close()
+
+
+def test_batch_gets_its_own_ids(database):
+    group_commit = GroupCommitDatabase(database)
+
+    group_commit.save_expense(make_expense(1))
+    saved = group_commit.save_expenses([make_expense(2), make_expense(3)])
+
+    assert [(expense.id, expense.amount) for expense in saved] == [
+        (2, Decimal(2)),
+        (3, Decimal(3)),
+    ]
+    assert group_commit.get_expense_count() == 3
+    group_commit.close()
+
+
+def test_failed_write_only_fails_its_caller(database):
+    release, _ = hold_first_commit(database)
+    save_expenses = database.save_expenses
+
+    def reject_thirteen(expenses):
+        if any(expense.amount == 13 for expense in expenses):
+            raise ValueError("rejected")
+        return save_expenses(expenses)
+
+    database.save_expenses = reject_thirteen
+    group_commit = GroupCommitDatabase(database, max_delay=0)
+    outcomes = {}
+
+    def save(amount):
+        try:
+            outcomes[amount] = group_commit.save_expense(make_expense(amount)).id
+        except ValueError as e:
+            outcomes[amount] = str(e)
+
+    threads = [threading.Thread(target=save, args=(n,)) for n in (1, 12, 13, 14)]
+    for thread in threads:
+        thread.start()
+    wait_for_queue_depth(group_commit, 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes[13] == "rejected"
+    assert sorted(outcomes[amount] for amount in (1, 12, 14)) == [1, 2, 3]
+    assert group_commit.metrics().failed == 1
+    group_commit.close()
+
+
+def test_close_drains_queued_writes(database):
+    release, _ = hold_first_commit(database)
+    group_commit = GroupCommitDatabase(database, max_delay=0)
+    saved = []
+    writers = [
+        threading.Thread(
+            target=lambda n=n: saved.append(group_commit.save_expense(make_expense(n)))
+        )
+        for n in (1, 2, 3)
+    ]
+    for writer in writers:
+        writer.start()
+    wait_for_queue_depth(group_commit, 3)
+
+    closer = threading.Thread(target=group_commit.close)
+    closer.start()
+    release.set()
+    closer.join()
+    for writer in writers:
+        writer.join()
+
+    assert sorted(expense.id for expense in saved) == [1, 2, 3]
+    with pytest.raises(RuntimeError):
+        group_commit.save_expense(make_expense(4))
@@ -0,0 +1,149 @@
+import pytest
+from io import BytesIO, TextIOWrapper
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from app.cli import main
+from app.external.clock import MockClock
+from app.external.database import SQLiteDatabase
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.expense_manager.expense_importer import ExpenseImporter
+from app.expense_manager.expense_service import ExpenseService
+from app.models.category import Category
+from app.models.expense import Expense
+from app.rest.serializers import iter_csv, parse_csv_expense, read_csv
+
+
+@pytest.fixture()
+def expense_service(database):
+    return ExpenseService(
+        MockClock(datetime(2024, 1, 1, tzinfo=timezone.utc)), database
+    )
+
+
+CSV = (
+    "Amount,Date,Category,Description\r\n"
+    "50.00,2023-05-20,Food,Grocery shopping\r\n"
+    "-1.00,2023-05-20,Food,\r\n"
+    "\r\n"
+    '5.00,2023-05-21,Other,"Said ""hi""\nżółw"\r\n'
+    "2.00,2023-13-01,Food,Bad date\r\n"
+    "3.00,2024-06-01,Food,Future\r\n"
+    "1.00,2023-01-01,Food\r\n"
+    "7.00,2023-01-01,Health,\r\n"
+)
+
+
+def test_import_reports_errors_by_line(expense_service):
+    importer = ExpenseImporter(expense_service, parse_csv_expense, batch_size=2)
+    progress = []
+
+    report = importer.run(read_csv(CSV.splitlines(keepends=True)), progress.append)
+
+    assert report.imported == 3
+    assert report.errors == {
+        3: "Amount must be positive",
+        7: "Invalid date",
+        8: "Date cannot be in the future",
+        9: "Expected 4 fields, found 3",
+    }
+    assert report.rows == 7
+    assert len(progress) == 4
+    expenses = expense_service.get_expenses_by_filter(ExpenseFilter())
+    assert expenses == [
+        Expense(Decimal("50.00"), date(2023, 5, 20), Category.FOOD, "Grocery shopping"),
+        Expense(Decimal("5.00"), date(2023, 5, 21), Category.OTHER, 'Said "hi"\nżółw'),
+        Expense(Decimal("7.00"), date(2023, 1, 1), Category.HEALTH, None),
+    ]
+
+
+def test_import_reports_a_field_over_the_csv_limit(expense_service):
+    lines = [
+        "Amount,Date,Category,Description\r\n",
+        f'1.00,2023-01-01,Food,"{"x" * 200000}"\r\n',
+        "2.00,2023-01-02,Food,\r\n",
+    ]
+    importer = ExpenseImporter(expense_service, parse_csv_expense)
+
+    report = importer.run(read_csv(lines))
+
+    assert report.imported == 1
+    assert report.errors == {2: "Invalid CSV: field larger than field limit (131072)"}
+
+
+def test_import_reports_a_line_that_is_not_utf8(expense_service):
+    data = (
+        b"Amount,Date,Category,Description\r\n"
+        b"1.00,2023-01-01,Food,\r\n"
+        b"2.00,2023-01-02,Food,Caf\xe9\r\n"
+        b"3.00,2023-01-03,Food,Caf\xc3\xa9\r\n"
+    )
+    lines = TextIOWrapper(
+        BytesIO(data), encoding="utf-8-sig", errors="surrogateescape", newline=""
+    )
+    importer = ExpenseImporter(expense_service, parse_csv_expense)
+
+    report = importer.run(read_csv(lines))
+
+    assert report.imported == 2
+    assert report.errors == {3: "Invalid UTF-8"}
+    assert [
+        expense.description
+        for expense in expense_service.get_expenses_by_filter(ExpenseFilter())
+    ] == [None, "Café"]
+
+
+def test_import_on_worker_processes(expense_service):
+    rows = [
+        (None, 100 + index, date(2023, 1, 1).toordinal() + index, "Food", f"#{index}")
+        for index in range(250)
+    ]
+    importer = ExpenseImporter(
+        expense_service, parse_csv_expense, batch_size=40, workers=2
+    )
+
+    report = importer.run(read_csv("".join(iter_csv(rows, 100)).splitlines(True)))
+
+    assert report.imported == 250
+    assert report.errors == {}
+    expenses = expense_service.get_expenses_by_filter(ExpenseFilter())
+    assert [expense.description for expense in expenses] == [
+        f"#{index}" for index in range(250)
+    ]
+
+
+def test_import_validates_on_worker_processes(expense_service):
+    importer = ExpenseImporter(
+        expense_service, parse_csv_expense, batch_size=2, workers=2
+    )
+
+    report = importer.run(read_csv(CSV.splitlines(keepends=True)))
+
+    assert report.imported == 3
+    assert report.errors == {
+        3: "Amount must be positive",
+        7: "Invalid date",
+        8: "Date cannot be in the future",
+        9: "Expected 4 fields, found 3",
+    }
+
+
+def test_import_rejects_a_file_without_header(expense_service):
+    importer = ExpenseImporter(expense_service, parse_csv_expense)
+
+    with pytest.raises(ValueError, match="header"):
+        importer.run(read_csv(["50.00,2023-05-20,Food,Grocery shopping\r\n"]))
+
+
+def test_cli_import(tmp_path, capsys):
+    csv_file = tmp_path / "expenses.csv"
+    csv_file.write_text(CSV.replace("2024-06-01", "2023-06-01"), encoding="utf-8")
+    db_file = str(tmp_path / "expenses.db")
+
+    assert main(["expenses", "import", str(csv_file), "--db", db_file]) == 1
+
+    output = capsys.readouterr().out
+    assert f"{csv_file}:7: Invalid date" in output
+    assert "4 expenses imported, 3 rejected" in output
+    database = SQLiteDatabase(db_file)
+    assert database.get_expense_count() == 4
+    database.close()
@@ -0,0 +1,181 @@
+import pytest
+import threading
+from datetime import datetime, timedelta, timezone
+from app.expense_manager.expense_cache import ExpenseCache, instrument_cache
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.external.clock import MockClock
+from app.external.database import ConnectionPool, SQLiteDatabase
+from app.external.group_commit_database import GroupCommitDatabase
+from app.external.instrumented_database import (
+    InstrumentedDatabase,
+    instrument_group_commit,
+    instrument_pool,
+)
+from app.metrics import MetricsRegistry
+from tests.helpers import make_expense
+
+
+@pytest.fixture()
+def registry():
+    return MetricsRegistry()
+
+
+def test_render_counter_and_histogram(registry):
+    requests = registry.counter("requests_total", "Requests.", ["route"])
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=[0.1, 1])
+    requests.inc(("/expenses",))
+    requests.inc(("/expenses",), 2)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(3)
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/expenses"} 3',
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        "latency_seconds_sum 3.55",
+        "latency_seconds_count 3",
+    ]
+
+
+def test_label_values_are_escaped(registry):
+    registry.counter("errors_total", "Errors.", ["error"]).inc(('say "hi"\n',))
+
+    assert 'errors_total{error="say \\"hi\\"\\n"} 1' in registry.render()
+
+
+def test_metrics_are_registered_once(registry):
+    assert registry.counter("a_total", "A.") is registry.counter("a_total", "A.")
+    with pytest.raises(ValueError):
+        registry.histogram("a_total", "A.")
+
+
+def test_collected_values_are_read_when_rendered(registry):
+    stats = {("hit",): 1}
+    registry.collected("hits_total", "Hits.", lambda: stats, ["result"], "counter")
+    stats[("hit",)] = 3
+
+    assert registry.render().splitlines() == [
+        "# HELP hits_total Hits.",
+        "# TYPE hits_total counter",
+        'hits_total{result="hit"} 3',
+    ]
+
+
+def test_database_calls_are_timed_and_rows_counted(database, registry):
+    instrumented = InstrumentedDatabase(database, registry)
+
+    instrumented.save_expense(make_expense(1))
+    instrumented.save_expenses([make_expense(2), make_expense(3)])
+    instrumented.find_expenses_by_filter(None, None, None, limit=2)
+    assert len(list(instrumented.iter_expense_rows(None, None, None))) == 3
+
+    query_seconds = registry.get("expenses_db_query_seconds")
+    rows = registry.get("expenses_db_rows_total")
+    assert query_seconds.count(("save_expenses",)) == 1
+    assert query_seconds.count(("iter_expense_rows",)) == 1
+    assert rows.value(("save_expense",)) == 1
+    assert rows.value(("save_expenses",)) == 2
+    assert rows.value(("find_expenses_by_filter",)) == 2
+    assert rows.value(("iter_expense_rows",)) == 3
+
+
+def test_errors_are_counted(database, registry):
+    def fail(*args, **kwargs):
+        raise RuntimeError("disk I/O error")
+
+    database.get_expense_count = fail
+    instrumented = InstrumentedDatabase(database, registry)
+
+    with pytest.raises(RuntimeError):
+        instrumented.get_expense_count()
+
+    assert registry.get("expenses_db_errors_total").value(("get_expense_count",)) == 1
+    assert registry.get("expenses_db_query_seconds").count(("get_expense_count",)) == 1
+
+
+def test_pool_reports_connect_and_acquire_times(tmp_path, registry):
+    database = SQLiteDatabase(str(tmp_path / "metrics.db"))
+    database.close()
+    database = SQLiteDatabase(str(tmp_path / "metrics.db"))
+    instrument_pool(database.pool, registry)
+
+    database.get_expense_count()
+    database.get_expense_count()
+
+    seconds = registry.get("expenses_db_connection_seconds")
+    assert seconds.count(("acquire",)) == 2
+    assert seconds.count(("connect",)) == 0
+    database.close()
+
+
+def test_pool_reports_checkouts_that_timed_out(tmp_path, registry):
+    pool = ConnectionPool(str(tmp_path / "metrics.db"), max_size=1, timeout=0.01)
+    instrument_pool(pool, registry)
+    acquired = threading.Event()
+    release = threading.Event()
+
+    def hold_connection():
+        with pool.connection():
+            acquired.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold_connection)
+    holder.start()
+    acquired.wait()
+    try:
+        connections = registry.get("expenses_db_pool_connections")
+        assert connections.value(("in_use",)) == 1
+        with pytest.raises(TimeoutError):
+            with pool.connection():
+                pass
+    finally:
+        release.set()
+        holder.join()
+
+    checkouts = registry.get("expenses_db_pool_checkouts_total")
+    assert checkouts.value(("timed_out",)) == 1
+    assert checkouts.value(("waited",)) >= 1
+    assert 'expenses_db_pool_connections{state="idle"} 1' in registry.render()
+    pool.close()
+
+
+def test_group_commit_sizes_are_exposed(database, registry):
+    group_commit = GroupCommitDatabase(database, max_group_size=1, max_delay=0)
+    instrument_group_commit(group_commit, registry)
+
+    group_commit.save_expense(make_expense(1))
+    group_commit.save_expenses([make_expense(2), make_expense(3)])
+
+    assert registry.get("expenses_group_commit_groups_total").value() == 2
+    assert (
+        registry.get("expenses_group_commit_expenses_total").value(("committed",))
+        == 3
+    )
+    assert registry.get("expenses_group_commit_max_group_size").value() == 2
+    assert registry.get("expenses_group_commit_queue_depth").value() == 0
+    group_commit.close()
+
+
+def test_cache_hits_and_misses_are_exposed(registry):
+    clock = MockClock(datetime(2024, 10, 10, 8, 0, tzinfo=timezone.utc))
+    cache = ExpenseCache(clock, ttl=timedelta(seconds=30))
+    instrument_cache(cache, registry)
+    filter = ExpenseFilter()
+
+    cache.get(filter)
+    cache.put(filter, [], 0, cache.generation)
+    cache.get(filter)
+    cache.invalidate([make_expense(1)])
+
+    lookups = registry.get("expenses_cache_lookups_total")
+    assert lookups.value(("hit",)) == 1
+    assert lookups.value(("miss",)) == 1
+    removals = registry.get("expenses_cache_removals_total")
+    assert removals.value(("invalidation",)) == 1
+    assert 'expenses_cache_lookups_total{result="hit"} 1' in registry.render()
@@ -0,0 +1,146 @@
+import logging
+import sqlite3
+import pytest
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from app.external.clock import Clock
+from app.external.database import SQLiteDatabase
+from app.external.group_commit_database import GroupCommitDatabase
+from app.external.read_session import begin_read_session
+from app.external.replicated_database import ReplicatedDatabase
+from tests.helpers import make_expense
+
+
+class SteppingClock(Clock):
+    def __init__(self):
+        self.time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def now(self) -> datetime:
+        return self.time
+
+
+@pytest.fixture()
+def primary(tmp_path):
+    primary = SQLiteDatabase(str(tmp_path / "primary.db"))
+    primary.save_expense(make_expense("10.00", description="Seeded"))
+    return primary
+
+
+@pytest.fixture()
+def clock():
+    return SteppingClock()
+
+
+@pytest.fixture()
+def database(primary, clock, tmp_path):
+    database = ReplicatedDatabase(
+        primary,
+        [str(tmp_path / "replica-1.db"), str(tmp_path / "replica-2.db")],
+        max_staleness=timedelta(seconds=2),
+        sync_interval=None,
+        clock=clock,
+    )
+    yield database
+    database.close()
+
+
+def descriptions(database):
+    return [
+        expense.description
+        for expense in database.find_expenses_by_filter(None, None, None)
+    ]
+
+
+def test_replicas_are_seeded_from_the_primary(database, tmp_path):
+    for name in ("replica-1.db", "replica-2.db"):
+        with closing(sqlite3.connect(tmp_path / name)) as conn:
+            rows = conn.execute("SELECT description FROM expenses").fetchall()
+        assert rows == [("Seeded",)]
+
+
+def test_reads_go_to_replicas_until_they_sync(database):
+    begin_read_session()
+    database.save_expense(make_expense("5.00", description="Written"))
+
+    # A new session of another client reads a replica that is behind.
+    begin_read_session()
+    assert descriptions(database) == ["Seeded"]
+
+    database.sync()
+    begin_read_session()
+    assert descriptions(database) == ["Seeded", "Written"]
+    assert database.get_expense_total(None, None, "Food").total == Decimal("15.00")
+    assert database.summarize_expenses("month", None, None, None)[0].count == 2
+
+
+def test_sessions_read_their_own_writes(database):
+    session = begin_read_session()
+
+    saved = database.save_expenses([make_expense("5.00", description="Written")])
+
+    assert session.position == saved[0].id
+    assert descriptions(database) == ["Seeded", "Written"]
+    # Another request of the same client, sending its position back.
+    begin_read_session(session.position)
+    assert descriptions(database) == ["Seeded", "Written"]
+
+
+def test_stale_replicas_are_not_read(database, clock):
+    database.save_expense(make_expense("5.00", description="Written"))
+
+    clock.time += timedelta(seconds=3)
+    begin_read_session()
+
+    assert descriptions(database) == ["Seeded", "Written"]
+
+
+def test_replica_that_fails_to_sync_is_not_read(database, caplog, monkeypatch):
+    failing = database._replicas[0].database
+
+    def fail(expenses, ids=None):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(failing, "save_expenses", fail)
+    database.save_expense(make_expense("5.00", description="Written"))
+
+    with caplog.at_level(logging.ERROR):
+        database.sync()
+
+    assert f"Syncing {failing.db_file} failed" in caplog.text
+    for _ in range(2):
+        begin_read_session()
+        assert descriptions(database) == ["Seeded", "Written"]
+
+    monkeypatch.undo()
+    database.sync()
+    assert [replica.error for replica in database._replicas] == [None, None]
+
+
+def test_writes_through_group_commit(primary, clock, tmp_path):
+    writer = GroupCommitDatabase(primary, max_delay=0)
+    database = ReplicatedDatabase(
+        primary,
+        [str(tmp_path / "replica.db")],
+        sync_interval=None,
+        writer=writer,
+        clock=clock,
+    )
+    session = begin_read_session()
+
+    database.save_expense(make_expense("5.00", description="Written"))
+
+    assert session.position == 2
+    assert descriptions(database) == ["Seeded", "Written"]
+    database.close()
+
+
+def test_replica_ahead_of_the_primary_is_rejected(tmp_path):
+    replica = SQLiteDatabase(str(tmp_path / "replica.db"))
+    replica.save_expense(make_expense("1.00"))
+    replica.close()
+    primary = SQLiteDatabase(str(tmp_path / "primary.db"))
+
+    with pytest.raises(RuntimeError, match="has expenses"):
+        ReplicatedDatabase(primary, [str(tmp_path / "replica.db")], sync_interval=None)
+    primary.close()
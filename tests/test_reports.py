@@ -0,0 +1,74 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.expense_manager.report_service import ReportService
+from app.models.expense import Expense
+from app.models.category import Category
+
+
+@pytest.fixture()
+def report_service(database):
+    return ReportService(database)
+
+
+@pytest.fixture()
+def mock_data(database):
+    for amount, expense_date, category in [
+        ("10.10", date(2022, 12, 31), Category.FOOD),
+        ("20.20", date(2023, 1, 1), Category.FOOD),
+        ("0.30", date(2023, 1, 15), Category.FOOD),
+        ("5.00", date(2023, 1, 20), Category.TRANSPORT),
+        ("7.50", date(2023, 3, 2), Category.HOUSING),
+    ]:
+        database.save_expense(
+            Expense(amount=Decimal(amount), date=expense_date, category=category)
+        )
+    return database
+
+
+def test_monthly_summary(mock_data, report_service):
+    summaries = report_service.monthly_summary(ExpenseFilter())
+
+    assert [summary.period for summary in summaries] == [
+        "2022-12",
+        "2023-01",
+        "2023-03",
+    ]
+    january = summaries[1]
+    assert january.total == Decimal("25.50")
+    assert january.count == 3
+    assert january.by_category == {
+        Category.FOOD: Decimal("20.50"),
+        Category.TRANSPORT: Decimal("5.00"),
+    }
+
+
+def test_yearly_summary(mock_data, report_service):
+    summaries = report_service.yearly_summary(ExpenseFilter())
+
+    assert [(s.period, s.total, s.count) for s in summaries] == [
+        ("2022", Decimal("10.10"), 1),
+        ("2023", Decimal("33.00"), 4),
+    ]
+
+
+def test_summary_with_filter(mock_data, report_service):
+    summaries = report_service.yearly_summary(
+        ExpenseFilter(from_date=date(2023, 1, 10), category=Category.FOOD)
+    )
+
+    assert [(s.period, s.total, s.count) for s in summaries] == [
+        ("2023", Decimal("0.30"), 1)
+    ]
+
+
+def test_summary_without_expenses(report_service):
+    assert report_service.monthly_summary(ExpenseFilter()) == []
+
+
+def test_summary_invalid_date_range(report_service):
+    with pytest.raises(ValueError):
+        report_service.monthly_summary(
+            ExpenseFilter(from_date=date(2023, 2, 1), to_date=date(2023, 1, 1))
+        )
@@ -1,9 +1,11 @@
+import sys
+import threading
 import pytest
-from datetime import datetime, timezone, timedelta
-from app.external.database import SQLiteDatabase, MockDatabase
+from datetime import date, datetime, timezone, timedelta
 from app.external.clock import MockClock
 from app.expense_manager.expense_service import ExpenseService
 from app.expense_manager.expense_filter import ExpenseFilter
+from app.expense_manager.pagination import PageCursor
 from app.models.expense import Expense
 from app.models.category import Category
 from decimal import Decimal
@@ -20,14 +22,6 @@ def mock_clock():
     return MockClock(datetime(2024, 10, 10, 8, 0, tzinfo=timezone.utc))
 
 
-@pytest.fixture()
-def database(request):
-    database_type = request.config.getoption("--database")
-    if database_type == "sqlite":
-        return SQLiteDatabase(":memory:")
-    return MockDatabase()
-
-
 @pytest.fixture()
 def expense_service(mock_clock, database):
     return ExpenseService(mock_clock, database)
@@ -122,9 +116,158 @@ def test_list_expenses_date_range_and_category_filter(mock_data, expense_service
     assert len(expenses) == 1
 
 
+def test_list_expenses_date_range_in_insertion_order(database, expense_service):
+    days = [date(2023, 4, 20), date(2023, 4, 10), date(2023, 4, 15)]
+    for day in days:
+        database.save_expense(Expense(Decimal("1.00"), day, Category.FOOD, None))
+
+    for category in (None, Category.FOOD):
+        expense_filter = ExpenseFilter(
+            from_date=date(2023, 4, 1), to_date=date(2023, 4, 30), category=category
+        )
+        expenses = expense_service.get_expenses_by_filter(expense_filter)
+        assert [expense.date for expense in expenses] == days
+        expenses = expense_service.iter_expenses_by_filter(expense_filter)
+        assert [expense.date for expense in expenses] == days
+
+
 def test_list_expenses_invalid_date_range(mock_data, expense_service):
     expense_filter = ExpenseFilter(
         from_date=EXPENSE_DATE, to_date=EXPENSE_DATE - timedelta(days=1)
     )
     with pytest.raises(ValueError):
         expense_service.get_expenses_by_filter(expense_filter)
+
+
+def test_iter_expenses_yields_matching_expenses(mock_data, expense_service):
+    expense_filter = ExpenseFilter(category=Category.FOOD)
+    expenses = expense_service.iter_expenses_by_filter(expense_filter)
+    assert not isinstance(expenses, list)
+    assert [expense.amount for expense in expenses] == [
+        EXPENSE_FOOD_AMOUNT,
+        EXPENSE_FOOD_AMOUNT_2,
+    ]
+
+
+def test_iter_expenses_validates_filter_before_iterating(mock_data, expense_service):
+    expense_filter = ExpenseFilter(
+        from_date=EXPENSE_DATE, to_date=EXPENSE_DATE - timedelta(days=1)
+    )
+    with pytest.raises(ValueError):
+        expense_service.iter_expenses_by_filter(expense_filter)
+
+
+def test_expense_rows_match_expenses(mock_data, expense_service):
+    expense_filter = ExpenseFilter(category=Category.FOOD)
+
+    rows = list(expense_service.iter_expense_rows(expense_filter))
+
+    assert [row[1:] for row in rows] == [
+        (
+            int(expense.amount * 100),
+            expense.date.toordinal(),
+            expense.category.value,
+            expense.description,
+        )
+        for expense in expense_service.iter_expenses_by_filter(expense_filter)
+    ]
+
+
+def test_expense_rows_cannot_be_paginated(expense_service):
+    with pytest.raises(ValueError):
+        expense_service.iter_expense_rows(ExpenseFilter(page_size=10))
+
+
+def test_list_expenses_page_by_page(database, expense_service):
+    for day in (3, 1, 2, 1):
+        database.save_expense(
+            Expense(
+                amount=Decimal(day),
+                date=date(2023, 4, day),
+                category=Category.FOOD,
+                description=f"Day {day}",
+            )
+        )
+
+    first = expense_service.get_expenses_page(ExpenseFilter(page_size=3))
+    second = expense_service.get_expenses_page(
+        ExpenseFilter(page_size=3, after=first.next_cursor)
+    )
+
+    assert [expense.description for expense in first.expenses] == [
+        "Day 1",
+        "Day 1",
+        "Day 2",
+    ]
+    assert first.next_cursor == PageCursor(date(2023, 4, 2), 3)
+    assert [expense.description for expense in second.expenses] == ["Day 3"]
+    assert second.next_cursor is None
+
+
+def test_list_expenses_page_size_must_be_positive(expense_service):
+    with pytest.raises(ValueError):
+        expense_service.get_expenses_page(ExpenseFilter(page_size=0))
+
+
+def test_page_cursor_round_trip():
+    cursor = PageCursor(date(2023, 4, 15), 42)
+    assert PageCursor.decode(cursor.encode()) == cursor
+
+
+def test_page_cursor_rejects_invalid_token():
+    with pytest.raises(ValueError):
+        PageCursor.decode("not-a-token")
+
+
+def test_reads_during_writes_see_whole_rows(database):
+    start = date(2023, 1, 1)
+    batches = [
+        [
+            Expense(Decimal("1.00"), start + timedelta(days=day % 90), category, None)
+            for day in range(size)
+        ]
+        for size, category in [(3, Category.FOOD), (1500, Category.HEALTH)] * 20
+    ]
+    done = threading.Event()
+    failures = []
+
+    def write():
+        for batch in batches:
+            database.save_expenses(batch)
+        done.set()
+
+    def read():
+        while not done.is_set():
+            try:
+                for category in (None, Category.FOOD.value):
+                    expenses = database.find_expenses_by_filter(
+                        start + timedelta(days=10), start + timedelta(days=40), category
+                    )
+                    assert {expense.amount for expense in expenses} <= {
+                        Decimal("1.00")
+                    }
+                    page = database.find_expenses_by_filter(
+                        None, None, category, limit=50, after=(start, 0)
+                    )
+                    assert page == sorted(
+                        page, key=lambda expense: (expense.date, expense.id)
+                    )
+                    list(database.iter_expense_rows(None, None, category))
+            except (AssertionError, IndexError) as e:
+                failures.append(e)
+
+    # Switch threads often, so the reads interleave with the writes.
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    threads = [threading.Thread(target=write)]
+    threads += [threading.Thread(target=read) for _ in range(2)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert failures == []
+    assert database.get_expense_count() == sum(len(batch) for batch in batches)
@@ -0,0 +1,146 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from app.cli import main
+from app.external.database import SQLiteDatabase
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.expense_manager.report_service import ReportService
+from app.models.category import Category
+from app.models.summary import TrendPoint
+from tests.helpers import make_expense
+
+
+@pytest.fixture()
+def report_service(database):
+    return ReportService(database)
+
+
+def test_trends_follow_single_and_bulk_inserts(database, report_service):
+    database.save_expense(make_expense("10.00", date(2023, 1, 5)))
+    database.save_expenses(
+        [
+            make_expense("2.50", date(2023, 1, 20)),
+            make_expense("4.00", date(2023, 2, 1)),
+            make_expense("9.99", date(2023, 2, 3), Category.HEALTH),
+        ]
+    )
+
+    trends = report_service.category_trends(ExpenseFilter())
+
+    assert trends == {
+        Category.FOOD: [
+            TrendPoint(period="2023-01", total=Decimal("12.50"), count=2),
+            TrendPoint(period="2023-02", total=Decimal("4.00"), count=1),
+        ],
+        Category.HEALTH: [
+            TrendPoint(period="2023-02", total=Decimal("9.99"), count=1),
+        ],
+    }
+
+
+def test_daily_trends_with_filter(database, report_service):
+    database.save_expenses(
+        [
+            make_expense("1.00", date(2023, 1, 1)),
+            make_expense("2.00", date(2023, 1, 2)),
+            make_expense("3.00", date(2023, 1, 2)),
+            make_expense("4.00", date(2023, 1, 3)),
+        ]
+    )
+
+    trends = report_service.category_trends(
+        ExpenseFilter(
+            from_date=date(2023, 1, 2),
+            to_date=date(2023, 1, 2),
+            category=Category.FOOD,
+        ),
+        granularity="day",
+    )
+
+    assert trends == {
+        Category.FOOD: [TrendPoint(period="2023-01-02", total=Decimal("5.00"), count=2)]
+    }
+
+
+def test_failed_save_leaves_expenses_and_rollups_unchanged(database, report_service):
+    database.save_expense(make_expense("10.00", date(2023, 1, 5)))
+
+    with pytest.raises(OverflowError):
+        database.save_expenses(
+            [
+                make_expense("2.50", date(2023, 1, 20)),
+                make_expense("Infinity", date(2023, 1, 21)),
+            ]
+        )
+
+    assert database.get_expense_count() == 1
+    assert report_service.total(ExpenseFilter()).count == 1
+    assert report_service.category_trends(ExpenseFilter()) == {
+        Category.FOOD: [TrendPoint(period="2023-01", total=Decimal("10.00"), count=1)]
+    }
+
+
+def test_trends_invalid_granularity(report_service):
+    with pytest.raises(ValueError):
+        report_service.category_trends(ExpenseFilter(), granularity="week")
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    return str(tmp_path / "rollups.db")
+
+
+def test_rollups_match_expenses(db_file):
+    database = SQLiteDatabase(db_file)
+    database.save_expense(make_expense("10.00", date(2023, 1, 5)))
+    database.save_expenses([make_expense("2.50", date(2023, 3, 1))])
+
+    assert database.verify_rollups() == []
+    database.close()
+
+
+def test_verify_reports_drift_and_rebuild_fixes_it(db_file):
+    database = SQLiteDatabase(db_file)
+    database.save_expense(make_expense("10.00", date(2023, 1, 5)))
+    with database.pool.connection() as conn, conn:
+        conn.execute(
+            "UPDATE expense_rollups SET total_cents = 1 WHERE granularity = 'month'"
+        )
+
+    mismatches = database.verify_rollups()
+
+    assert len(mismatches) == 1
+    assert mismatches[0].period == "2023-01"
+    assert mismatches[0].expected_total == Decimal("10.00")
+    assert mismatches[0].actual_total == Decimal("0.01")
+
+    database.rebuild_rollups()
+    assert database.verify_rollups() == []
+    database.close()
+
+
+def test_rollups_are_built_for_existing_databases(db_file):
+    database = SQLiteDatabase(db_file)
+    database.save_expense(make_expense("10.00", date(2023, 1, 5)))
+    with database.pool.connection() as conn, conn:
+        conn.execute("DROP TABLE expense_rollups")
+    database.close()
+
+    database = SQLiteDatabase(db_file)
+
+    assert database.verify_rollups() == []
+    assert len(database.get_category_trends("day", None, None, None)) == 1
+    database.close()
+
+
+def test_cli_verify_and_rebuild(db_file, capsys):
+    database = SQLiteDatabase(db_file)
+    database.save_expense(make_expense("10.00", date(2023, 1, 5)))
+    with database.pool.connection() as conn, conn:
+        conn.execute("DELETE FROM expense_rollups")
+    database.close()
+
+    assert main(["rollups", "verify", "--db", db_file]) == 1
+    assert main(["rollups", "rebuild", "--db", db_file]) == 0
+    assert main(["rollups", "verify", "--db", db_file]) == 0
+    assert "0 mismatched rollups" in capsys.readouterr().out
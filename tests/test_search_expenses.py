@@ -0,0 +1,141 @@
+import pytest
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from app.external.database import SQLiteDatabase
+from app.external.clock import MockClock
+from app.expense_manager.expense_cache import ExpenseCache
+from app.expense_manager.expense_service import ExpenseService
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.models.expense import Expense
+from app.models.category import Category
+
+
+@pytest.fixture
+def mock_clock():
+    return MockClock(datetime(2024, 10, 10, 8, 0, tzinfo=timezone.utc))
+
+
+@pytest.fixture()
+def expense_service(mock_clock, database):
+    return ExpenseService(mock_clock, database)
+
+
+def expense(description, category=Category.TRANSPORT, day=date(2024, 5, 1)):
+    return Expense(
+        amount=Decimal("10.00"),
+        date=day,
+        category=category,
+        description=description,
+    )
+
+
+@pytest.fixture()
+def mock_data(database):
+    database.save_expenses(
+        [
+            expense("Uber to the airport"),
+            expense("Rent for May", Category.HOUSING),
+            expense("Uber uber uber"),
+            expense(None),
+            expense("Uber Eats dinner", Category.FOOD, date(2024, 6, 1)),
+            expense("Café au lait", Category.FOOD),
+        ]
+    )
+
+
+def descriptions(expenses):
+    return [expense.description for expense in expenses]
+
+
+def test_search_ranks_by_relevance(expense_service, mock_data):
+    expenses = expense_service.get_expenses_by_filter(ExpenseFilter(search="uber"))
+
+    assert descriptions(expenses) == [
+        "Uber uber uber",
+        "Uber Eats dinner",
+        "Uber to the airport",
+    ]
+
+
+def test_search_requires_every_term(expense_service, mock_data):
+    expenses = expense_service.get_expenses_by_filter(
+        ExpenseFilter(search="uber dinner")
+    )
+
+    assert descriptions(expenses) == ["Uber Eats dinner"]
+
+
+def test_search_ignores_case_and_diacritics(expense_service, mock_data):
+    assert descriptions(
+        expense_service.get_expenses_by_filter(ExpenseFilter(search="RENT"))
+    ) == ["Rent for May"]
+    assert descriptions(
+        expense_service.get_expenses_by_filter(ExpenseFilter(search="cafe"))
+    ) == ["Café au lait"]
+
+
+def test_search_is_combined_with_filters(expense_service, mock_data):
+    by_category = expense_service.get_expenses_by_filter(
+        ExpenseFilter(search="uber", category=Category.FOOD)
+    )
+    by_date = expense_service.get_expenses_by_filter(
+        ExpenseFilter(search="uber", to_date=date(2024, 5, 31))
+    )
+
+    assert descriptions(by_category) == ["Uber Eats dinner"]
+    assert descriptions(by_date) == ["Uber uber uber", "Uber to the airport"]
+
+
+def test_search_without_matches(expense_service, mock_data):
+    assert expense_service.get_expenses_by_filter(ExpenseFilter(search="taxi")) == []
+    assert expense_service.get_expenses_by_filter(ExpenseFilter(search="  ,")) == []
+
+
+def test_search_rows_follow_the_ranking(expense_service, mock_data):
+    rows = list(expense_service.iter_expense_rows(ExpenseFilter(search="uber")))
+
+    assert [row[4] for row in rows] == [
+        "Uber uber uber",
+        "Uber Eats dinner",
+        "Uber to the airport",
+    ]
+
+
+def test_search_cannot_be_paginated(expense_service):
+    with pytest.raises(ValueError, match="Search results cannot be paginated"):
+        expense_service.get_expenses_by_filter(
+            ExpenseFilter(search="uber", page_size=10)
+        )
+
+
+def test_new_matching_expense_invalidates_cached_search(mock_clock, database):
+    service = ExpenseService(mock_clock, database, ExpenseCache(mock_clock))
+    service.create_expense(expense("Uber home"))
+    service.get_expenses_by_filter(ExpenseFilter(search="uber"))
+    service.get_expenses_by_filter(ExpenseFilter(search="rent"))
+
+    service.create_expense(expense("Rent for June", Category.HOUSING))
+
+    assert service.cache.stats().invalidations == 1
+    assert descriptions(
+        service.get_expenses_by_filter(ExpenseFilter(search="rent"))
+    ) == ["Rent for June"]
+
+
+def test_search_index_is_built_for_existing_files(tmp_path):
+    db_file = str(tmp_path / "expenses.db")
+    database = SQLiteDatabase(db_file)
+    database.save_expense(expense("Uber home"))
+    with database.pool.connection() as conn, conn:
+        conn.execute("DROP TABLE expenses_fts")
+        conn.execute("DROP TRIGGER expenses_fts_insert")
+    database.close()
+
+    database = SQLiteDatabase(db_file)
+    database.save_expense(expense("Uber to work"))
+
+    assert descriptions(database.search_expenses("uber", None, None, None)) == [
+        "Uber home",
+        "Uber to work",
+    ]
+    database.close()
@@ -0,0 +1,135 @@
+import pytest
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from app.external.clock import MockClock
+from app.external.sharded_database import ShardedDatabase
+from app.expense_manager.expense_filter import ExpenseFilter
+from app.expense_manager.expense_service import ExpenseService
+from app.models.category import Category
+from tests.helpers import make_expense
+
+
+@pytest.fixture()
+def database(tmp_path):
+    database = ShardedDatabase(str(tmp_path / "shards"))
+    yield database
+    database.close()
+
+
+@pytest.fixture()
+def mock_data(database):
+    database.save_expense(make_expense("10.00", date(2023, 3, 1)))
+    database.save_expenses(
+        [
+            make_expense("20.00", date(2022, 12, 31), Category.TRANSPORT),
+            make_expense("30.00", date(2024, 1, 1), description="Uber home"),
+            make_expense("40.00", date(2023, 6, 1), description="Uber to work"),
+        ]
+    )
+
+
+def test_expenses_are_routed_to_yearly_files(database, mock_data, tmp_path):
+    assert database.years() == [2022, 2023, 2024]
+    assert sorted(
+        path.name for path in (tmp_path / "shards").glob("expenses-*.db")
+    ) == [
+        "expenses-2022.db",
+        "expenses-2023.db",
+        "expenses-2024.db",
+    ]
+    assert database.shard(2023).get_expense_count() == 2
+
+
+def test_ids_are_unique_across_shards(database, mock_data):
+    expenses = database.find_expenses_by_filter(None, None, None)
+
+    assert sorted(expense.id for expense in expenses) == [1, 2, 3, 4]
+    assert database.get_last_expense().amount == Decimal("40.00")
+    assert database.get_expense_count() == 4
+
+
+def test_query_reads_only_overlapping_shards(database, mock_data):
+    def fail(*args, **kwargs):
+        raise AssertionError("shard should have been pruned")
+
+    database.shard(2022).find_expenses_by_filter = fail
+    database.shard(2024).find_expenses_by_filter = fail
+
+    expenses = database.find_expenses_by_filter(
+        date(2023, 1, 1), date(2023, 12, 31), None
+    )
+
+    assert [expense.amount for expense in expenses] == [
+        Decimal("10.00"),
+        Decimal("40.00"),
+    ]
+
+
+def test_pages_continue_across_shards(database, mock_data):
+    service = ExpenseService(
+        MockClock(datetime(2025, 1, 1, tzinfo=timezone.utc)), database
+    )
+    dates = []
+    after = None
+    while True:
+        page = service.get_expenses_page(ExpenseFilter(page_size=3, after=after))
+        dates += [expense.date for expense in page.expenses]
+        if not page.next_cursor:
+            break
+        after = page.next_cursor
+
+    assert dates == [
+        date(2022, 12, 31),
+        date(2023, 3, 1),
+        date(2023, 6, 1),
+        date(2024, 1, 1),
+    ]
+
+
+def test_summaries_and_search_span_shards(database, mock_data):
+    summaries = database.summarize_expenses("year", None, None, Category.FOOD.value)
+    found = database.search_expenses("uber", None, None, None)
+
+    assert [(summary.period, summary.total) for summary in summaries] == [
+        ("2023", Decimal("50.00")),
+        ("2024", Decimal("30.00")),
+    ]
+    assert sorted(expense.description for expense in found) == [
+        "Uber home",
+        "Uber to work",
+    ]
+
+
+def test_reopened_database_continues_the_sequence(database, mock_data, tmp_path):
+    database.close()
+
+    reopened = ShardedDatabase(str(tmp_path / "shards"))
+    try:
+        expense = reopened.save_expense(make_expense("10.00", date(2021, 5, 5)))
+
+        assert expense.id == 5
+        assert reopened.years() == [2021, 2022, 2023, 2024]
+        assert reopened.get_expense_count() == 5
+    finally:
+        reopened.close()
+
+
+def test_reopened_database_finds_shards_of_early_years(database, tmp_path):
+    database.save_expense(make_expense("10.00", date(999, 1, 1)))
+    database.close()
+
+    reopened = ShardedDatabase(str(tmp_path / "shards"))
+    try:
+        assert (tmp_path / "shards" / "expenses-0999.db").exists()
+        assert reopened.years() == [999]
+        assert reopened.get_expense_count() == 1
+    finally:
+        reopened.close()
+
+
+def test_total_adds_up_the_shards_in_range(database, mock_data):
+    assert database.get_expense_total(None, None, None).total == Decimal("100.00")
+
+    total = database.get_expense_total(date(2023, 1, 1), date(2024, 12, 31), "Food")
+
+    assert (total.total, total.count) == (Decimal("80.00"), 3)
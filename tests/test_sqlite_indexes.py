@@ -0,0 +1,56 @@
+from datetime import date
+from app.external.database import EXPENSE_INDEXES, SQLiteDatabase
+
+
+def index_names(database):
+    with database.pool.connection() as conn:
+        return {
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' "
+                "AND name LIKE 'idx_expenses_%'"
+            )
+        }
+
+
+def test_managed_indexes_are_created():
+    database = SQLiteDatabase(":memory:")
+
+    assert index_names(database) == set(EXPENSE_INDEXES)
+
+
+def test_obsolete_managed_indexes_are_dropped_at_startup(tmp_path):
+    db_file = str(tmp_path / "indexes.db")
+    database = SQLiteDatabase(db_file)
+    with database.pool.connection() as conn:
+        conn.execute("CREATE INDEX idx_expenses_description ON expenses (description)")
+        conn.execute("CREATE INDEX custom_description ON expenses (description)")
+    database.close()
+
+    database = SQLiteDatabase(db_file)
+
+    assert index_names(database) == set(EXPENSE_INDEXES)
+    with database.pool.connection() as conn:
+        assert (
+            conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE name = 'custom_description'"
+            ).fetchone()[0]
+            == 1
+        )
+    database.close()
+
+
+def test_explain_date_range_uses_date_index():
+    database = SQLiteDatabase(":memory:")
+
+    plan = database.explain(date(2023, 1, 1), date(2023, 1, 31), None)
+
+    assert any("idx_expenses_day" in step for step in plan)
+
+
+def test_explain_category_uses_composite_index():
+    database = SQLiteDatabase(":memory:")
+
+    plan = database.explain(date(2023, 1, 1), None, "Food")
+
+    assert any("idx_expenses_category_day" in step for step in plan)
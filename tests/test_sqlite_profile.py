@@ -0,0 +1,63 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from app.external.database import (
+    DURABLE_PROFILE,
+    PERFORMANCE_PROFILE,
+    SQLiteDatabase,
+    SQLiteProfile,
+)
+from app.models.category import Category
+from app.models.expense import Expense
+
+
+EXPENSE = Expense(
+    amount=Decimal("10.00"),
+    date=date(2023, 4, 15),
+    category=Category.FOOD,
+    description="Lunch",
+)
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    return str(tmp_path / "profile.db")
+
+
+def test_durable_profile_keeps_rollback_journal(db_file):
+    database = SQLiteDatabase(db_file, profile=DURABLE_PROFILE)
+
+    assert database.journal_mode() == "delete"
+    database.close()
+
+
+def test_performance_profile_enables_wal(db_file):
+    database = SQLiteDatabase(db_file, profile=PERFORMANCE_PROFILE)
+
+    with database.pool.connection() as conn:
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    assert database.journal_mode() == "wal"
+    database.close()
+
+
+def test_wal_is_checkpointed_every_interval(db_file):
+    profile = SQLiteProfile(journal_mode="WAL", checkpoint_interval=2)
+    database = SQLiteDatabase(db_file, profile=profile)
+
+    database.save_expense(EXPENSE)
+    database.save_expense(EXPENSE)
+
+    busy, log_frames, checkpointed = database.checkpoint()
+    assert busy == 0
+    assert log_frames == checkpointed
+    assert database.get_expense_count() == 2
+    database.close()
+
+
+def test_invalid_checkpoint_mode(db_file):
+    database = SQLiteDatabase(db_file)
+
+    with pytest.raises(ValueError):
+        database.checkpoint("EVERYTHING")
+    database.close()
@@ -0,0 +1,155 @@
+import pytest
+import sqlite3
+from datetime import date
+from decimal import Decimal
+from app.cli import main
+from app.external.database import (
+    EXPENSE_INDEXES,
+    SCHEMA_VERSION,
+    SQLiteDatabase,
+    from_cents,
+    to_cents,
+)
+from app.models.category import Category
+from app.models.expense import Expense
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    return str(tmp_path / "legacy.db")
+
+
+def create_legacy_database(db_file):
+    """Write a file in the format used before storage versions existed."""
+    conn = sqlite3.connect(db_file)
+    conn.execute(
+        """
+        CREATE TABLE expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            amount DECIMAL(10, 2) NOT NULL,
+            date DATE NOT NULL,
+            category TEXT NOT NULL,
+            description TEXT
+        )
+        """
+    )
+    conn.execute("CREATE INDEX idx_expenses_date ON expenses (date)")
+    conn.executemany(
+        "INSERT INTO expenses (amount, date, category, description) "
+        "VALUES (?, ?, ?, ?)",
+        [
+            ("50.00", "2023-05-20", "Food", "Grocery shopping"),
+            ("19.99", "2023-05-21T00:00:00+00:00", "Transport", None),
+            ("0.10", "2023-06-01", "Food", "Gum"),
+            ("5.00", "2023-06-02", "Other", "Deleted"),
+        ],
+    )
+    conn.execute("DELETE FROM expenses WHERE id = 4")
+    conn.commit()
+    conn.close()
+
+
+def column_names(database):
+    with database.pool.connection() as conn:
+        return [row[1] for row in conn.execute("PRAGMA table_info(expenses)")]
+
+
+def test_new_database_uses_the_current_version(db_file):
+    database = SQLiteDatabase(db_file)
+
+    assert database.schema_version() == SCHEMA_VERSION
+    assert column_names(database) == [
+        "id",
+        "amount_cents",
+        "day",
+        "category",
+        "description",
+    ]
+    database.close()
+
+
+def test_legacy_database_is_migrated_in_place(db_file):
+    create_legacy_database(db_file)
+    conn = sqlite3.connect(db_file)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+    conn.close()
+
+    database = SQLiteDatabase(db_file)
+
+    assert database.schema_version() == SCHEMA_VERSION
+    assert "amount_cents" in column_names(database)
+    expenses = database.find_expenses_by_filter(None, None, None)
+    assert [(e.id, e.amount, e.date, e.category) for e in expenses] == [
+        (1, Decimal("50.00"), date(2023, 5, 20), "Food"),
+        (2, Decimal("19.99"), date(2023, 5, 21), "Transport"),
+        (3, Decimal("0.10"), date(2023, 6, 1), "Food"),
+    ]
+    assert database.verify_rollups() == []
+    with database.pool.connection() as conn:
+        indexes = {
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' "
+                "AND name LIKE 'idx_expenses_%'"
+            )
+        }
+    assert indexes == set(EXPENSE_INDEXES)
+    database.close()
+
+
+def test_migration_rounds_like_new_expenses(db_file):
+    create_legacy_database(db_file)
+    conn = sqlite3.connect(db_file)
+    conn.execute(
+        "INSERT INTO expenses (amount, date, category, description) "
+        "VALUES ('10.005', '2023-06-03', 'Food', NULL)"
+    )
+    conn.commit()
+    conn.close()
+
+    database = SQLiteDatabase(db_file)
+
+    assert database.get_last_expense().amount == from_cents(to_cents(Decimal("10.005")))
+    database.close()
+
+
+def test_ids_keep_increasing_after_migration(db_file):
+    create_legacy_database(db_file)
+
+    database = SQLiteDatabase(db_file)
+    saved = database.save_expense(
+        Expense(Decimal("1.00"), date(2023, 7, 1), Category.FOOD)
+    )
+
+    assert saved.id == 5
+    database.close()
+
+
+def test_migration_runs_once(db_file):
+    create_legacy_database(db_file)
+    SQLiteDatabase(db_file).close()
+
+    database = SQLiteDatabase(db_file)
+
+    assert database.get_expense_count() == 3
+    assert database.summarize_expenses("month", None, None, "Food")[0].total == (
+        Decimal("50.00")
+    )
+    database.close()
+
+
+def test_newer_storage_version_is_rejected(db_file):
+    SQLiteDatabase(db_file).close()
+    conn = sqlite3.connect(db_file)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+    conn.close()
+
+    with pytest.raises(RuntimeError, match="newer than the supported version"):
+        SQLiteDatabase(db_file)
+
+
+def test_cli_migrate(db_file, capsys):
+    create_legacy_database(db_file)
+
+    assert main(["storage", "migrate", "--db", db_file]) == 0
+    assert f"storage version {SCHEMA_VERSION}" in capsys.readouterr().out